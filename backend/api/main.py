@@ -1,19 +1,28 @@
-import os, time, asyncio, random
+import os, time, asyncio, random, json
 from typing import List, Optional, Dict, Any
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Response, Request, Depends, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
 from dotenv import load_dotenv
-from prometheus_client import Counter, Gauge, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, generate_latest, CONTENT_TYPE_LATEST, multiprocess
 
 from services.notifier import Notifier
-from services.db import init_db, save_alert, get_alerts_db, save_zone, get_zone, DB_OK, save_homography, get_homography
+from services.db import init_db, save_zone, get_zone, DB_OK, save_homography, get_homography
 from services.heatmap import HeatmapAggregator
 from services.discovery import onvif_discover
-from services.health import camera_health
 from services.auth import require_write, maybe_require_oidc
-from services.clipper import generate_clip_precise, upload_clip_and_gif
+from services.clipper import generate_clip_and_gif, upload_clip_and_gif, segments
+from services.clip_jobs import ClipJobs
+from services.batch_ingest import decode_batch, CONTENT_TYPE, REPLAY_HEADER, SENT_AT_HEADER
+from services.alert_store import DbAlertStore
+from services.broadcaster import Broadcaster
+from services.zones import ZoneEngine
+from services.persist import WriteBehind
+from services.cameras import CameraRegistry, HealthMonitor, RegistryUnavailable
+from services.cluster import Cluster, FORWARDED_HEADER
+from services.pubsub import make_pubsub
+from services import profiler
 
 load_dotenv()
 
@@ -22,6 +31,9 @@ FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
 PROM_ENABLED = os.getenv("PROMETHEUS_ENABLED","true").lower() == "true"
 ENABLE_NOTIFICATIONS = os.getenv("ENABLE_NOTIFICATIONS","true").lower() == "true"
 HLS_OUTPUT_DIR = os.getenv("HLS_OUTPUT_DIR", "/app/hls")
+HEATMAP_SNAPSHOT_SECONDS = float(os.getenv("HEATMAP_SNAPSHOT_SECONDS", "60"))
+# set by serve.py for WORKERS > 1: metrics are aggregated over every worker's mmap files
+PROM_MULTIPROC = bool(os.getenv("PROMETHEUS_MULTIPROC_DIR"))
 
 app = FastAPI(title="Sentinel Vision AI API", version="0.7.0")
 app.add_middleware(
@@ -34,14 +46,21 @@ app.add_middleware(
 os.makedirs(HLS_OUTPUT_DIR, exist_ok=True)
 app.mount("/hls", StaticFiles(directory=HLS_OUTPUT_DIR), name="hls")
 
-# In-memory camera store
-CAMERAS: Dict[str, Dict[str, Any]] = {}
-ALERTS_CACHE: List[Dict[str, Any]] = []
+# Multi-worker mode (serve.py): per-camera state is sharded by camera_id, events cross workers on pub/sub
+cluster = Cluster()
+bus = make_pubsub()
+# Alerts and downsampled detection history are written behind the request path (services/persist.py)
+persist = WriteBehind()
+# Cameras: stable ids persisted next to the alerts (in-memory only without DATABASE_URL)
+cameras = CameraRegistry(persist.engine)
+# Recent alerts: bounded ring + time-ordered indexes, Postgres when available
+alert_store = DbAlertStore(persist.add_alert, persist.engine, lambda: persist.table("alerts"), DB_OK)
 
 # Models
 class Camera(BaseModel):
     name: str
     rtsp_url: Optional[str] = None
+    onvif_url: Optional[str] = None  # device service, e.g. http://10.0.0.5/onvif/device_service
     location: Optional[str] = None
     tags: Optional[List[str]] = None
 
@@ -54,6 +73,7 @@ class Alert(BaseModel):
     confidence: float
     message: str
     ts: float
+    stages: Optional[Dict[str, float]] = None  # wall-clock stage timestamps: capture, sent, ingest, decision
 
 class Zone(BaseModel):
     camera_id: str
@@ -72,67 +92,178 @@ class DetectionIn(BaseModel):
 # metrics
 REG = CollectorRegistry()
 ALERTS_TOTAL = Counter("alerts_total","Total alerts emitted",["type"], registry=REG)
-WS_CLIENTS = Gauge("ws_clients","Active websocket clients", registry=REG)
-LAST_ALERT_TS = Gauge("last_alert_ts","Unix timestamp of last alert", registry=REG)
-PERSON_COUNT = Gauge("person_count","People count per camera", ["camera_id"], registry=REG)
+# multiprocess_mode only matters under PROMETHEUS_MULTIPROC_DIR: how gauges from several workers combine
+WS_CLIENTS = Gauge("ws_clients","Active websocket clients", registry=REG, multiprocess_mode="livesum")
+LAST_ALERT_TS = Gauge("last_alert_ts","Unix timestamp of last alert", registry=REG, multiprocess_mode="max")
+PERSON_COUNT = Gauge("person_count","People count per camera", ["camera_id"], registry=REG, multiprocess_mode="mostrecent")
 DEDUPED_ALERTS = Counter("deduped_alerts_total","Alerts suppressed by dedupe", registry=REG)
 CLIP_UPLOADS = Counter("clip_uploads_total","Clips uploaded", registry=REG)
 CLIP_FAILURES = Counter("clip_failures_total","Clip creations that failed", registry=REG)
+CLIP_JOB_SECONDS = Histogram("clip_job_seconds","Clip job latency by stage", ["stage"], registry=REG,
+                             buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60))
+CLIP_JOBS_PENDING = Gauge("clip_jobs_pending","Clip jobs queued or running", registry=REG, multiprocess_mode="livesum")
 CORR_GROUPS = Counter("alert_correlation_groups_total","Correlation summaries posted", registry=REG)
+# capture_* stages start from the frame's capture time on the edge (wall clock; assumes NTP-synced hosts)
+PIPELINE_SECONDS = Histogram("pipeline_stage_seconds","Latency per pipeline stage", ["stage"], registry=REG,
+                             buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+STAGE = {k: PIPELINE_SECONDS.labels(k) for k in ("network", "capture_to_ingest", "ingest", "rules", "capture_to_alert",
+                                                   "notify", "capture_to_notify", "capture_to_clip")}
+# camera freshness: time() - camera_health_checked_timestamp is the age of the cached status
+CAMERA_UP = Gauge("camera_up","1 if the camera's last health probe succeeded", ["camera_id"], registry=REG,
+                  multiprocess_mode="mostrecent")
+CAMERA_CHECKED_TS = Gauge("camera_health_checked_timestamp","Unix time of the camera's last health probe", ["camera_id"],
+                          registry=REG, multiprocess_mode="max")
+CAMERA_LAST_OK_TS = Gauge("camera_health_last_ok_timestamp","Unix time the camera last answered a probe", ["camera_id"],
+                          registry=REG, multiprocess_mode="max")
+CAMERA_PROBE_SECONDS = Histogram("camera_health_probe_seconds","Camera health probe latency", registry=REG,
+                                 buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5))
 
 @app.get("/metrics")
 def metrics():
     if not PROM_ENABLED: return Response("metrics disabled", media_type="text/plain")
+    if PROM_MULTIPROC:
+        reg = CollectorRegistry(); multiprocess.MultiProcessCollector(reg)
+        return Response(content=generate_latest(reg), media_type=CONTENT_TYPE_LATEST)
     return Response(content=generate_latest(REG), media_type=CONTENT_TYPE_LATEST)
 
-notifier = Notifier(enabled=ENABLE_NOTIFICATIONS)
-heatmaps = HeatmapAggregator()
-
-# WebSocket manager
-class ConnectionManager:
-    def __init__(self) -> None: self.active: List[WebSocket] = []
-    async def connect(self, ws: WebSocket):
-        await ws.accept(); self.active.append(ws); WS_CLIENTS.set(len(self.active))
-    def disconnect(self, ws: WebSocket):
-        if ws in self.active: self.active.remove(ws); WS_CLIENTS.set(len(self.active))
-    async def broadcast(self, data: Dict[str, Any]):
-        alive = []
-        for ws in self.active:
-            try: await ws.send_json(data); alive.append(ws)
-            except Exception: pass
-        self.active = alive; WS_CLIENTS.set(len(self.active))
-
-manager = ConnectionManager()
+def _notify_sent(msg):
+    STAGE["notify"].observe(time.monotonic() - msg.created)
+    if msg.origin: STAGE["capture_to_notify"].observe(max(0.0, time.time() - msg.origin))
+
+notifier = Notifier(enabled=ENABLE_NOTIFICATIONS, on_sent=_notify_sent)
+
+def _camera_checked(cam_id: str, res: Optional[Dict[str, Any]]):
+    gauges = (CAMERA_UP, CAMERA_CHECKED_TS, CAMERA_LAST_OK_TS)
+    if res is None:  # camera removed
+        for g in gauges:
+            try: g.remove(cam_id)
+            except KeyError: pass
+        return
+    if res["status"] == "unconfigured": return
+    CAMERA_UP.labels(cam_id).set(res["status"] == "ok"); CAMERA_CHECKED_TS.labels(cam_id).set(res["checked"])
+    if res["last_ok"]: CAMERA_LAST_OK_TS.labels(cam_id).set(res["last_ok"])
+    if "latency_ms" in res: CAMERA_PROBE_SECONDS.observe(res["latency_ms"] / 1000)
+    if cluster.enabled: bus.publish("health", {"w": cluster.index, "id": cam_id, "res": res})
+
+camera_health = HealthMonitor(cameras, on_result=_camera_checked, owns=cluster.owns)
+
+def _clip_finished(job: Dict[str, Any]):
+    if job["status"] == "done":
+        CLIP_UPLOADS.inc()
+        for stage in ("queue", "encode", "upload"): CLIP_JOB_SECONDS.labels(stage).observe(job[f"{stage}_ms"] / 1000)
+        CLIP_JOB_SECONDS.labels("total").observe(job["finished"] - job["created"])
+        STAGE["capture_to_clip"].observe(max(0.0, job["finished"] - job["ts"]))
+    elif job["status"] == "failed":
+        print("clip failed:", job["error"]); CLIP_FAILURES.inc()
+    # "skipped": nothing recorded for the camera (no HLS segments, e.g. mock mode), not a failure
+    CLIP_JOBS_PENDING.set(clips.pending())
+
+clips = ClipJobs(encode=generate_clip_and_gif,
+                 upload=lambda cam, mp4, seconds, gif: upload_clip_and_gif(cam, mp4, seconds=seconds, gif_path=gif),
+                 on_finish=_clip_finished)
+heatmaps = HeatmapAggregator(owns=cluster.owns)
+segments.owns = cluster.owns
+zones = ZoneEngine(get_zone, get_homography)
+
+# WebSocket fan-out (per-client queues + writer tasks, see services/broadcaster.py)
+manager = Broadcaster(on_count=WS_CLIENTS.set)
+
+# --- cross-worker events: every worker applies what another one did (its own messages are skipped) ---
+def _remote(handler):
+    def on_message(msg):
+        if msg.get("w") != cluster.index: handler(msg)
+    return on_message
+
+def _remote_alert(msg):
+    alert_store.memory.add(msg["alert"])  # recent-alert queries on this worker; the owner persisted it
+    manager.publish({"event": "alert", "payload": msg["alert"]})
+
+def _remote_camera(msg):
+    cameras.apply(msg["id"], msg["camera"])
+    if msg["camera"] is None: camera_health.forget(msg["id"])
+    else: camera_health.kick(msg["id"])
+
+bus.subscribe("alert", _remote(_remote_alert))
+bus.subscribe("zone", _remote(lambda msg: zones.invalidate(msg["camera_id"])))
+bus.subscribe("camera", _remote(_remote_camera))
+bus.subscribe("health", _remote(lambda msg: camera_health.apply(msg["id"], msg["res"])))
 
 @app.on_event("startup")
 async def on_startup():
     init_db()
-    if MODE == "mock": asyncio.create_task(mock_alerts())
+    await bus.start(); await cluster.start()
+    persist.start()
+    await asyncio.to_thread(cameras.load)  # the health monitor keeps retrying if the database is down
+    await camera_health.start()
+    await notifier.dispatcher.start()
+    segments.start()
+    if MODE == "mock" and cluster.index == 0: asyncio.create_task(mock_alerts())
+    asyncio.create_task(snapshot_heatmaps())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    clips.close(); segments.stop()
+    await camera_health.close()
+    try: await asyncio.to_thread(heatmaps.snapshot)
+    except Exception as e: print("heatmap snapshot failed:", e)  # still flush the write-behind queue below
+    await asyncio.to_thread(persist.stop)
+    await notifier.dispatcher.close()
+    await cluster.close(); await bus.close()
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "mode": MODE, "prometheus": PROM_ENABLED, "db": DB_OK()}
+    return {"status": "ok", "mode": MODE, "prometheus": PROM_ENABLED, "db": DB_OK(), "persist": persist.stats(),
+            "cameras": camera_health.stats(), "worker": cluster.index, "pubsub": bus.stats()}
+
+@app.get("/cluster")
+def cluster_info():
+    # ring parameters and worker URLs: a client that hashes camera_id the same way posts to the owner directly
+    return cluster.describe()
 
 # --- Cameras ---
 @app.get("/cameras", response_model=List[CameraOut])
 def list_cameras():
-    return [dict(id=k, **v) for k, v in CAMERAS.items()]
+    return [dict(id=k, **v) for k, v in cameras.items()]
 
 @app.post("/cameras", response_model=CameraOut, dependencies=[Depends(require_write)])
 async def add_camera(cam: Camera, request: Request):
     await maybe_require_oidc(request)
-    cam_id = f"cam_{len(CAMERAS)+1}"
-    CAMERAS[cam_id] = cam.model_dump()
+    try: cam_id = await asyncio.to_thread(cameras.add, cam.model_dump())
+    except RegistryUnavailable as e: raise HTTPException(503, str(e))
+    camera_health.kick(cam_id)
+    bus.publish("camera", {"w": cluster.index, "id": cam_id, "camera": cam.model_dump()})
     return dict(id=cam_id, **cam.model_dump())
 
+@app.put("/cameras/{camera_id}", response_model=CameraOut, dependencies=[Depends(require_write)])
+async def update_camera(camera_id: str, cam: Camera, request: Request):
+    await maybe_require_oidc(request)
+    try: found = await asyncio.to_thread(cameras.update, camera_id, cam.model_dump())
+    except RegistryUnavailable as e: raise HTTPException(503, str(e))
+    if not found: raise HTTPException(404, "unknown camera")
+    camera_health.kick(camera_id)
+    bus.publish("camera", {"w": cluster.index, "id": camera_id, "camera": cam.model_dump()})
+    return dict(id=camera_id, **cam.model_dump())
+
+@app.delete("/cameras/{camera_id}", dependencies=[Depends(require_write)])
+async def delete_camera(camera_id: str, request: Request):
+    await maybe_require_oidc(request)
+    try: found = await asyncio.to_thread(cameras.remove, camera_id)
+    except RegistryUnavailable as e: raise HTTPException(503, str(e))
+    if not found: raise HTTPException(404, "unknown camera")
+    camera_health.forget(camera_id)
+    bus.publish("camera", {"w": cluster.index, "id": camera_id, "camera": None})
+    return {"ok": True}
+
 @app.get("/cameras/discover", dependencies=[Depends(require_write)])
 async def discover(request: Request):
     await maybe_require_oidc(request)
-    return {"devices": onvif_discover()}
+    # WS-Discovery blocks for its whole listen window: keep it off the event loop
+    return {"devices": await asyncio.to_thread(onvif_discover)}
 
 @app.get("/cameras/health")
 def cams_health():
-    return camera_health(CAMERAS)
+    # cached results of the background probes (services/cameras.py); age_s says how old each one is
+    return camera_health.snapshot()
 
 # --- Zones (ROI) ---
 @app.get("/zones/{camera_id}", response_model=Optional[Zone])
@@ -146,6 +277,8 @@ async def put_zone_api(camera_id: str, zone: Zone, request: Request):
     if zone.camera_id != camera_id:
         raise HTTPException(400, "camera_id mismatch")
     save_zone(zone.model_dump())
+    zones.invalidate(camera_id)
+    bus.publish("zone", {"w": cluster.index, "camera_id": camera_id})
     return {"ok": True}
 
 # --- Homography ---
@@ -158,62 +291,187 @@ async def put_h_api(camera_id: str, payload: HomographyIn, request: Request):
     await maybe_require_oidc(request)
     if payload.camera_id != camera_id: raise HTTPException(400, "camera_id mismatch")
     save_homography(payload.model_dump())
+    zones.invalidate(camera_id)
+    bus.publish("zone", {"w": cluster.index, "camera_id": camera_id})
     return {"ok": True}
 
 # --- Alerts ---
 @app.get("/alerts", response_model=List[Alert])
-def list_alerts(limit: int = 100):
-    if DB_OK():
-        return get_alerts_db(limit)
-    return ALERTS_CACHE[-limit:]
+def list_alerts(response: Response, limit: int = 100, camera_id: Optional[str] = None, type: Optional[str] = None,
+                since: Optional[float] = None, until: Optional[float] = None, cursor: Optional[str] = None):
+    # newest `limit` matches, oldest-first; X-Next-Cursor pages further back in time
+    try: items, next_cursor = alert_store.query(camera_id, type, since, until, max(1, min(limit, 1000)), cursor)
+    except ValueError as e: raise HTTPException(400, str(e))
+    if next_cursor: response.headers["X-Next-Cursor"] = next_cursor
+    return items
 
 @app.websocket("/ws/alerts")
-async def ws_alerts(ws: WebSocket):
-    await manager.connect(ws)
+async def ws_alerts(ws: WebSocket, camera_id: Optional[str] = None, type: Optional[str] = None):
+    # ?camera_id=cam_1,cam_2&type=gun filters; a client can change them later with
+    # {"subscribe": {"camera_id": [...], "type": [...]}}
+    client = await manager.connect(ws, cameras=camera_id, types=type)
     try:
-        while True: await asyncio.sleep(60)
-    except WebSocketDisconnect: manager.disconnect(ws)
+        while True:
+            try: msg = json.loads(await ws.receive_text())
+            except ValueError: continue
+            sub = msg.get("subscribe") if isinstance(msg, dict) else None
+            if isinstance(sub, dict): client.subscribe(sub.get("camera_id"), sub.get("type"))
+    except WebSocketDisconnect: pass
+    finally: manager.disconnect(ws)
 
 # --- Ingest (from edge agent) ---
+def _arrived(request: Request) -> Dict[str, float]:
+    """Stage timestamps known when a request comes in; observes the edge -> backend network leg."""
+    now = time.time(); st = {"ingest": now}
+    try: st["sent"] = float(request.headers[SENT_AT_HEADER])
+    except (KeyError, ValueError): pass
+    else: STAGE["network"].observe(max(0.0, now - st["sent"]))
+    return st
+
+async def _evaluate(cam_id: str, ts: float, persons, st: Dict[str, float]):
+    STAGE["capture_to_ingest"].observe(max(0.0, st["ingest"] - ts))
+    t0 = time.perf_counter()
+    found = zones.evaluate(cam_id, ts, persons)
+    STAGE["rules"].observe(time.perf_counter() - t0)
+    for a in found: await emit_alert(Alert(**a, stages=dict(st, capture=ts, decision=time.time())))
+
+def _sharded(request: Request) -> bool:
+    # forwarded requests were already routed by the ring: never bounce them again. Only the private
+    # listener can carry one; on the public port the header is a client's and proves nothing.
+    if not cluster.enabled: return False
+    return FORWARDED_HEADER not in request.headers or not cluster.private(request.scope.get("server"))
+
 @app.post("/ingest/detections", dependencies=[Depends(require_write)])
 async def ingest(d: DetectionIn, request: Request):
     await maybe_require_oidc(request)
+    if _sharded(request) and not cluster.owns(d.camera_id):
+        if not await cluster.forward(cluster.owner(d.camera_id), "/ingest/detections", await request.body(), request.headers):
+            raise HTTPException(502, "owner worker unavailable")
+        return {"ok": True, "forwarded": True}
+    st = _arrived(request); t0 = time.perf_counter()
     PERSON_COUNT.labels(d.camera_id).set(len(d.persons))
     heatmaps.add(d.camera_id, d.persons)
+    persist.add_detections(d.camera_id, d.ts, len(d.persons))
+    await _evaluate(d.camera_id, d.ts, d.persons, st)
+    STAGE["ingest"].observe(time.perf_counter() - t0)
     return {"ok": True}
 
+@app.post("/ingest/batch", dependencies=[Depends(require_write)])
+async def ingest_batch(request: Request):
+    # many frames from many cameras in one packed body (see services/batch_ingest.py)
+    await maybe_require_oidc(request)
+    st = _arrived(request); t0 = time.perf_counter()
+    try: batch = decode_batch(await request.body())
+    except ValueError as e: raise HTTPException(400, str(e))
+    n_frames = batch.n_frames; unsent = None
+    if _sharded(request):
+        # frames of cameras another worker owns go to it first. Parts that were taken stay taken: if an
+        # owner is down, the response is a 502 whose body is just the frames it did not get (as a batch),
+        # and the agent journals and retries those instead of the whole batch (which would ingest the
+        # other cameras' frames twice).
+        groups = cluster.group(batch.cams)
+        mine = groups.pop(cluster.index, [])
+        if groups:
+            parts = [(i, batch.subset(cams)) for i, cams in groups.items()]
+            ok = await asyncio.gather(*(cluster.forward(i, "/ingest/batch", b.encode(), request.headers, b.n_frames)
+                                        for i, b in parts))
+            failed = [c for (i, _), taken in zip(parts, ok) if not taken for c in groups[i]]
+            if failed: unsent = batch.subset(failed); n_frames -= unsent.n_frames
+            batch = batch.subset(mine)
+    if request.headers.get(REPLAY_HEADER) == "1":
+        # backfill from an agent's offline journal: history only; gauges, heatmaps and zone rules are live state
+        for cam_id, ts, boxes in batch.iter_frames(): persist.add_detections(cam_id, ts, len(boxes), backfill=True)
+        if unsent: return Response(content=unsent.encode(), status_code=502, media_type=CONTENT_TYPE)
+        return {"ok": True, "frames": n_frames, "replay": True}
+    for cam_id, (_, count, boxes) in batch.per_camera().items():
+        PERSON_COUNT.labels(cam_id).set(count)
+        heatmaps.add(cam_id, boxes[:, :4].tolist())
+    for cam_id, ts, boxes in batch.iter_frames():
+        persist.add_detections(cam_id, ts, len(boxes))
+        await _evaluate(cam_id, ts, boxes, st)
+    STAGE["ingest"].observe(time.perf_counter() - t0)
+    if unsent: return Response(content=unsent.encode(), status_code=502, media_type=CONTENT_TYPE)
+    return {"ok": True, "frames": n_frames}
+
+# --- Clip jobs ---
+@app.get("/clips/jobs")
+def clip_jobs(limit: int = 50):
+    return {"stats": clips.stats(), "jobs": clips.list(max(1, min(limit, 200)))}
+
+@app.get("/clips/jobs/{job_id}")
+def clip_job(job_id: str):
+    job = clips.get(job_id)
+    if not job: raise HTTPException(404, "Not found")
+    return job
+
 # --- Heatmap ---
 @app.get("/analytics/heatmap/{camera_id}.png")
-def heatmap_png(camera_id: str):
-    png = heatmaps.to_png(camera_id)
-    return Response(content=png, media_type="image/png")
+async def heatmap_png(camera_id: str, request: Request, window: str = "1h"):
+    # window: 5m | 1h | 24h (rolling) or live (exponentially decaying)
+    if not cluster.owns(camera_id):
+        # the grid lives on the worker that ingests this camera
+        inm = request.headers.get("if-none-match")
+        try: r = await cluster.client.get(cluster.url(cluster.owner(camera_id)) + request.url.path, params=request.query_params,
+                                          headers={"If-None-Match": inm} if inm else None)
+        except Exception as e: raise HTTPException(502, f"owner worker unavailable: {e}")
+        return Response(content=r.content, status_code=r.status_code, media_type=r.headers.get("content-type"),
+                        headers={k: v for k, v in r.headers.items() if k.lower() in ("etag", "cache-control")})
+    try: png, etag = await asyncio.to_thread(heatmaps.render, camera_id, window)
+    except ValueError as e: raise HTTPException(400, str(e))
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag: return Response(status_code=304, headers=headers)
+    return Response(content=png, media_type="image/png", headers=headers)
+
+async def snapshot_heatmaps():
+    while True:
+        await asyncio.sleep(HEATMAP_SNAPSHOT_SECONDS)
+        try: await asyncio.to_thread(heatmaps.snapshot)
+        except Exception as e: print("heatmap snapshot failed:", e)
+
+# --- Profiling (opt-in: PROFILE_ENABLED=true) ---
+@app.get("/debug/profile", dependencies=[Depends(require_write)])
+async def debug_profile(request: Request, seconds: float = 5.0, thread: Optional[str] = None, idle: bool = False):
+    # sampled stacks of the API process: thread=MainThread is the event loop (ingest, rules, alert path)
+    await maybe_require_oidc(request)
+    if not profiler.PROFILE_ENABLED: raise HTTPException(404, "profiling disabled")
+    try: return await asyncio.to_thread(profiler.sample, max(0.1, seconds), thread=thread, idle=idle)
+    except RuntimeError as e: raise HTTPException(409, str(e))
+
+# --- Alert path (shared by the zone engine and the mock generator) ---
+async def emit_alert(a: Alert) -> bool:
+    """Notify (with dedupe/correlation), store, broadcast and queue a clip for one alert."""
+    sent, thread_ts, corr_posted = await notifier.maybe_send_with_blocks(a.model_dump())
+    if not sent:
+        DEDUPED_ALERTS.inc()
+        return False
+    if corr_posted:
+        CORR_GROUPS.inc()
+    STAGE["capture_to_alert"].observe(max(0.0, time.time() - a.ts))
+    alert_store.add(a.model_dump())
+    ALERTS_TOTAL.labels(a.type).inc(); LAST_ALERT_TS.set(a.ts)
+    manager.publish({"event": "alert", "payload": a.model_dump()})
+    if cluster.enabled: bus.publish("alert", {"w": cluster.index, "alert": a.model_dump()})
+    # Clip + GIF: cut and uploaded on the clip worker pool, posted to the alert's thread when ready
+    job = clips.submit(a.camera_id, a.ts, seconds=6,
+                       callback=lambda urls, t=thread_ts: notifier.post_thread_message_blocks(urls, thread_ts=t))
+    if job["status"] == "rejected": CLIP_FAILURES.inc()
+    CLIP_JOBS_PENDING.set(clips.pending())
+    return True
 
 # --- Mock alert generator (demonstrates notify + clip + correlation) ---
 async def mock_alerts():
     types = ["gun","knife","intruder","loitering","fight","crowd","distance","distress_audio","fire","ppe","vehicle","fall","line_cross","zone_intrusion"]
     while True:
         await asyncio.sleep(3.0)
-        if not CAMERAS:
-            CAMERAS["cam_1"] = {"name": "Demo Cam 1", "rtsp_url": None, "location": "Demo"}
-            CAMERAS["cam_2"] = {"name": "Demo Cam 2", "rtsp_url": None, "location": "Demo"}
-        cam_id = random.choice(list(CAMERAS.keys()))
+        if not len(cameras):
+            try:
+                for i in (1, 2):
+                    cam = Camera(name=f"Demo Cam {i}", location="Demo")
+                    cam_id = await asyncio.to_thread(cameras.add, cam.model_dump(), f"cam_{i}")
+                    camera_health.kick(cam_id)
+                    bus.publish("camera", {"w": cluster.index, "id": cam_id, "camera": cam.model_dump()})
+            except RegistryUnavailable: pass
+        cam_id = random.choice(cameras.ids() or ["cam_1", "cam_2"])
         a = Alert(type=random.choice(types), camera_id=cam_id, confidence=round(random.uniform(0.55,0.98),2), message="Auto-generated demo alert", ts=time.time())
-        sent, thread_ts, corr_posted = notifier.maybe_send_with_blocks(a.model_dump())
-        if not sent:
-            DEDUPED_ALERTS.inc()
-            continue
-        if corr_posted:
-            CORR_GROUPS.inc()
-        ALERTS_CACHE.append(a.model_dump())
-        ALERTS_TOTAL.labels(a.type).inc(); LAST_ALERT_TS.set(a.ts)
-        save_alert(a.model_dump())
-        await manager.broadcast({"event": "alert", "payload": a.model_dump()})
-        # Clip + GIF
-        try:
-            clip_path = generate_clip_precise(camera_id=cam_id, seconds=6)
-            if clip_path:
-                urls = upload_clip_and_gif(camera_id=cam_id, clip_path=clip_path, seconds=6)
-                notifier.post_thread_message_blocks(urls, thread_ts=thread_ts)
-                CLIP_UPLOADS.inc()
-        except Exception as e:
-            print("clip failed:", e); CLIP_FAILURES.inc()
+        try: await emit_alert(a)
+        except Exception as e: print("mock alert failed:", e)  # keep generating
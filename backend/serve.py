@@ -0,0 +1,87 @@
+"""Run the API server, single process or multi-worker.
+
+    WORKERS=1 python serve.py     same as `uvicorn api.main:app --host $API_HOST --port $API_PORT`
+    WORKERS=4 python serve.py     4 worker processes sharing $API_PORT, ingest sharded by camera_id
+
+With WORKERS > 1 this process is only a supervisor. It binds the public socket once and starts each
+worker with the socket inherited, WORKER_INDEX set and a private port WORKER_BASE_PORT + index. Those
+ports are used to forward ingest to the camera's owner (services/cluster.py). Prometheus runs in
+multiprocess mode over a shared PROMETHEUS_MULTIPROC_DIR. Cross-worker events go over Redis when
+PUBSUB_URL / REDIS_URL is set; otherwise the supervisor runs a local Unix-socket broker. A worker that
+dies is restarted with the same index, so it owns the same cameras.
+"""
+import asyncio, glob, os, signal, socket, subprocess, sys, tempfile, threading, time
+
+API_HOST = os.getenv("API_HOST", "0.0.0.0")
+API_PORT = int(os.getenv("API_PORT", "8000"))
+WORKERS = int(os.getenv("WORKERS", "1"))
+LOG_LEVEL = os.getenv("LOG_LEVEL", "info")
+
+def run_worker(index: int, fd: int):
+    import uvicorn
+    from services.cluster import WORKER_HOST, WORKER_BASE_PORT
+    public = socket.socket(fileno=fd)
+    # explicit IPPROTO_TCP: asyncio only sets TCP_NODELAY on connections of sockets that say so (without
+    # it every response waits out the client's delayed ACK, ~40 ms)
+    private = socket.socket(socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    private.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    private.bind((WORKER_HOST, WORKER_BASE_PORT + index)); private.listen(2048)
+    config = uvicorn.Config("api.main:app", log_level=LOG_LEVEL, access_log=False)
+    uvicorn.Server(config).run(sockets=[public, private])
+
+def _broker(path: str):
+    from services.pubsub import serve_broker
+    threading.Thread(target=lambda: asyncio.run(serve_broker(path)), daemon=True, name="pubsub-broker").start()
+    for _ in range(50):
+        if os.path.exists(path): return
+        time.sleep(0.05)
+
+def supervise(workers: int):
+    from prometheus_client import multiprocess
+    env = dict(os.environ, WORKERS=str(workers))
+    run_dir = tempfile.mkdtemp(prefix="sva-")
+    prom_dir = env.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(run_dir, "prometheus"))
+    os.makedirs(prom_dir, exist_ok=True)
+    for f in glob.glob(os.path.join(prom_dir, "*.db")): os.remove(f)  # counters from a previous run
+    if not env.get("PUBSUB_URL") and not env.get("REDIS_URL"):
+        env["PUBSUB_URL"] = "unix://" + os.path.join(run_dir, "pubsub.sock")
+        _broker(env["PUBSUB_URL"][len("unix://"):])
+    journal = env.get("PERSIST_JOURNAL_DIR", "/tmp/sva_journal")
+
+    sock = socket.create_server((API_HOST, API_PORT), backlog=2048)
+    sock.set_inheritable(True)
+
+    def spawn(i: int) -> subprocess.Popen:
+        # each worker spills to its own journal directory: replay must not race another worker's
+        wenv = dict(env, WORKER_INDEX=str(i), PERSIST_JOURNAL_DIR=os.path.join(journal, f"worker-{i}"))
+        return subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker", str(i), str(sock.fileno())],
+                                env=wenv, pass_fds=[sock.fileno()], cwd=os.path.dirname(os.path.abspath(__file__)))
+
+    procs = {i: spawn(i) for i in range(workers)}
+    print(f"serve: {workers} workers on {API_HOST}:{API_PORT} (pids {[p.pid for p in procs.values()]})", flush=True)
+    stopping = False
+
+    def stop(*_):
+        nonlocal stopping
+        stopping = True
+        for p in procs.values(): p.terminate()
+    signal.signal(signal.SIGTERM, stop); signal.signal(signal.SIGINT, stop)
+    while not stopping:
+        time.sleep(0.5)
+        for i, p in list(procs.items()):
+            if p.poll() is None or stopping: continue
+            print(f"serve: worker {i} (pid {p.pid}) exited with {p.returncode}, restarting", flush=True)
+            multiprocess.mark_process_dead(p.pid, prom_dir)
+            procs[i] = spawn(i)
+    for p in procs.values():
+        try: p.wait(timeout=30)
+        except subprocess.TimeoutExpired: p.kill()
+
+if __name__ == "__main__":
+    if sys.argv[1:2] == ["--worker"]:
+        run_worker(int(sys.argv[2]), int(sys.argv[3]))
+    elif WORKERS <= 1:
+        import uvicorn
+        uvicorn.run("api.main:app", host=API_HOST, port=API_PORT, log_level=LOG_LEVEL)
+    else:
+        supervise(WORKERS)
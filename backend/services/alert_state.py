@@ -0,0 +1,234 @@
+import asyncio, heapq, os, threading, time
+from typing import Any, Dict, Optional, Set
+
+# Dedupe / thread / correlation state for the Notifier behind one small async interface:
+#   await claim(key, ttl)            -> True for exactly one caller until the key expires (SET NX PX)
+#   await get(key) / await set(key, v, ttl)
+#   await correlate(type, cam, window) -> cameras that saw `type` in the last `window` seconds
+# MemoryAlertState is per-process with TTL eviction from an expiry heap. RedisAlertState shares the
+# state between API replicas, so a (camera, type) alert is posted once no matter which replica got it.
+# It talks to Redis through redis.asyncio, so a slow Redis delays that alert's decision but never the
+# event loop, and every call is capped at REDIS_TIMEOUT_SECONDS; while Redis is slow or unreachable it
+# falls back to a MemoryAlertState of its own (dedupe per replica) rather than failing the alert path.
+# FakeRedis implements the handful of commands it uses for tests and single-process runs.
+REDIS_URL = os.getenv("REDIS_URL", "").strip()
+REDIS_RETRY_SECONDS = float(os.getenv("REDIS_RETRY_SECONDS", "10"))
+REDIS_TIMEOUT_SECONDS = float(os.getenv("REDIS_TIMEOUT_SECONDS", "0.5"))
+CORRELATE_BUCKETS = int(os.getenv("ALERT_CORRELATE_BUCKETS", "6"))
+
+try:
+    from redis import RedisError
+except ImportError:  # only FakeRedis / in-process state without redis-py
+    RedisError = ConnectionError
+REDIS_ERRORS = (RedisError, OSError, asyncio.TimeoutError)
+
+class MemoryAlertState:
+    def __init__(self, clock=time.time, buckets: int = CORRELATE_BUCKETS):
+        self.clock = clock
+        self.buckets = buckets
+        self.data: Dict[str, Any] = {}
+        self.expiry: Dict[str, float] = {}
+        self.heap: list = []   # (expires_at, key); stale entries are skipped when popped
+        self.lock = threading.Lock()
+
+    def _evict(self, now: float):
+        h = self.heap
+        while h and h[0][0] <= now:
+            exp, key = heapq.heappop(h)
+            if self.expiry.get(key) == exp:
+                del self.expiry[key]; self.data.pop(key, None)
+
+    def _put(self, key: str, value: Any, ttl: float, now: float):
+        self.data[key] = value
+        self.expiry[key] = now + ttl
+        heapq.heappush(self.heap, (now + ttl, key))
+
+    def __len__(self):
+        with self.lock:
+            self._evict(self.clock()); return len(self.data)
+
+    # the async interface only wraps these: nothing in here waits on anything but the lock
+    async def claim(self, key: str, ttl: float) -> bool:
+        return self._claim(key, ttl)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._get(key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        self._set(key, value, ttl)
+
+    async def correlate(self, typ: str, camera_id: str, window: float) -> Set[str]:
+        return self._correlate(typ, camera_id, window)
+
+    def _claim(self, key: str, ttl: float) -> bool:
+        with self.lock:
+            now = self.clock(); self._evict(now)
+            if key in self.data: return False
+            self._put(key, 1, ttl, now); return True
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self.lock:
+            self._evict(self.clock()); return self.data.get(key)
+
+    def _set(self, key: str, value: Any, ttl: float):
+        with self.lock:
+            now = self.clock(); self._evict(now); self._put(key, value, ttl, now)
+
+    def _correlate(self, typ: str, camera_id: str, window: float) -> Set[str]:
+        # sliding window over `buckets` time buckets: an alert stays correlated for `window` seconds after
+        # it happened, instead of the whole group resetting `window` seconds after its first alert
+        width = window / self.buckets
+        with self.lock:
+            now = self.clock(); self._evict(now)
+            b = int(now // width)
+            key = f"corr:{typ}:{b}"
+            cams = self.data.get(key)
+            if cams is None:
+                cams = set(); self._put(key, cams, window + width, now)
+            cams.add(camera_id)
+            out: Set[str] = set()
+            for k in range(b - self.buckets, b + 1): out |= self.data.get(f"corr:{typ}:{k}", set())
+            return out
+
+    def mapping(self, prefix: str, ttl: float) -> "StateMapping":
+        return StateMapping(self, prefix, ttl)
+
+class RedisAlertState:
+    """Shared state on an asyncio Redis client (redis.asyncio.Redis or FakeRedis). A Redis error, or a call
+    that takes longer than `timeout`, switches every call to the in-process `fallback` for `retry_seconds`
+    (so an outage costs one timeout per retry period, not one per alert), then Redis is tried again."""
+    def __init__(self, client, clock=time.time, buckets: int = CORRELATE_BUCKETS, namespace: str = "sva:",
+                 retry_seconds: float = REDIS_RETRY_SECONDS, timeout: float = REDIS_TIMEOUT_SECONDS):
+        self.r = client
+        self.clock = clock
+        self.buckets = buckets
+        self.ns = namespace
+        self.retry_seconds = retry_seconds
+        self.timeout = timeout
+        self.fallback = MemoryAlertState(clock, buckets)
+        self.down_until = 0.0  # time.monotonic() before which Redis is not tried
+        self.errors = 0
+
+    async def _call(self, op: str, *args):
+        if time.monotonic() >= self.down_until:
+            try: return await asyncio.wait_for(getattr(self, "_redis_" + op)(*args), self.timeout)
+            except REDIS_ERRORS as e:
+                self.errors += 1; self.down_until = time.monotonic() + self.retry_seconds
+                print(f"alert state: redis unavailable, using in-process state for {self.retry_seconds:g}s:",
+                      str(e) or type(e).__name__)
+        return await getattr(self.fallback, op)(*args)
+
+    @property
+    def degraded(self) -> bool:
+        return time.monotonic() < self.down_until
+
+    async def claim(self, key: str, ttl: float) -> bool:
+        return await self._call("claim", key, ttl)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await self._call("get", key)
+
+    async def set(self, key: str, value: Any, ttl: float):
+        await self._call("set", key, value, ttl)
+
+    async def correlate(self, typ: str, camera_id: str, window: float) -> Set[str]:
+        return await self._call("correlate", typ, camera_id, window)
+
+    async def _redis_claim(self, key: str, ttl: float) -> bool:
+        return bool(await self.r.set(self.ns + key, 1, nx=True, px=int(ttl * 1000)))
+
+    async def _redis_get(self, key: str) -> Optional[Any]:
+        v = await self.r.get(self.ns + key)
+        return v.decode() if isinstance(v, bytes) else v
+
+    async def _redis_set(self, key: str, value: Any, ttl: float):
+        await self.r.set(self.ns + key, value, px=int(ttl * 1000))
+
+    async def _redis_correlate(self, typ: str, camera_id: str, window: float) -> Set[str]:
+        width = window / self.buckets
+        b = int(self.clock() // width)
+        key = f"{self.ns}corr:{typ}:{b}"
+        p = self.r.pipeline()
+        p.sadd(key, camera_id)
+        p.pexpire(key, int((window + width) * 1000))
+        p.sunion([f"{self.ns}corr:{typ}:{k}" for k in range(b - self.buckets, b + 1)])
+        cams = (await p.execute())[-1]
+        return {c.decode() if isinstance(c, bytes) else c for c in cams}
+
+    def mapping(self, prefix: str, ttl: float) -> "StateMapping":
+        return StateMapping(self, prefix, ttl)
+
+class StateMapping:
+    """Async key -> value view (await get / await set) over a state backend, with a TTL on every write."""
+    def __init__(self, state, prefix: str, ttl: float):
+        self.state = state
+        self.prefix = prefix
+        self.ttl = ttl
+
+    async def get(self, key, default=None):
+        v = await self.state.get(self.prefix + str(key))
+        return default if v is None else v
+
+    async def set(self, key, value):
+        await self.state.set(self.prefix + str(key), value, self.ttl)
+
+class FakeRedis:
+    """In-process stand-in for the redis.asyncio calls RedisAlertState makes (SET NX/PX, GET, SADD, PEXPIRE,
+    SUNION, pipeline). Several RedisAlertState instances sharing one FakeRedis behave like replicas.
+    `latency` seconds are awaited per command (per pipeline), like a remote or loaded Redis."""
+    def __init__(self, clock=time.time, latency: float = 0.0):
+        self.m = MemoryAlertState(clock)
+        self.latency = latency
+
+    async def _rtt(self):
+        if self.latency: await asyncio.sleep(self.latency)
+
+    async def set(self, key, value, nx: bool = False, px: Optional[int] = None):
+        await self._rtt()
+        ttl = px / 1000 if px else float("inf")
+        if nx: return self.m._claim(key, ttl) or None
+        self.m._set(key, value, ttl); return True
+
+    async def get(self, key):
+        await self._rtt()
+        return self.m._get(key)
+
+    def sadd(self, key, *values):
+        with self.m.lock:
+            now = self.m.clock(); self.m._evict(now)
+            s = self.m.data.get(key)
+            if s is None:
+                s = set(); self.m._put(key, s, float("inf"), now)
+            s.update(values)
+
+    def pexpire(self, key, ms: int):
+        with self.m.lock:
+            now = self.m.clock()
+            if key in self.m.data: self.m._put(key, self.m.data[key], ms / 1000, now)
+
+    def sunion(self, keys):
+        with self.m.lock:
+            self.m._evict(self.m.clock())
+            out = set()
+            for k in keys: out |= self.m.data.get(k, set())
+            return out
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+class _FakePipeline:
+    def __init__(self, r: FakeRedis): self.r = r; self.ops = []
+    def __getattr__(self, name):
+        return lambda *a, **kw: self.ops.append((name, a, kw))
+    async def execute(self):
+        # one round trip for the whole pipeline, like the real thing
+        await self.r._rtt()
+        return [getattr(self.r, name)(*a, **kw) for name, a, kw in self.ops]
+
+def make_alert_state(url: str = REDIS_URL):
+    """RedisAlertState when REDIS_URL is set (redis://...), else per-process MemoryAlertState."""
+    if not url: return MemoryAlertState()
+    if url == "fake://": return RedisAlertState(FakeRedis())
+    import redis.asyncio
+    return RedisAlertState(redis.asyncio.Redis.from_url(url, socket_timeout=REDIS_TIMEOUT_SECONDS,
+                                                        socket_connect_timeout=REDIS_TIMEOUT_SECONDS))
@@ -0,0 +1,135 @@
+import os, time
+from bisect import bisect_left, insort
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+
+ALERT_STORE_CAPACITY = int(os.getenv("ALERT_STORE_CAPACITY", "10000"))
+ALERT_RETENTION_SECONDS = float(os.getenv("ALERT_RETENTION_SECONDS", "0"))  # 0 = only capacity bounds the store
+
+Key = Tuple[float, int]  # (ts, seq): total order even for equal timestamps
+
+def encode_cursor(key: Key) -> str:
+    return f"{key[0]!r}:{key[1]}"
+
+def decode_cursor(cursor: str) -> Key:
+    try:
+        ts, seq = cursor.rsplit(":", 1)
+        return float(ts), int(seq)
+    except ValueError:
+        raise ValueError("invalid cursor")
+
+class MemoryAlertStore:
+    """Ring buffer of the newest `capacity` alerts with time-ordered secondary indexes.
+
+    Every index (all, camera_id, type, camera_id+type) is a list of (ts, seq) keys kept sorted by
+    time, so a query is a bisect for the time window plus a walk over the k results. Evicted keys
+    are skipped lazily and trimmed from the front of each index once enough of them pile up.
+    """
+    def __init__(self, capacity: int = ALERT_STORE_CAPACITY, retention: float = ALERT_RETENTION_SECONDS):
+        self.capacity = capacity
+        self.retention = retention
+        self.ring: List[Optional[Tuple[Key, Dict[str, Any]]]] = [None] * capacity
+        self.seq = 0
+        self.index: Dict[Any, List[Key]] = {}
+
+    def __len__(self):
+        return min(self.seq, self.capacity)
+
+    def _live(self, key: Key) -> bool:
+        if key[1] < self.seq - self.capacity: return False
+        return not self.retention or key[0] >= time.time() - self.retention
+
+    def add(self, alert: Dict[str, Any]):
+        key = (float(alert["ts"]), self.seq)
+        slot = self.seq % self.capacity
+        self.ring[slot] = (key, dict(alert))
+        self.seq += 1
+        cam, typ = alert["camera_id"], alert["type"]
+        for name in ("all", ("camera_id", cam), ("type", typ), ("camera_type", cam, typ)):
+            idx = self.index.setdefault(name, [])
+            if not idx or idx[-1] <= key: idx.append(key)
+            else: insort(idx, key)  # late alert: still O(log n) search, rare shift
+        if self.seq % self.capacity == 0: self._compact()
+
+    def _compact(self):
+        for name in list(self.index):
+            idx = self.index[name]
+            n = 0
+            while n < len(idx) and not self._live(idx[n]): n += 1
+            if n == len(idx): del self.index[name]
+            elif n: del idx[:n]
+
+    def _get(self, key: Key) -> Optional[Dict[str, Any]]:
+        entry = self.ring[key[1] % self.capacity]
+        return entry[1] if entry and entry[0] == key and self._live(key) else None
+
+    def query(self, camera_id: Optional[str] = None, type: Optional[str] = None, since: Optional[float] = None,
+              until: Optional[float] = None, limit: int = 100, cursor: Optional[str] = None):
+        """Newest `limit` alerts matching the filters, returned oldest-first like the old list tail.
+        The returned cursor continues with older alerts (None when there are no more)."""
+        if limit <= 0: return [], None
+        if camera_id and type: name = ("camera_type", camera_id, type)
+        elif camera_id: name = ("camera_id", camera_id)
+        elif type: name = ("type", type)
+        else: name = "all"
+        idx = self.index.get(name, [])
+        lo = bisect_left(idx, (since, -1)) if since is not None else 0
+        hi = bisect_left(idx, (until, float("inf"))) if until is not None else len(idx)
+        if cursor: hi = min(hi, bisect_left(idx, decode_cursor(cursor)))
+        out: List[Dict[str, Any]] = []
+        i = hi - 1
+        while i >= lo and len(out) < limit:
+            a = self._get(idx[i])
+            if a is not None: out.append(a)
+            i -= 1
+        next_cursor = encode_cursor(idx[i + 1]) if len(out) == limit and i >= lo else None
+        out.reverse()
+        return out, next_cursor
+
+class DbAlertStore:
+    """Same interface over the database's alerts table (filters, time window and a keyset cursor on
+    (ts, id) all in SQL); `table()` returns it (reflected from the database, see persist.py). Recent
+    alerts are also kept in a MemoryAlertStore so the API keeps answering (with identical semantics)
+    while the database is unavailable."""
+    def __init__(self, save_alert, engine, table, db_ok, memory: Optional[MemoryAlertStore] = None):
+        self.save_alert = save_alert
+        self.engine = engine
+        self.table = table
+        self.db_ok = db_ok
+        self.memory = memory or MemoryAlertStore()
+
+    def add(self, alert: Dict[str, Any]):
+        self.memory.add(alert)
+        self.save_alert(alert)
+
+    def query(self, camera_id=None, type=None, since=None, until=None, limit: int = 100, cursor=None):
+        if self.engine is None or not self.db_ok():
+            return self.memory.query(camera_id, type, since, until, limit, cursor)
+        if limit <= 0: return [], None
+        try:
+            return self._query(camera_id, type, since, until, limit, cursor)
+        except SQLAlchemyError as e:
+            print("alert query failed, answering from memory:", e)
+            return self.memory.query(camera_id, type, since, until, limit, cursor)
+
+    def _query(self, camera_id, type, since, until, limit: int, cursor):
+        t = self.table()
+        q = select(*(t.c[k] for k in ("id", "type", "camera_id", "confidence", "message", "ts")))
+        if camera_id: q = q.where(t.c.camera_id == camera_id)
+        if type: q = q.where(t.c.type == type)
+        if since is not None: q = q.where(t.c.ts >= since)
+        if until is not None: q = q.where(t.c.ts <= until)
+        if cursor:
+            # strictly older than the last row handed out; id breaks ties between equal timestamps
+            ts, rid = decode_cursor(cursor)
+            q = q.where(or_(t.c.ts < ts, and_(t.c.ts == ts, t.c.id < rid)))
+        q = q.order_by(t.c.ts.desc(), t.c.id.desc()).limit(limit + 1)
+        with self.engine.connect() as conn:
+            rows = [dict(r._mapping) for r in conn.execute(q)]
+        page = rows[:limit]
+        next_cursor = encode_cursor((page[-1]["ts"], page[-1]["id"])) if len(rows) > limit else None
+        for r in page: del r["id"]
+        page.reverse()
+        return page, next_cursor
@@ -0,0 +1,82 @@
+import struct
+from typing import Dict, List, Tuple
+import numpy as np
+
+# Wire format produced by edge_agent/wire.py (keep both in sync).
+#   header : magic "SVB1" | version u8 | width u8 | n_cams u16 | n_frames u32   (little-endian)
+#   cams   : n_cams x (len u8 + utf-8 camera_id)
+#   frames : n_frames x (cam u16, n u16, ts f64)
+#   boxes  : sum(n) x width float32, row-major [x1,y1,x2,y2,id,...]
+MAGIC = b"SVB1"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHI")
+FRAME_DTYPE = np.dtype([("cam", "<u2"), ("n", "<u2"), ("ts", "<f8")])
+CONTENT_TYPE = "application/x-sva-batch"
+REPLAY_HEADER = "X-SVA-Replay"  # batch is backfill from an edge agent's offline journal, not live
+SENT_AT_HEADER = "X-SVA-Sent-At"  # agent wall clock when the request left; frame ts is capture time
+MAX_FRAMES = 65536
+
+class Batch:
+    def __init__(self, cams: List[str], frames: np.ndarray, boxes: np.ndarray):
+        self.cams = cams
+        self.frames = frames
+        self.boxes = boxes
+
+    @property
+    def n_frames(self) -> int:
+        return len(self.frames)
+
+    def per_camera(self) -> Dict[str, Tuple[float, int, np.ndarray]]:
+        """camera_id -> (latest ts, person count in latest frame, all boxes of that camera)."""
+        row_cam = np.repeat(self.frames["cam"], self.frames["n"])
+        order = np.lexsort((self.frames["ts"], self.frames["cam"]))
+        out = {}
+        for ci, cam_id in enumerate(self.cams):
+            fr = order[self.frames["cam"][order] == ci]
+            if not len(fr): continue
+            last = self.frames[fr[-1]]
+            out[cam_id] = (float(last["ts"]), int(last["n"]), self.boxes[row_cam == ci])
+        return out
+
+    def subset(self, camera_ids) -> "Batch":
+        """The frames of the given cameras only (e.g. the part of a batch another worker owns)."""
+        wanted = set(camera_ids)
+        keep = [i for i, c in enumerate(self.cams) if c in wanted]
+        remap = np.zeros(max(len(self.cams), 1), dtype="<u2"); remap[keep] = np.arange(len(keep))
+        fmask = np.isin(self.frames["cam"], keep)
+        frames = self.frames[fmask].copy(); frames["cam"] = remap[frames["cam"]]
+        return Batch([self.cams[i] for i in keep], frames, self.boxes[np.repeat(fmask, self.frames["n"])])
+
+    def encode(self) -> bytes:
+        out = [HEADER.pack(MAGIC, VERSION, self.boxes.shape[1], len(self.cams), len(self.frames))]
+        for cam_id in self.cams:
+            b = cam_id.encode("utf-8"); out.append(bytes([len(b)]) + b)
+        out.append(self.frames.astype(FRAME_DTYPE).tobytes()); out.append(self.boxes.astype("<f4").tobytes())
+        return b"".join(out)
+
+    def iter_frames(self):
+        """(camera_id, ts, boxes) per frame, in time order."""
+        starts = np.concatenate([[0], np.cumsum(self.frames["n"], dtype=np.int64)])
+        for k in np.argsort(self.frames["ts"], kind="stable"):
+            f = self.frames[k]
+            yield self.cams[f["cam"]], float(f["ts"]), self.boxes[starts[k]:starts[k + 1]]
+
+def decode_batch(body: bytes) -> Batch:
+    if len(body) < HEADER.size: raise ValueError("batch too short")
+    magic, version, width, n_cams, n_frames = HEADER.unpack_from(body, 0)
+    if magic != MAGIC or version != VERSION: raise ValueError("bad batch header")
+    if width < 4 or n_frames > MAX_FRAMES: raise ValueError("bad batch dimensions")
+    off = HEADER.size
+    cams = []
+    for _ in range(n_cams):
+        if off >= len(body): raise ValueError("truncated camera table")
+        ln = body[off]; off += 1
+        cams.append(body[off:off+ln].decode("utf-8")); off += ln
+    end = off + n_frames * FRAME_DTYPE.itemsize
+    if end > len(body): raise ValueError("truncated frame table")
+    frames = np.frombuffer(body, dtype=FRAME_DTYPE, count=n_frames, offset=off)
+    if n_frames and frames["cam"].max() >= n_cams: raise ValueError("bad camera index")
+    n_rows = int(frames["n"].sum(dtype=np.int64))
+    if len(body) - end != n_rows * width * 4: raise ValueError("box payload size mismatch")
+    boxes = np.frombuffer(body, dtype="<f4", count=n_rows * width, offset=end).reshape(n_rows, width)
+    return Batch(cams, frames, boxes)
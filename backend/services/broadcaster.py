@@ -0,0 +1,108 @@
+import asyncio, json, os, time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Optional, Set
+
+# WebSocket fan-out: each event is serialised once and pushed into a bounded queue per client; every
+# client has its own writer task, so a slow dashboard only ever delays itself. A client whose queue is
+# full loses its oldest pending events (downsampling); one that stays full for `max_drops` events in a
+# row, or whose send takes longer than `send_timeout`, is disconnected.
+WS_QUEUE_MAX = int(os.getenv("WS_QUEUE_MAX", "64"))
+WS_MAX_DROPS = int(os.getenv("WS_MAX_DROPS", "256"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+
+def _split(v: Optional[Iterable[str] | str]) -> Optional[Set[str]]:
+    if not v: return None
+    items = v.split(",") if isinstance(v, str) else v
+    return {s.strip() for s in items if s and s.strip()} or None
+
+class Client:
+    def __init__(self, ws, queue_max: int, cameras=None, types=None):
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(queue_max)
+        self.cameras = _split(cameras)
+        self.types = _split(types)
+        self.task: Optional[asyncio.Task] = None
+        self.dropped = 0       # total events shed for this client
+        self.drop_run = 0      # consecutive publishes that found the queue full
+
+    def subscribe(self, cameras=None, types=None):
+        self.cameras = _split(cameras); self.types = _split(types)
+
+    def wants(self, camera_id: Optional[str], typ: Optional[str]) -> bool:
+        return ((self.cameras is None or camera_id in self.cameras) and
+                (self.types is None or typ in self.types))
+
+class Broadcaster:
+    def __init__(self, queue_max: int = WS_QUEUE_MAX, max_drops: int = WS_MAX_DROPS, send_timeout: float = WS_SEND_TIMEOUT,
+                 on_count: Optional[Callable[[int], None]] = None):
+        self.queue_max = queue_max
+        self.max_drops = max_drops
+        self.send_timeout = send_timeout
+        self.on_count = on_count
+        self.clients: Dict[Any, Client] = {}
+        self.latency = deque(maxlen=10000)  # publish -> send completed, seconds
+        self.counts = {"published": 0, "delivered": 0, "dropped": 0, "evicted": 0}
+
+    async def connect(self, ws, cameras=None, types=None, accept: bool = True) -> Client:
+        if accept: await ws.accept()
+        c = Client(ws, self.queue_max, cameras, types)
+        c.task = asyncio.create_task(self._writer(c))
+        self.clients[ws] = c
+        if self.on_count: self.on_count(len(self.clients))
+        return c
+
+    def disconnect(self, ws):
+        c = self.clients.pop(ws, None)
+        if c is None: return
+        if c.task and c.task is not asyncio.current_task(): c.task.cancel()
+        if self.on_count: self.on_count(len(self.clients))
+
+    def publish(self, data: Dict[str, Any]) -> int:
+        """Queue `data` for every interested client without awaiting any of them; returns the fan-out."""
+        payload = data.get("payload") or {}
+        cam, typ = payload.get("camera_id"), payload.get("type")
+        text = json.dumps(data)
+        now = time.perf_counter()
+        n = 0; slow = []
+        for ws, c in self.clients.items():
+            if not c.wants(cam, typ): continue
+            if c.queue.full():
+                c.queue.get_nowait(); c.dropped += 1; c.drop_run += 1; self.counts["dropped"] += 1
+                if c.drop_run > self.max_drops: slow.append(ws); continue
+            else:
+                c.drop_run = 0
+            c.queue.put_nowait((now, text)); n += 1
+        for ws in slow: self._evict(ws)
+        self.counts["published"] += 1
+        return n
+
+    async def broadcast(self, data: Dict[str, Any]):
+        # kept for callers of the old ConnectionManager API
+        self.publish(data)
+
+    def _evict(self, ws):
+        self.counts["evicted"] += 1
+        self.disconnect(ws)
+        asyncio.ensure_future(_close(ws))
+
+    async def _writer(self, c: Client):
+        try:
+            while True:
+                t_pub, text = await c.queue.get()
+                async with asyncio.timeout(self.send_timeout):  # no extra task per send, unlike wait_for
+                    await c.ws.send_text(text)
+                self.latency.append(time.perf_counter() - t_pub); self.counts["delivered"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # closed socket or send timed out: this client is gone, nobody else is affected
+            if c.ws in self.clients: self._evict(c.ws)
+
+    def stats(self) -> Dict[str, Any]:
+        lat = sorted(self.latency)
+        pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 3) if lat else None
+        return dict(self.counts, clients=len(self.clients), latency_ms_p50=pct(0.5), latency_ms_p99=pct(0.99))
+
+async def _close(ws):
+    try: await ws.close()
+    except Exception: pass
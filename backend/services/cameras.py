@@ -0,0 +1,293 @@
+import asyncio, os, re, sys, threading, time
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+from sqlalchemy import JSON, Column, Float, MetaData, String, Table, insert, select, update
+
+# Camera registry and health monitor. Cameras live in a table (ids are never reused: deleted rows are
+# only marked, so cam_7 stays cam_7 across restarts and deletions); reads are served from an in-memory
+# copy. A background asyncio task probes every camera's RTSP / ONVIF endpoint concurrently, at most
+# CAMERA_HEALTH_CONCURRENCY at a time with a per-probe timeout, and caches the result: /cameras/health
+# reads the cache and never waits on a camera.
+CAMERA_HEALTH_INTERVAL = float(os.getenv("CAMERA_HEALTH_INTERVAL", "30"))
+CAMERA_HEALTH_TIMEOUT = float(os.getenv("CAMERA_HEALTH_TIMEOUT", "3"))
+CAMERA_HEALTH_CONCURRENCY = int(os.getenv("CAMERA_HEALTH_CONCURRENCY", "64"))
+
+FIELDS = ("name", "rtsp_url", "onvif_url", "location", "tags")
+metadata = MetaData()
+cameras_table = Table(
+    "cameras", metadata,
+    Column("id", String(128), primary_key=True),
+    Column("name", String(256), nullable=False),
+    Column("rtsp_url", String(1024)),
+    Column("onvif_url", String(1024)),
+    Column("location", String(256)),
+    Column("tags", JSON),
+    Column("created", Float, nullable=False),
+    Column("deleted", Float),  # tombstone: keeps the id taken
+)
+
+class RegistryUnavailable(RuntimeError):
+    pass
+
+class CameraRegistry:
+    """Cameras by id. With an engine every write goes to the database first (the caller's thread,
+    so async handlers use asyncio.to_thread); without one the registry is in-memory only."""
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.cameras: Dict[str, Dict[str, Any]] = {}
+        self.taken = set()   # every id ever stored, deleted ones included
+        self.next_n = 1
+        self.loaded = engine is None
+        self.lock = threading.RLock()
+
+    def load(self) -> bool:
+        """Read the table (creating it if needed). False while the database is unreachable: writes are
+        refused until a load succeeds so a new id can never collide with one already stored."""
+        if self.loaded: return True
+        try:
+            metadata.create_all(self.engine)
+            with self.engine.connect() as conn: rows = conn.execute(select(cameras_table)).mappings().all()
+        except Exception as e:
+            print("camera registry: database unavailable:", e); return False
+        with self.lock:
+            for r in rows:
+                self._take(r["id"])
+                if r["deleted"] is None: self.cameras[r["id"]] = {k: r[k] for k in FIELDS}
+            self.loaded = True
+        return True
+
+    def _take(self, cam_id: str):
+        self.taken.add(cam_id)
+        m = re.fullmatch(r"cam_(\d+)", cam_id)
+        if m: self.next_n = max(self.next_n, int(m.group(1)) + 1)
+
+    def _write(self, stmt):
+        if self.engine is None: return
+        if not self.load(): raise RegistryUnavailable("camera registry database unavailable")
+        try:
+            with self.engine.begin() as conn: conn.execute(stmt)
+        except Exception as e:
+            raise RegistryUnavailable(f"camera registry write failed: {e}")
+
+    def add(self, cam: Dict[str, Any], cam_id: Optional[str] = None) -> str:
+        data = {k: cam.get(k) for k in FIELDS}
+        with self.lock:
+            if not self.loaded and not self.load(): raise RegistryUnavailable("camera registry database unavailable")
+            if cam_id is None: cam_id = f"cam_{self.next_n}"
+            elif cam_id in self.taken: return cam_id
+            self._write(insert(cameras_table).values(id=cam_id, created=time.time(), **data))
+            self._take(cam_id)
+            self.cameras[cam_id] = data
+        return cam_id
+
+    def update(self, cam_id: str, cam: Dict[str, Any]) -> bool:
+        data = {k: cam.get(k) for k in FIELDS}
+        with self.lock:
+            if cam_id not in self.cameras: return False
+            self._write(update(cameras_table).where(cameras_table.c.id == cam_id).values(**data))
+            self.cameras[cam_id] = data
+        return True
+
+    def remove(self, cam_id: str) -> bool:
+        with self.lock:
+            if cam_id not in self.cameras: return False
+            self._write(update(cameras_table).where(cameras_table.c.id == cam_id).values(deleted=time.time()))
+            del self.cameras[cam_id]
+        return True
+
+    def apply(self, cam_id: str, data: Optional[Dict[str, Any]]):
+        """Mirror a change another worker already stored (None = removed); memory only."""
+        with self.lock:
+            self._take(cam_id)
+            if data is None: self.cameras.pop(cam_id, None)
+            else: self.cameras[cam_id] = {k: data.get(k) for k in FIELDS}
+
+    def get(self, cam_id: str) -> Optional[Dict[str, Any]]:
+        return self.cameras.get(cam_id)
+
+    def ids(self) -> List[str]:
+        return list(self.cameras)
+
+    def items(self):
+        return list(self.cameras.items())
+
+    def __len__(self):
+        return len(self.cameras)
+
+# --- probes: each returns a short detail string on success and raises on failure ---
+async def rtsp_probe(url: str) -> str:
+    """RTSP OPTIONS: the server answering at all (even 401) means the stream endpoint is up."""
+    u = urlsplit(url)
+    reader, writer = await asyncio.open_connection(u.hostname, u.port or 554)
+    try:
+        clean = url if not u.password else url.replace(f"{u.username}:{u.password}@", "")
+        writer.write(f"OPTIONS {clean} RTSP/1.0\r\nCSeq: 1\r\nUser-Agent: sentinel-vision\r\n\r\n".encode())
+        await writer.drain()
+        line = (await reader.readline()).decode("latin-1").strip()
+    finally:
+        writer.close()
+    parts = line.split(" ", 2)
+    if len(parts) < 2 or not parts[0].startswith("RTSP/"): raise ConnectionError(f"not an RTSP reply: {line[:60]!r}")
+    if parts[1] not in ("200", "401"): raise ConnectionError(f"RTSP {parts[1]}")
+    return f"rtsp {parts[1]}"
+
+ONVIF_TIME = ('<?xml version="1.0" encoding="UTF-8"?><s:Envelope xmlns:s="http://www.w3.org/2003/05/soap-envelope">'
+              '<s:Body><GetSystemDateAndTime xmlns="http://www.onvif.org/ver10/device/wsdl"/></s:Body></s:Envelope>')
+
+async def onvif_probe(client: httpx.AsyncClient, url: str) -> str:
+    """GetSystemDateAndTime on the device service: the one ONVIF call that needs no credentials."""
+    r = await client.post(url, content=ONVIF_TIME, headers={"Content-Type": "application/soap+xml; charset=utf-8"})
+    if r.status_code not in (200, 401): raise ConnectionError(f"ONVIF HTTP {r.status_code}")
+    return f"onvif {r.status_code}"
+
+class HealthMonitor:
+    """Probes every registered camera each `interval` seconds and keeps the latest result per camera.
+
+    status values: ok, down, unconfigured (no URL to probe), pending (not checked yet). `on_result`
+    gets (camera_id, result) after each probe and (camera_id, None) when a camera is gone, e.g. to
+    keep per-camera gauges in step."""
+    def __init__(self, registry: CameraRegistry, interval: float = CAMERA_HEALTH_INTERVAL,
+                 timeout: float = CAMERA_HEALTH_TIMEOUT, concurrency: int = CAMERA_HEALTH_CONCURRENCY,
+                 on_result: Optional[Callable[[str, Optional[Dict[str, Any]]], None]] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, owns: Optional[Callable[[str], bool]] = None):
+        self.registry = registry
+        self.interval = interval
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.on_result = on_result
+        self.transport = transport
+        self.owns = owns  # multi-worker: probe only this worker's cameras, apply() the others' results
+        self.status: Dict[str, Dict[str, Any]] = {}
+        self.sem: Optional[asyncio.Semaphore] = None
+        self.client: Optional[httpx.AsyncClient] = None
+        self.task: Optional[asyncio.Task] = None
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.rounds = {"rounds": 0, "probes": 0, "last_round_s": 0.0, "last_round": 0.0}
+
+    async def start(self):
+        self.sem = asyncio.Semaphore(self.concurrency)
+        # cameras mostly serve self-signed certificates; this only checks that the endpoint answers
+        self.client = httpx.AsyncClient(timeout=self.timeout, transport=self.transport, verify=False,
+                                        limits=httpx.Limits(max_connections=self.concurrency))
+        self.task = asyncio.create_task(self._loop())
+
+    async def close(self):
+        if self.task: self.task.cancel()
+        tasks = [t for t in [self.task, *self.inflight.values()] if t]
+        for t in tasks: t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.client: await self.client.aclose()
+
+    def kick(self, cam_id: str):
+        """Probe one camera now (after it was added or changed) instead of at the next round."""
+        if self.sem is None or (self.owns and not self.owns(cam_id)): return
+        self.status[cam_id] = {"status": "pending", "checked": None, "last_ok": None}
+        self._spawn(cam_id)
+
+    def apply(self, cam_id: str, res: Dict[str, Any]):
+        """Cache a result probed by the worker that owns the camera."""
+        if cam_id in self.registry.cameras: self.status[cam_id] = res
+
+    def forget(self, cam_id: str):
+        t = self.inflight.pop(cam_id, None)
+        if t: t.cancel()
+        if self.status.pop(cam_id, None) is not None and self.on_result: self.on_result(cam_id, None)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Cached status for every registered camera, with age_s = seconds since its last probe."""
+        now = time.time(); out = {}
+        for cam_id in self.registry.ids():
+            st = dict(self.status.get(cam_id) or {"status": "pending", "checked": None, "last_ok": None})
+            st["age_s"] = round(now - st["checked"], 1) if st.get("checked") else None
+            out[cam_id] = st
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for st in self.status.values(): counts[st["status"]] = counts.get(st["status"], 0) + 1
+        return dict(self.rounds, cameras=len(self.registry), inflight=len(self.inflight), **counts)
+
+    async def _loop(self):
+        while True:
+            if not self.registry.loaded: await asyncio.to_thread(self.registry.load)
+            await self.check_all()
+            await asyncio.sleep(max(0.0, self.interval - self.rounds["last_round_s"]))
+
+    async def check_all(self):
+        t0 = time.monotonic()
+        ids = self.registry.ids()
+        for gone in set(self.status) - set(ids): self.forget(gone)
+        if self.owns: ids = [c for c in ids if self.owns(c)]
+        # one task per camera; the semaphore, not the task count, bounds open sockets
+        await asyncio.gather(*(self._spawn(cam_id) for cam_id in ids), return_exceptions=True)
+        self.rounds["rounds"] += 1; self.rounds["last_round"] = time.time()
+        self.rounds["last_round_s"] = round(time.monotonic() - t0, 3)
+
+    def _spawn(self, cam_id: str) -> asyncio.Task:
+        t = self.inflight.get(cam_id)
+        if t is None or t.done():  # a slow camera still being probed is not probed twice
+            t = self.inflight[cam_id] = asyncio.create_task(self._check(cam_id))
+            t.add_done_callback(lambda _t, c=cam_id: self._done(c, _t))
+        return t
+
+    def _done(self, cam_id: str, task: asyncio.Task):
+        if self.inflight.get(cam_id) is task: del self.inflight[cam_id]
+
+    async def _probe(self, cam: Dict[str, Any]) -> List[str]:
+        details = []
+        if cam.get("rtsp_url"): details.append(await rtsp_probe(cam["rtsp_url"]))
+        if cam.get("onvif_url"): details.append(await onvif_probe(self.client, cam["onvif_url"]))
+        return details
+
+    async def _check(self, cam_id: str):
+        cam = self.registry.get(cam_id)
+        if cam is None: return
+        prev = self.status.get(cam_id) or {}
+        if not cam.get("rtsp_url") and not cam.get("onvif_url"):
+            res = {"status": "unconfigured", "checked": time.time(), "last_ok": None}
+        else:
+            async with self.sem:
+                t0 = time.monotonic()
+                try:
+                    details = await asyncio.wait_for(self._probe(cam), self.timeout)
+                    res = {"status": "ok", "detail": ", ".join(details)}
+                except asyncio.TimeoutError:
+                    res = {"status": "down", "error": f"timeout after {self.timeout:g}s"}
+                except Exception as e:
+                    res = {"status": "down", "error": f"{type(e).__name__}: {e}"[:200]}
+                res["latency_ms"] = round((time.monotonic() - t0) * 1000, 1)
+            res["checked"] = time.time()
+            res["last_ok"] = res["checked"] if res["status"] == "ok" else prev.get("last_ok")
+        if cam_id not in self.registry.cameras: return  # removed while probing
+        self.status[cam_id] = res; self.rounds["probes"] += 1
+        if self.on_result: self.on_result(cam_id, res)
+
+async def benchmark(cameras: int = 1000, concurrency: int = CAMERA_HEALTH_CONCURRENCY, timeout: float = 1.0):
+    """One health round over `cameras` local RTSP endpoints: 80% answer, 10% refuse the connection,
+    10% accept and never reply (each of those costs a full timeout)."""
+    async def rtsp_ok(reader, writer):
+        await reader.readuntil(b"\r\n\r\n")
+        writer.write(b"RTSP/1.0 200 OK\r\nCSeq: 1\r\n\r\n"); await writer.drain(); writer.close()
+    async def silent(reader, writer):
+        await reader.read()  # until the prober gives up and closes
+    ok_srv = await asyncio.start_server(rtsp_ok, "127.0.0.1", 0, backlog=4096)
+    hang_srv = await asyncio.start_server(silent, "127.0.0.1", 0, backlog=4096)
+    ok_port, hang_port = ok_srv.sockets[0].getsockname()[1], hang_srv.sockets[0].getsockname()[1]
+    reg = CameraRegistry()
+    for i in range(cameras):
+        port = hang_port if i % 10 == 0 else 1 if i % 10 == 1 else ok_port
+        reg.add({"name": f"bench {i}", "rtsp_url": f"rtsp://127.0.0.1:{port}/stream{i}"})
+    mon = HealthMonitor(reg, interval=3600, timeout=timeout, concurrency=concurrency)
+    await mon.start(); mon.task.cancel()
+    await mon.check_all()
+    t0 = time.perf_counter(); snap = mon.snapshot(); read_us = (time.perf_counter() - t0) * 1e6
+    await mon.close()
+    ok_srv.close(); hang_srv.close()
+    return {"cameras": cameras, "concurrency": concurrency, "timeout_s": timeout,
+            "round_s": mon.rounds["last_round_s"], "serial_worst_case_s": round(cameras * 0.1 * timeout, 1),
+            "cached_read_us": round(read_us, 1), **{k: v for k, v in mon.stats().items() if k in ("ok", "down")}}
+
+if __name__ == "__main__":
+    print(asyncio.run(benchmark(*(int(a) for a in sys.argv[1:3]))))
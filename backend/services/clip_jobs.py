@@ -0,0 +1,118 @@
+import os, threading, time, uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+CLIP_WORKERS = int(os.getenv("CLIP_WORKERS", "2"))
+CLIP_QUEUE_MAX = int(os.getenv("CLIP_QUEUE_MAX", "32"))
+CLIP_DEDUPE_SECONDS = float(os.getenv("CLIP_DEDUPE_SECONDS", "10"))
+CLIP_JOBS_KEPT = int(os.getenv("CLIP_JOBS_KEPT", "200"))
+
+class ClipJobs:
+    """Bounded pool that cuts and uploads event clips off the event loop.
+
+    Alerts on the same camera within one `dedupe_seconds` window share one job: a later submit only adds
+    its callback (called right away if the clip is already uploaded). `encode(camera_id, seconds, ts=)` returns
+    (mp4_path, gif_path) and `upload(camera_id, mp4, seconds, gif)` returns the URLs, so the pipeline can run
+    against MinIO or a local stub. A camera without HLS segments to cut (e.g. mock mode) finishes the job as
+    "skipped", which is not a failure. Callbacks and `on_finish` run on the worker thread.
+    """
+    def __init__(self, encode: Callable, upload: Callable, workers: int = CLIP_WORKERS, queue_max: int = CLIP_QUEUE_MAX,
+                 dedupe_seconds: float = CLIP_DEDUPE_SECONDS, keep: int = CLIP_JOBS_KEPT,
+                 on_finish: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.encode = encode
+        self.upload = upload
+        self.queue_max = queue_max
+        self.dedupe_seconds = dedupe_seconds
+        self.keep = keep
+        self.on_finish = on_finish
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="clip")
+        self.lock = threading.Lock()
+        self.jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.by_window: Dict[tuple, str] = {}
+        self.callbacks: Dict[str, List[Callable]] = {}
+        self.counts = {"submitted": 0, "deduped": 0, "rejected": 0, "done": 0, "failed": 0, "skipped": 0}
+        self.active = 0  # queued or running; changed under the lock only
+
+    def pending(self) -> int:
+        # a plain counter: the worker threads call this while submit() changes self.jobs on the event loop
+        return self.active
+
+    def submit(self, camera_id: str, ts: float, seconds: int = 6, callback: Optional[Callable] = None) -> Dict[str, Any]:
+        key = (camera_id, int(ts // self.dedupe_seconds))
+        with self.lock:
+            job = self.jobs.get(self.by_window.get(key, ""))
+            if job and job["status"] not in ("failed", "skipped"):
+                self.counts["deduped"] += 1
+                if job["status"] != "done":
+                    if callback: self.callbacks[job["id"]].append(callback)
+                    return job
+                ready = True
+            else:
+                ready = False
+                job = {"id": uuid.uuid4().hex[:12], "camera_id": camera_id, "ts": ts, "seconds": seconds,
+                       "status": "queued", "created": time.time(), "started": None, "finished": None,
+                       "queue_ms": None, "encode_ms": None, "upload_ms": None, "urls": None, "error": None}
+                if self.pending() >= self.queue_max:
+                    # shed new work rather than letting clips pile up minutes behind their alerts
+                    job["status"] = "rejected"; self.counts["rejected"] += 1
+                    self._remember(job)
+                    return job
+                self.counts["submitted"] += 1; self.active += 1
+                self._remember(job)
+                self.by_window[key] = job["id"]
+                self.callbacks[job["id"]] = [callback] if callback else []
+        if ready:
+            if callback: _safe(callback, job["urls"])
+            return job
+        self.pool.submit(self._run, job)
+        return job
+
+    def _remember(self, job):
+        self.jobs[job["id"]] = job
+        while len(self.jobs) > self.keep:
+            old_id, old = self.jobs.popitem(last=False)
+            self.callbacks.pop(old_id, None)
+            self.by_window.pop((old["camera_id"], int(old["ts"] // self.dedupe_seconds)), None)
+
+    def _run(self, job):
+        t0 = time.time()
+        job["status"] = "running"; job["started"] = t0
+        job["queue_ms"] = round((t0 - job["created"]) * 1000, 1)
+        try:
+            mp4, gif = self.encode(job["camera_id"], job["seconds"], ts=job["ts"])
+            t1 = time.time(); job["encode_ms"] = round((t1 - t0) * 1000, 1)
+            if not mp4:
+                job["status"] = "skipped"; job["error"] = "no HLS segments to cut"
+            else:
+                job["urls"] = self.upload(job["camera_id"], mp4, job["seconds"], gif)
+                job["upload_ms"] = round((time.time() - t1) * 1000, 1)
+                job["status"] = "done"
+        except Exception as e:
+            job["status"] = "failed"; job["error"] = str(e)
+        job["finished"] = time.time()
+        with self.lock:
+            self.counts[job["status"]] += 1; self.active -= 1
+            callbacks = self.callbacks.pop(job["id"], [])
+        if job["status"] != "done": callbacks = []
+        for cb in callbacks: _safe(cb, job["urls"])
+        if self.on_finish: _safe(self.on_finish, job)
+
+    def list(self, limit: int = 50) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [dict(j) for j in list(self.jobs.values())[-limit:]][::-1]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock: job = self.jobs.get(job_id)
+        return dict(job) if job else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            return dict(self.counts, pending=self.pending())
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+def _safe(fn, arg):
+    try: fn(arg)
+    except Exception as e: print("clip callback failed:", e)
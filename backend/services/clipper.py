@@ -1,7 +1,14 @@
 import os, subprocess, time, uuid, tempfile, re
 from .s3 import upload_file
+from .segment_index import SegmentIndexer
 
 HLS_DIR = os.getenv("HLS_OUTPUT_DIR","/app/hls")
+CLIP_PRE_SECONDS = float(os.getenv("CLIP_PRE_SECONDS","4"))
+CLIP_POST_SECONDS = float(os.getenv("CLIP_POST_SECONDS","2"))
+SEGMENT_WAIT_SLACK = 2.0  # ~ one HLS target duration: the segment holding ts + post is still being written
+# started by the API on startup; until it has indexed a camera, clips fall back to the live playlist
+segments = SegmentIndexer(HLS_DIR, retention=max(60.0, 4 * (CLIP_PRE_SECONDS + CLIP_POST_SECONDS)))
+GIF_FILTER = "fps=8,scale=480:-1:flags=lanczos"
 
 def _read_playlist(camera_id: str):
     pl = os.path.join(HLS_DIR, camera_id, "index.m3u8")
@@ -20,9 +27,7 @@ def _read_playlist(camera_id: str):
             segs.append((dur, uri))
     return pl, target, segs
 
-def generate_clip_precise(camera_id: str, seconds: int = 6) -> str | None:
-    pl, target, segs = _read_playlist(camera_id)
-    if not segs: return None
+def _select(segs, seconds: float):
     # take last N segs totaling at least seconds
     total = 0.0
     selected = []
@@ -30,47 +35,77 @@ def generate_clip_precise(camera_id: str, seconds: int = 6) -> str | None:
         selected.insert(0, (dur, uri))
         total += dur
         if total >= seconds: break
-    # concat to .ts then remux to mp4
+    return selected
+
+def _outputs(out_mp4: str, out_gif: str | None, seconds: float):
+    # one decode feeds both outputs: MP4 is a stream copy, the GIF is the only thing re-encoded
+    args = ["-map","0:v","-map","0:a?","-c","copy","-movflags","+faststart",out_mp4]
+    if out_gif:
+        args += ["-map","0:v","-t",str(seconds),"-vf",GIF_FILTER,"-an",out_gif]
+    return args
+
+def _select_window(camera_id: str, ts: float, pre: float, post: float):
+    """Segments covering [ts - pre, ts + post] from the segment index, waiting for the post-roll if needed."""
+    idx = segments.get(camera_id)
+    if idx is None or idx.latest is None: return None
+    idx.wait_until(ts + post, timeout=post + 2 * SEGMENT_WAIT_SLACK)
+    sel = idx.window(ts - pre, ts + post)
+    return [(end - start, path) for start, end, path, _ in sel] or None
+
+def generate_clip_and_gif(camera_id: str, seconds: int = 6, gif: bool = True, ts: float | None = None,
+                          pre: float = CLIP_PRE_SECONDS, post: float = CLIP_POST_SECONDS) -> tuple[str | None, str | None]:
+    """(mp4_path, gif_path) from a single ffmpeg run (concat demuxer straight into the MP4 muxer, no
+    intermediate .ts). With `ts`, the clip is the indexed [ts - pre, ts + post] window; otherwise (or if the
+    camera is not indexed yet) the last `seconds` of the live playlist."""
+    selected = _select_window(camera_id, ts, pre, post) if ts is not None else None
+    pl = os.path.join(HLS_DIR, camera_id, "index.m3u8")
+    if not selected:
+        pl, target, segs = _read_playlist(camera_id)
+        if not segs: return None, None
+        selected = _select(segs, seconds)
+    base = f"/tmp/clip_{uuid.uuid4().hex}"
+    out_mp4, out_gif = base + ".mp4", (base + ".gif" if gif else None)
     with tempfile.TemporaryDirectory() as td:
         concat_path = os.path.join(td, "files.txt")
         with open(concat_path, 'w', encoding='utf-8') as f:
             for _,uri in selected:
                 # ffmpeg concat demuxer requires escaped paths
                 f.write(f"file '{uri}'\n")
-        out_ts = os.path.join(td, "out.ts")
-        out_mp4 = f"/tmp/clip_{uuid.uuid4().hex}.mp4"
         try:
-            subprocess.run(["ffmpeg","-y","-loglevel","error","-f","concat","-safe","0","-i",concat_path,"-c","copy",out_ts], check=True)
-            subprocess.run(["ffmpeg","-y","-loglevel","error","-i",out_ts,"-c","copy",out_mp4], check=True)
-            return out_mp4
+            subprocess.run(["ffmpeg","-y","-loglevel","error","-f","concat","-safe","0","-i",concat_path,
+                            *_outputs(out_mp4, out_gif, seconds)], check=True)
+            return out_mp4, out_gif
         except Exception as e:
             # fallback: stream cut
-            out_mp4 = f"/tmp/clip_{uuid.uuid4().hex}.mp4"
             try:
-                subprocess.run(["ffmpeg","-y","-loglevel","error","-i",pl,"-t",str(seconds),"-c","copy",out_mp4], check=True)
-                return out_mp4
+                subprocess.run(["ffmpeg","-y","-loglevel","error","-i",pl,"-t",str(seconds),
+                                *_outputs(out_mp4, out_gif, seconds)], check=True)
+                return out_mp4, out_gif
             except Exception as e2:
                 print("fallback clip failed:", e2)
-                return None
+                return None, None
+
+def generate_clip_precise(camera_id: str, seconds: int = 6) -> str | None:
+    return generate_clip_and_gif(camera_id, seconds, gif=False)[0]
 
 def _generate_gif(in_mp4: str, seconds: int = 6) -> str | None:
     out_gif = in_mp4.replace(".mp4",".gif")
     try:
         subprocess.run(["ffmpeg","-y","-loglevel","error","-i",in_mp4,"-t",str(seconds),
-                        "-vf","fps=8,scale=480:-1:flags=lanczos", out_gif], check=True)
+                        "-vf",GIF_FILTER, out_gif], check=True)
         return out_gif
     except Exception as e:
         print("gif gen failed:", e)
         return None
 
-def upload_clip_and_gif(camera_id: str, clip_path: str, seconds: int = 6):
+def upload_clip_and_gif(camera_id: str, clip_path: str, seconds: int = 6, gif_path: str | None = None):
     key_mp4 = f"{camera_id}/{int(time.time())}.mp4"
-    url_mp4 = upload_file(clip_path, key_mp4)
-    gif_path = _generate_gif(clip_path, seconds=seconds)
+    url_mp4 = upload_file(clip_path, key_mp4, content_type="video/mp4")
+    if gif_path is None: gif_path = _generate_gif(clip_path, seconds=seconds)
     url_gif = None
     if gif_path:
         key_gif = key_mp4.replace(".mp4",".gif")
-        url_gif = upload_file(gif_path, key_gif)
+        url_gif = upload_file(gif_path, key_gif, content_type="image/gif")
     try:
         os.remove(clip_path)
         if gif_path: os.remove(gif_path)
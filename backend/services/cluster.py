@@ -0,0 +1,100 @@
+import hashlib, os
+from bisect import bisect
+from typing import Dict, Iterable, List, Optional
+
+import httpx
+
+# Multi-worker mode (serve.py): WORKERS processes share the API port, and each also listens on its own
+# port WORKER_BASE_PORT + index. Camera state that lives in one process (zone tracks, heatmaps, person
+# gauges, detection history buckets, segment indexes, health probes) is sharded by camera_id on a
+# consistent-hash ring, so adding a worker only moves ~1/N of the cameras. Ingest that lands on a worker
+# that does not own the camera is forwarded to the owner's port; clients that know the ring
+# (GET /cluster) post to the owner directly and skip the extra hop.
+WORKERS = int(os.getenv("WORKERS", "1"))
+WORKER_INDEX = int(os.getenv("WORKER_INDEX", "0"))
+WORKER_HOST = os.getenv("WORKER_HOST", "127.0.0.1")
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", "8100"))
+CLUSTER_VNODES = int(os.getenv("CLUSTER_VNODES", "64"))
+FORWARD_TIMEOUT = float(os.getenv("FORWARD_TIMEOUT", "10"))
+FORWARDED_HEADER = "X-SVA-Forwarded"  # set on worker-to-worker ingest: handled where it lands (private port only)
+FORWARD_HEADERS = ("x-api-key", "authorization", "content-type", "x-sva-sent-at", "x-sva-replay")
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+class HashRing:
+    """Consistent hashing with `vnodes` points per node; lookups are a bisect (cached per key)."""
+    def __init__(self, nodes: Iterable[str], vnodes: int = CLUSTER_VNODES):
+        self.nodes = list(nodes)
+        points = sorted((_hash(f"{n}#{v}"), n) for n in self.nodes for v in range(vnodes))
+        self.keys = [h for h, _ in points]
+        self.owners = [n for _, n in points]
+        self.cache: Dict[str, str] = {}
+
+    def node(self, key: str) -> str:
+        n = self.cache.get(key)
+        if n is None:
+            i = bisect(self.keys, _hash(key)) % len(self.keys)
+            n = self.cache[key] = self.owners[i]
+        return n
+
+class Cluster:
+    def __init__(self, workers: int = WORKERS, index: int = WORKER_INDEX, host: str = WORKER_HOST,
+                 base_port: int = WORKER_BASE_PORT, vnodes: int = CLUSTER_VNODES):
+        self.workers = max(1, workers)
+        self.index = index
+        self.host = host
+        self.base_port = base_port
+        self.ring = HashRing([f"worker-{i}" for i in range(self.workers)], vnodes)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.counts = {"forwarded": 0, "forward_frames": 0, "forward_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 1
+
+    def owner(self, camera_id: str) -> int:
+        if self.workers == 1: return 0
+        return int(self.ring.node(camera_id)[7:])
+
+    def owns(self, camera_id: str) -> bool:
+        return self.workers == 1 or self.owner(camera_id) == self.index
+
+    def private(self, server) -> bool:
+        """Whether a request's ASGI scope["server"] is this worker's private port (the only place
+        forwarded ingest may arrive)."""
+        return server is not None and server[1] == self.base_port + self.index
+
+    def url(self, index: int) -> str:
+        return f"http://{self.host}:{self.base_port + index}"
+
+    def group(self, camera_ids: Iterable[str]) -> Dict[int, List[str]]:
+        """worker index -> the given cameras it owns."""
+        out: Dict[int, List[str]] = {}
+        for c in camera_ids: out.setdefault(self.owner(c), []).append(c)
+        return out
+
+    async def start(self):
+        if self.enabled:
+            self.client = httpx.AsyncClient(timeout=FORWARD_TIMEOUT,
+                                            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32))
+
+    async def close(self):
+        if self.client: await self.client.aclose()
+
+    async def forward(self, index: int, path: str, body: bytes, headers, frames: int = 1) -> bool:
+        """POST an ingest body to worker `index`; False if it did not take it."""
+        h = {k: v for k, v in headers.items() if k.lower() in FORWARD_HEADERS}
+        h[FORWARDED_HEADER] = "1"
+        try:
+            r = await self.client.post(self.url(index) + path, content=body, headers=h)
+            ok = r.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        self.counts["forwarded"] += 1; self.counts["forward_frames"] += frames
+        if not ok: self.counts["forward_errors"] += 1
+        return ok
+
+    def describe(self) -> Dict[str, object]:
+        return {"workers": self.workers, "index": self.index, "vnodes": len(self.ring.keys) // self.workers,
+                "urls": [self.url(i) for i in range(self.workers)], **self.counts}
@@ -0,0 +1,206 @@
+import asyncio, json, os, random, time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from services.alert_state import MemoryAlertState
+
+# Outbound notifications (Slack, Twilio) off the event loop's critical path. Callers only enqueue;
+# one worker per destination drains its queue through a pooled httpx.AsyncClient, paced by a token
+# bucket so a burst of alerts never trips the provider's rate limit, with retries on 429/5xx and a
+# JSONL dead-letter log for messages that still fail. Base URLs are configurable so the whole path can
+# be pointed at a local stand-in server.
+SLACK_API_BASE = os.getenv("SLACK_API_BASE", "https://slack.com/api").rstrip("/")
+TWILIO_API_BASE = os.getenv("TWILIO_API_BASE", "https://api.twilio.com").rstrip("/")
+NOTIFY_RATE_PER_SEC = float(os.getenv("NOTIFY_RATE_PER_SEC", "1"))   # Slack chat.postMessage: ~1 msg/s per channel
+NOTIFY_BURST = int(os.getenv("NOTIFY_BURST", "3"))
+NOTIFY_QUEUE_MAX = int(os.getenv("NOTIFY_QUEUE_MAX", "1000"))
+NOTIFY_MAX_RETRIES = int(os.getenv("NOTIFY_MAX_RETRIES", "5"))
+NOTIFY_TIMEOUT = float(os.getenv("NOTIFY_TIMEOUT", "5"))
+NOTIFY_COALESCE_SECONDS = float(os.getenv("NOTIFY_COALESCE_SECONDS", "10"))
+NOTIFY_DEAD_LETTER = os.getenv("NOTIFY_DEAD_LETTER", "/tmp/sva_notify_dead_letter.jsonl")
+
+@dataclass
+class Message:
+    dest: str                                  # queue / rate-limit key, e.g. "slack:C123", "twilio"
+    url: str
+    json: Optional[Dict[str, Any]] = None
+    data: Optional[Dict[str, Any]] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    auth: Optional[Tuple[str, str]] = None
+    thread_key: Any = None                     # reply in the thread started by this key's root message
+    root_key: Any = None                       # this message starts a thread: remember its ts under this key
+    render: Optional[Callable[["Message"], None]] = None  # fills json/data at send time (coalesced messages)
+    count: int = 1                             # alerts folded into this message by enqueue_coalesced
+    attempts: int = 0
+    origin: Optional[float] = None             # capture time (wall clock) of the alert this message is about
+    created: float = field(default_factory=time.monotonic)
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.t = time.monotonic()
+
+    def delay(self) -> float:
+        """Seconds to wait before the next send; takes the token."""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+        self.t = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def penalize(self, seconds: float):
+        # provider told us to back off (Retry-After): nothing leaves this destination until then
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+class Dispatcher:
+    def __init__(self, rate: float = NOTIFY_RATE_PER_SEC, burst: int = NOTIFY_BURST, queue_max: int = NOTIFY_QUEUE_MAX,
+                 max_retries: int = NOTIFY_MAX_RETRIES, timeout: float = NOTIFY_TIMEOUT,
+                 coalesce_seconds: float = NOTIFY_COALESCE_SECONDS, dead_letter: str = NOTIFY_DEAD_LETTER,
+                 transport: Optional[httpx.AsyncBaseTransport] = None, threads=None,
+                 on_sent: Optional[Callable[[Message], None]] = None):
+        self.rate = rate
+        self.burst = burst
+        self.queue_max = queue_max
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.coalesce_seconds = coalesce_seconds
+        self.dead_letter = dead_letter
+        self.transport = transport
+        self.client: Optional[httpx.AsyncClient] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.workers: Dict[str, asyncio.Task] = {}
+        # thread key -> Slack thread_ts, an async mapping (alert_state.StateMapping): get() may go to Redis
+        self.threads = threads if threads is not None else MemoryAlertState().mapping("", float("inf"))
+        self.on_sent = on_sent  # e.g. latency metrics: time.monotonic() - msg.created, time.time() - msg.origin
+        self.pending: Dict[Any, Dict[str, Any]] = {}  # coalescing key -> {"count", "msg"}
+        self.counts = {"enqueued": 0, "sent": 0, "retried": 0, "dropped": 0, "dead": 0, "coalesced": 0}
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.client = httpx.AsyncClient(timeout=self.timeout, transport=self.transport,
+                                        limits=httpx.Limits(max_connections=20, max_keepalive_connections=10))
+
+    async def close(self, drain: float = 5.0):
+        """Flush coalesced messages, give the queues `drain` seconds, then stop."""
+        for key in list(self.pending): self._flush(key)
+        if self.queues:
+            try: await asyncio.wait_for(asyncio.gather(*(q.join() for q in self.queues.values())), drain)
+            except asyncio.TimeoutError: pass
+        for w in self.workers.values(): w.cancel()
+        await asyncio.gather(*self.workers.values(), return_exceptions=True)
+        self.workers.clear()
+        if self.client: await self.client.aclose()
+
+    # --- enqueue side: never blocks, safe to call from any thread ---
+    def enqueue(self, msg: Message):
+        if self.loop is None: return  # not started (notifications disabled / no event loop)
+        if _on_loop(self.loop): self._put(msg)
+        else: self.loop.call_soon_threadsafe(self._put, msg)
+
+    def enqueue_coalesced(self, key: Any, msg: Message):
+        """Like enqueue, but messages sharing `key` within coalesce_seconds go out as one; msg.render
+        sees how many were folded together in msg.count."""
+        if self.loop is None: return
+        if _on_loop(self.loop): self._coalesce(key, msg)
+        else: self.loop.call_soon_threadsafe(self._coalesce, key, msg)
+
+    def _coalesce(self, key, msg: Message):
+        p = self.pending.get(key)
+        if p:
+            p["count"] += 1; self.counts["coalesced"] += 1; return
+        self.pending[key] = {"count": 1, "msg": msg}
+        self.loop.call_later(self.coalesce_seconds, self._flush, key)
+
+    def _flush(self, key):
+        p = self.pending.pop(key, None)
+        if not p: return
+        p["msg"].count = p["count"]
+        self._put(p["msg"])
+
+    def _put(self, msg: Message):
+        q = self.queues.get(msg.dest)
+        if q is None:
+            q = self.queues[msg.dest] = asyncio.Queue(self.queue_max)
+            self.buckets[msg.dest] = TokenBucket(self.rate, self.burst)
+            self.workers[msg.dest] = self.loop.create_task(self._worker(msg.dest, q))
+        if q.full():
+            # shed the oldest message so the newest alerts still go out
+            q.get_nowait(); q.task_done(); self.counts["dropped"] += 1
+        q.put_nowait(msg); self.counts["enqueued"] += 1
+
+    # --- send side ---
+    async def _worker(self, dest: str, q: asyncio.Queue):
+        bucket = self.buckets[dest]
+        while True:
+            msg = await q.get()
+            try:
+                await self._deliver(msg, bucket)
+            except Exception as e:
+                print("notify worker error:", dest, e)
+            finally:
+                q.task_done()
+
+    async def _deliver(self, msg: Message, bucket: TokenBucket):
+        if msg.render: msg.render(msg)
+        if msg.thread_key is not None:
+            # the root post went through this same FIFO queue, so its ts is known by now (if it succeeded)
+            ts = await self.threads.get(msg.thread_key)
+            if ts: (msg.json if msg.json is not None else msg.data)["thread_ts"] = ts
+        while True:
+            wait = bucket.delay()
+            if wait: await asyncio.sleep(wait)
+            msg.attempts += 1
+            err, retry_after = await self._send(msg)
+            if err is None:
+                self.counts["sent"] += 1
+                if self.on_sent: self.on_sent(msg)
+                return
+            if retry_after is None or msg.attempts > self.max_retries:
+                self.counts["dead"] += 1
+                await asyncio.to_thread(self._dead_letter, msg, err); return
+            self.counts["retried"] += 1
+            if retry_after: bucket.penalize(retry_after)
+            else: await asyncio.sleep(min(30.0, 0.5 * 2 ** (msg.attempts - 1)) * random.uniform(0.5, 1.0))
+
+    async def _send(self, msg: Message):
+        """(None, None) on success, else (error, retry_after): retry_after None = permanent failure,
+        0 = retry with backoff, > 0 = retry after that many seconds."""
+        try:
+            r = await self.client.post(msg.url, json=msg.json, data=msg.data, headers=msg.headers, auth=msg.auth)
+        except httpx.HTTPError as e:
+            return f"{type(e).__name__}: {e}", 0
+        if r.status_code == 429:
+            return "429 rate limited", float(r.headers.get("Retry-After", "1") or 1)
+        if r.status_code >= 500:
+            return f"HTTP {r.status_code}", 0
+        if r.status_code >= 400:
+            return f"HTTP {r.status_code}: {r.text[:200]}", None
+        if msg.url.startswith(SLACK_API_BASE):
+            # Web API reports errors in the body with HTTP 200
+            try: body = r.json()
+            except ValueError: body = {}
+            if not body.get("ok"):
+                return f"slack: {body.get('error', 'bad response')}", (0 if body.get("error") == "ratelimited" else None)
+            if msg.root_key is not None and body.get("ts"): await self.threads.set(msg.root_key, body["ts"])
+        return None, None
+
+    def _dead_letter(self, msg: Message, err: str):
+        rec = {"ts": time.time(), "dest": msg.dest, "url": msg.url, "error": err, "attempts": msg.attempts,
+               "json": msg.json, "data": msg.data}
+        try:
+            with open(self.dead_letter, "a") as f: f.write(json.dumps(rec, default=str) + "\n")
+        except OSError as e:
+            print("dead-letter write failed:", e)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counts, queued={d: q.qsize() for d, q in self.queues.items()}, coalescing=len(self.pending))
+
+def _on_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    try: return asyncio.get_running_loop() is loop
+    except RuntimeError: return False
@@ -0,0 +1,195 @@
+import hashlib, os, threading, time
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import quote, unquote
+import cv2
+import numpy as np
+
+# People-flow heatmaps. Each camera keeps fixed-size float32 grids of foot positions (bottom-centre of
+# the normalised boxes): a rolling window per entry of WINDOWS, made of time slots that are zeroed as
+# they expire, plus an exponentially decaying "live" grid. Points are binned in bulk with np.add.at.
+# PNGs are cached per (camera, window) and only re-rendered once the grid moved by more than
+# HEATMAP_RENDER_THRESHOLD (relative L1); grids are snapshotted to npz so a restart keeps the day.
+# Slots are coarse (a window expires in steps of 1/5 to 1/12 of its length) to keep a camera's grids
+# near 0.5 MB; snapshots are compressed (most cells are zero) and only rewrite cameras that changed.
+GRID_W, GRID_H = (int(v) for v in os.getenv("HEATMAP_GRID", "96x54").lower().split("x"))
+HEATMAP_HALF_LIFE = float(os.getenv("HEATMAP_HALF_LIFE", "300"))
+HEATMAP_RENDER_THRESHOLD = float(os.getenv("HEATMAP_RENDER_THRESHOLD", "0.02"))
+HEATMAP_SNAPSHOT_DIR = os.getenv("HEATMAP_SNAPSHOT_DIR", "/tmp/sva_heatmaps")
+HEATMAP_PNG_SCALE = int(os.getenv("HEATMAP_PNG_SCALE", "6"))
+# window -> (length seconds, slots)
+WINDOWS: Dict[str, Tuple[float, int]] = {"5m": (300, 5), "1h": (3600, 6), "24h": (86400, 12)}
+DEFAULT_WINDOW = "1h"
+
+class _Window:
+    def __init__(self, length: float, n: int):
+        self.slot_len = length / n
+        self.slots = np.zeros((n, GRID_H, GRID_W), dtype=np.float32)
+        self.total = np.zeros((GRID_H, GRID_W), dtype=np.float32)
+        self.cur = None  # absolute slot number of the newest slot
+
+    def advance(self, now: float) -> bool:
+        k = int(now // self.slot_len)
+        if self.cur is None: self.cur = k; return False
+        if k <= self.cur: return False
+        n = len(self.slots)
+        for s in range(self.cur + 1, min(k, self.cur + n) + 1): self.slots[s % n] = 0
+        self.cur = k
+        np.sum(self.slots, axis=0, out=self.total)  # recomputed, so float32 totals never drift
+        return True
+
+class CameraHeat:
+    def __init__(self):
+        self.windows = {name: _Window(*spec) for name, spec in WINDOWS.items()}
+        self.live = np.zeros((GRID_H, GRID_W), dtype=np.float32)
+        self.live_t = time.time()
+        self.version = 0
+
+    def _decay(self, now: float):
+        dt = now - self.live_t
+        if dt > 0:
+            self.live *= np.float32(0.5 ** (dt / HEATMAP_HALF_LIFE)); self.live_t = now
+
+    def add(self, idx: np.ndarray, now: float):
+        self._decay(now)
+        np.add.at(self.live.reshape(-1), idx, 1.0)
+        for w in self.windows.values():
+            w.advance(now)
+            np.add.at(w.slots[w.cur % len(w.slots)].reshape(-1), idx, 1.0)
+            np.add.at(w.total.reshape(-1), idx, 1.0)
+        self.version += 1
+
+    def grid(self, window: str, now: float) -> np.ndarray:
+        if window == "live":
+            self._decay(now); return self.live
+        w = self.windows[window]
+        if w.advance(now): self.version += 1
+        return w.total
+
+class HeatmapAggregator:
+    def __init__(self, snapshot_dir: Optional[str] = HEATMAP_SNAPSHOT_DIR, threshold: float = HEATMAP_RENDER_THRESHOLD,
+                 owns: Optional[Callable[[str], bool]] = None):
+        self.snapshot_dir = snapshot_dir
+        self.threshold = threshold
+        self.owns = owns  # multi-worker: restore only this worker's cameras (the directory is shared)
+        self.cams: Dict[str, CameraHeat] = {}
+        self.lock = threading.Lock()
+        self.png: Dict[Tuple[str, str], tuple] = {}  # -> (png, etag, grid rendered, camera version)
+        self.saved: Dict[str, int] = {}  # camera -> version in its snapshot file
+        self.blank: Optional[Tuple[bytes, str]] = None  # one shared image for every camera without data
+        if snapshot_dir: self.load()
+
+    @staticmethod
+    def windows():
+        return list(WINDOWS) + ["live"]
+
+    def add(self, camera_id: str, boxes, now: Optional[float] = None):
+        b = np.asarray(boxes, dtype=np.float32).reshape(len(boxes), -1) if len(boxes) else None
+        if b is None or b.shape[1] < 4: return
+        x = np.clip(((b[:, 0] + b[:, 2]) * 0.5 * GRID_W).astype(np.int64), 0, GRID_W - 1)
+        y = np.clip((b[:, 3] * GRID_H).astype(np.int64), 0, GRID_H - 1)
+        with self.lock:
+            cam = self.cams.get(camera_id) or self.cams.setdefault(camera_id, CameraHeat())
+            cam.add(y * GRID_W + x, time.time() if now is None else now)
+
+    def to_png(self, camera_id: str, window: str = DEFAULT_WINDOW) -> bytes:
+        return self.render(camera_id, window)[0]
+
+    def render(self, camera_id: str, window: str = DEFAULT_WINDOW, now: Optional[float] = None) -> Tuple[bytes, str]:
+        """(png, etag); reuses the cached PNG while the grid changed less than `threshold`."""
+        if window not in self.windows(): raise ValueError(f"unknown window {window!r}")
+        now = time.time() if now is None else now
+        cached = self.png.get((camera_id, window))
+        with self.lock:
+            cam = self.cams.get(camera_id)
+            if cam is not None:
+                grid = cam.grid(window, now); version = cam.version
+                # nothing added or expired since the last render (decay alone does not change the normalised image)
+                if cached is not None and cached[3] == version: return cached[0], cached[1]
+                g = grid.copy()
+        if cam is None:
+            # the endpoint is public: ids that never sent detections must not grow the cache
+            if self.blank is None:
+                png = _encode(np.zeros((GRID_H, GRID_W), dtype=np.float32)); self.blank = (png, _etag(png))
+            return self.blank
+        if cached is not None:
+            prev = cached[2]
+            if np.abs(g - prev).sum() <= self.threshold * max(float(prev.sum()), 1.0):
+                return cached[0], cached[1]
+        png = _encode(g)
+        etag = _etag(png)
+        self.png[(camera_id, window)] = (png, etag, g, version)
+        return png, etag
+
+    # --- snapshots ---
+    def _path(self, camera_id: str) -> str:
+        return os.path.join(self.snapshot_dir, _filename(camera_id) + ".npz")
+
+    def snapshot(self) -> int:
+        """Write the grids of every camera that changed since its last snapshot to <snapshot_dir>/<camera>.npz
+        (compressed, atomic replace); returns how many were written. Safe off-loop: cameras are copied
+        one at a time under the lock, so ingest waits for one camera's copy at most. A camera that fails
+        to write is logged and retried next time; the others are still saved."""
+        if not self.snapshot_dir: return 0
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with self.lock: ids = list(self.cams)
+        written = 0
+        for cid in ids:
+            with self.lock:
+                cam = self.cams.get(cid)
+                if cam is None or self.saved.get(cid) == cam.version: continue
+                arrays = _state(cam); version = cam.version
+            path = self._path(cid); tmp = path + ".tmp.npz"
+            try:
+                np.savez_compressed(tmp, **arrays)
+                os.replace(tmp, path)
+            except Exception as e:
+                print("heatmap snapshot failed:", cid, e); continue
+            self.saved[cid] = version; written += 1
+        return written
+
+    def load(self):
+        if not os.path.isdir(self.snapshot_dir): return
+        for fn in os.listdir(self.snapshot_dir):
+            if not fn.endswith(".npz") or fn.endswith(".tmp.npz"): continue
+            cid = unquote(fn[:-4])
+            if self.owns and not self.owns(cid): continue
+            try:
+                with np.load(os.path.join(self.snapshot_dir, fn)) as z:
+                    self.cams[cid] = _restore(z)
+                self.saved[cid] = self.cams[cid].version  # on disk already: no rewrite until it changes
+            except Exception as e:
+                print("heatmap snapshot load failed:", fn, e)
+
+def _filename(camera_id: str) -> str:
+    """camera_id as a single path component: separators and the rest are %-escaped, a leading dot too
+    (so neither "." / ".." nor hidden files), plain ids like cam_1 stay as they are."""
+    name = quote(camera_id, safe="-_")
+    return "%2E" + name[1:] if name.startswith(".") else name
+
+def _state(cam: CameraHeat) -> Dict[str, np.ndarray]:
+    out = {"live": cam.live.copy(), "live_t": np.float64(cam.live_t)}
+    for name, w in cam.windows.items():
+        out[f"w_{name}"] = w.slots.copy(); out[f"c_{name}"] = np.int64(-1 if w.cur is None else w.cur)
+    return out
+
+def _restore(z) -> CameraHeat:
+    cam = CameraHeat()
+    if z["live"].shape != cam.live.shape: raise ValueError("grid size changed")
+    cam.live[:] = z["live"]; cam.live_t = float(z["live_t"])
+    for name, w in cam.windows.items():
+        if f"w_{name}" not in z or z[f"w_{name}"].shape != w.slots.shape: continue
+        w.slots[:] = z[f"w_{name}"]
+        cur = int(z[f"c_{name}"]); w.cur = None if cur < 0 else cur
+        np.sum(w.slots, axis=0, out=w.total)
+    return cam
+
+def _etag(png: bytes) -> str:
+    return '"' + hashlib.blake2b(png, digest_size=12).hexdigest() + '"'
+
+def _encode(g: np.ndarray) -> bytes:
+    peak = float(g.max())
+    img = (np.sqrt(g / peak) * 255).astype(np.uint8) if peak > 0 else np.zeros(g.shape, np.uint8)
+    img = cv2.resize(img, (GRID_W * HEATMAP_PNG_SCALE, GRID_H * HEATMAP_PNG_SCALE), interpolation=cv2.INTER_CUBIC)
+    img = cv2.applyColorMap(cv2.GaussianBlur(img, (0, 0), HEATMAP_PNG_SCALE), cv2.COLORMAP_JET)
+    ok, buf = cv2.imencode(".png", img, [cv2.IMWRITE_PNG_COMPRESSION, 6])
+    return buf.tobytes()
@@ -1,5 +1,7 @@
-import os, time, requests
+import os, time, uuid
 from typing import Dict, Any, Tuple, Optional
+from services.dispatch import Dispatcher, Message, SLACK_API_BASE, TWILIO_API_BASE
+from services.alert_state import make_alert_state
 
 SLACK_WEBHOOK = os.getenv("SLACK_WEBHOOK","").strip()
 SLACK_BOT_TOKEN = os.getenv("SLACK_BOT_TOKEN","").strip()
@@ -10,75 +12,82 @@ TWILIO_SID = os.getenv("TWILIO_ACCOUNT_SID","").strip()
 TWILIO_TOKEN = os.getenv("TWILIO_AUTH_TOKEN","").strip()
 TWILIO_FROM = os.getenv("TWILIO_FROM","").strip()
 ALERT_SMS_TO = os.getenv("ALERT_SMS_TO","").strip()
+ALERT_THREAD_TTL = int(os.getenv("ALERT_THREAD_TTL","3600"))
 
 class Notifier:
-    def __init__(self, enabled: bool = True):
+    """Dedupe/correlation decisions are awaited against `state` (services/alert_state.py: in-process TTL
+    store, or Redis shared by all API replicas); every outbound post is handed to the Dispatcher, so
+    nothing here waits on Slack or Twilio. Threads are referred to by key and the dispatcher resolves the
+    key to Slack's thread_ts at send time (also through `state`, so any replica can reply in a thread)."""
+    def __init__(self, enabled: bool = True, dispatcher: Optional[Dispatcher] = None, state=None, on_sent=None):
         self.enabled = enabled
-        self.last_sent = {}     # (cam,type) -> ts
-        self.threads = {}       # (cam,type) -> ts_id
-        self.corr = {}          # type -> { first_ts, cams:set }
+        self.state = state or make_alert_state()
+        self.dispatcher = dispatcher or Dispatcher(threads=self.state.mapping("slack_ts:", ALERT_THREAD_TTL), on_sent=on_sent)
 
-    def _should_send(self, alert: Dict[str,Any]) -> bool:
-        key = (alert["camera_id"], alert["type"])
-        last = self.last_sent.get(key, 0)
-        if alert["ts"] - last < ALERT_DEDUPE_SECONDS:
-            return False
-        self.last_sent[key] = alert["ts"]
-        return True
+    async def _should_send(self, alert: Dict[str,Any]) -> bool:
+        # first caller in the window wins, across replicas; later ones are deduped until the key expires
+        return await self.state.claim(f"dedupe:{alert['camera_id']}:{alert['type']}", ALERT_DEDUPE_SECONDS)
 
-    def maybe_send_with_blocks(self, alert: Dict[str,Any]) -> Tuple[bool, Optional[str], bool]:
+    async def _thread(self, alert: Dict[str,Any]) -> Optional[str]:
+        return await self.state.get(f"thread:{alert['camera_id']}:{alert['type']}")
+
+    async def maybe_send_with_blocks(self, alert: Dict[str,Any]) -> Tuple[bool, Any, bool]:
         if not self.enabled:
             return (True, None, False)
-        # correlation accumulation
-        c = self.corr.get(alert["type"])
-        now = alert["ts"]
-        if not c or now - c["first_ts"] > ALERT_CORRELATE_SECONDS:
-            c = {"first_ts": now, "cams": set()}
-        c["cams"].add(alert["camera_id"])
-        self.corr[alert["type"]] = c
+        # correlation accumulation (sliding window of time buckets)
+        cams = await self.state.correlate(alert["type"], alert["camera_id"], ALERT_CORRELATE_SECONDS)
         corr_posted = False
 
-        if not self._should_send(alert):
+        if not await self._should_send(alert):
             # If in same correlation window, and we have a thread, append small update
-            thread_ts = self.threads.get((alert["camera_id"], alert["type"]))
+            thread_ts = await self._thread(alert)
             if thread_ts:
-                self.post_thread_message(f"Another `{alert['type']}` detected on {alert['camera_id']}.", thread_ts=thread_ts)
-            return (False, self.threads.get((alert["camera_id"], alert["type"])), False)
+                self._post_another(alert, thread_ts)
+            return (False, thread_ts, False)
 
         # Build blocks
         blocks = [
             {"type":"section","text":{"type":"mrkdwn","text":f"*{alert['type'].upper()}* detected on *{alert['camera_id']}*"}},
             {"type":"context","elements":[{"type":"mrkdwn","text":f"Confidence: `{alert['confidence']}` · Time: `{int(alert['ts'])}`"}]}
         ]
-        thread_ts = self._post_blocks(blocks)
+        thread_ts = self._post_blocks(blocks, f"{alert['camera_id']}:{alert['type']}:{uuid.uuid4().hex[:12]}", alert["ts"])
         if thread_ts:
-            self.threads[(alert["camera_id"], alert["type"])] = thread_ts
+            await self.state.set(f"thread:{alert['camera_id']}:{alert['type']}", thread_ts, ALERT_THREAD_TTL)
 
         # If multiple cameras saw same type within window, post a summary
-        c = self.corr.get(alert["type"])
-        if c and len(c["cams"]) > 1:
-            cams_list = ", ".join(sorted(c["cams"]))
+        if len(cams) > 1:
+            cams_list = ", ".join(sorted(cams))
             self.post_thread_message(f"*Correlation:* `{alert['type']}` also seen on: {cams_list}", thread_ts=thread_ts)
             corr_posted = True
 
         self._sms(alert)
         return (True, thread_ts, corr_posted)
 
-    def post_thread_message(self, text: str, thread_ts: Optional[str] = None):
-        if SLACK_BOT_TOKEN and SLACK_CHANNEL_ID and thread_ts:
-            try:
-                requests.post("https://slack.com/api/chat.postMessage",
-                              headers={"Authorization": f"Bearer {SLACK_BOT_TOKEN}"},
-                              data={"channel": SLACK_CHANNEL_ID, "text": text, "thread_ts": thread_ts}, timeout=5)
-            except Exception as e:
-                print("Slack thread post failed:", e)
-        elif SLACK_WEBHOOK:
-            try:
-                requests.post(SLACK_WEBHOOK, json={"text": text}, timeout=5)
-            except Exception as e:
-                print("Slack webhook thread fallback failed:", e)
+    def post_thread_message(self, text: str, thread_ts: Any = None):
+        msg = self._slack_text(text, thread_ts)
+        if msg: self.dispatcher.enqueue(msg)
+
+    def _slack_text(self, text: str, thread_key: Any = None) -> Optional[Message]:
+        if SLACK_BOT_TOKEN and SLACK_CHANNEL_ID and thread_key:
+            return Message(f"slack:{SLACK_CHANNEL_ID}", f"{SLACK_API_BASE}/chat.postMessage",
+                           headers={"Authorization": f"Bearer {SLACK_BOT_TOKEN}"},
+                           data={"channel": SLACK_CHANNEL_ID, "text": text}, thread_key=thread_key)
+        if SLACK_WEBHOOK:
+            return Message("slack_webhook", SLACK_WEBHOOK, json={"text": text})
+        return None
+
+    def _post_another(self, alert: Dict[str,Any], thread_key: Any):
+        # repeats inside the dedupe window become one "N more" reply per thread instead of one post each
+        msg = self._slack_text("", thread_key)
+        if not msg: return
+        typ, cam = alert["type"], alert["camera_id"]
+        def render(m: Message):
+            text = f"Another `{typ}` detected on {cam}." if m.count == 1 else f"{m.count} more `{typ}` detections on {cam}."
+            (m.data if m.data is not None else m.json)["text"] = text
+        msg.render = render
+        self.dispatcher.enqueue_coalesced(("another", thread_key), msg)
 
-    def post_thread_message_blocks(self, urls: Dict[str,str|None], thread_ts: Optional[str] = None):
+    def post_thread_message_blocks(self, urls: Dict[str,str|None], thread_ts: Any = None):
         mp4 = urls.get("mp4"); gif = urls.get("gif")
         text = mp4 or gif or ""
         if SLACK_BOT_TOKEN and SLACK_CHANNEL_ID and thread_ts:
@@ -87,39 +96,26 @@ class Notifier:
                 blocks.append({"type":"image","image_url": gif, "alt_text":"clip"})
             if mp4:
                 blocks.append({"type":"section","text":{"type":"mrkdwn","text":f"<{mp4}|Download MP4>"}})
-            try:
-                requests.post("https://slack.com/api/chat.postMessage",
-                              headers={"Authorization": f"Bearer {SLACK_BOT_TOKEN}","Content-Type":"application/json"},
-                              json={"channel": SLACK_CHANNEL_ID, "blocks": blocks, "thread_ts": thread_ts}, timeout=5)
-            except Exception as e:
-                print("Slack blocks thread post failed:", e)
+            self.dispatcher.enqueue(Message(f"slack:{SLACK_CHANNEL_ID}", f"{SLACK_API_BASE}/chat.postMessage",
+                                            headers={"Authorization": f"Bearer {SLACK_BOT_TOKEN}"},
+                                            json={"channel": SLACK_CHANNEL_ID, "blocks": blocks}, thread_key=thread_ts))
         else:
             self.post_thread_message(f"Clip: {text}", thread_ts=thread_ts)
 
-    def _post_blocks(self, blocks) -> Optional[str]:
+    def _post_blocks(self, blocks, thread_key: Any, origin: Optional[float] = None) -> Optional[Any]:
+        """Queue the root message of a thread; returns the key later replies use in place of its ts."""
         if SLACK_BOT_TOKEN and SLACK_CHANNEL_ID:
-            try:
-                r = requests.post("https://slack.com/api/chat.postMessage",
-                                  headers={"Authorization": f"Bearer {SLACK_BOT_TOKEN}","Content-Type":"application/json"},
-                                  json={"channel": SLACK_CHANNEL_ID, "blocks": blocks}, timeout=5)
-                data = r.json()
-                if data.get("ok"):
-                    return data.get("ts")
-            except Exception as e:
-                print("Slack bot post failed:", e)
+            self.dispatcher.enqueue(Message(f"slack:{SLACK_CHANNEL_ID}", f"{SLACK_API_BASE}/chat.postMessage",
+                                            headers={"Authorization": f"Bearer {SLACK_BOT_TOKEN}"},
+                                            json={"channel": SLACK_CHANNEL_ID, "blocks": blocks}, root_key=thread_key,
+                                            origin=origin))
+            return thread_key
         if SLACK_WEBHOOK:
-            try:
-                requests.post(SLACK_WEBHOOK, json={"blocks": blocks}, timeout=5)
-            except Exception as e:
-                print("Slack webhook failed:", e)
+            self.dispatcher.enqueue(Message("slack_webhook", SLACK_WEBHOOK, json={"blocks": blocks}, origin=origin))
         return None
 
     def _sms(self, alert: Dict[str,Any]):
         if TWILIO_SID and TWILIO_TOKEN and TWILIO_FROM and ALERT_SMS_TO:
-            try:
-                auth = (TWILIO_SID, TWILIO_TOKEN)
-                data = {"From": TWILIO_FROM, "To": ALERT_SMS_TO, "Body": f"{alert['type']} at {alert['camera_id']}"}
-                url = f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_SID}/Messages.json"
-                requests.post(url, data=data, auth=auth, timeout=5)
-            except Exception as e:
-                print("Twilio notify failed:", e)
+            data = {"From": TWILIO_FROM, "To": ALERT_SMS_TO, "Body": f"{alert['type']} at {alert['camera_id']}"}
+            url = f"{TWILIO_API_BASE}/2010-04-01/Accounts/{TWILIO_SID}/Messages.json"
+            self.dispatcher.enqueue(Message("twilio", url, data=data, auth=(TWILIO_SID, TWILIO_TOKEN), origin=alert["ts"]))
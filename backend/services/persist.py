@@ -0,0 +1,236 @@
+import glob, json, os, sys, threading, time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, insert
+
+# Write-behind persistence: the request path only appends to an in-memory queue; a background thread
+# flushes it as multi-row INSERTs (one statement per batch) through a pooled engine when PERSIST_BATCH
+# rows are waiting or PERSIST_FLUSH_SECONDS have passed. If the database is unreachable, batches are
+# spilled to JSONL journal segments on disk and replayed, oldest first, once it answers again.
+# Optionally, ingested detections are downsampled into a per-camera history table for analytics; a
+# bucket is written when the camera's next window starts or, for quiet cameras and backfill, by the
+# writer thread once the window is over and no frame has been added to it for PERSIST_FLUSH_SECONDS.
+# The alerts table belongs to services.db (init_db creates it): it is reflected from the database on
+# first use rather than declared here, so rows are written against whatever schema that module owns.
+# detection_history is this module's own and is created if missing.
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+PERSIST_BATCH = int(os.getenv("PERSIST_BATCH", "500"))
+PERSIST_FLUSH_SECONDS = float(os.getenv("PERSIST_FLUSH_SECONDS", "1.0"))
+PERSIST_QUEUE_MAX = int(os.getenv("PERSIST_QUEUE_MAX", "100000"))
+PERSIST_JOURNAL_DIR = os.getenv("PERSIST_JOURNAL_DIR", "/tmp/sva_journal")
+PERSIST_JOURNAL_MAX_MB = float(os.getenv("PERSIST_JOURNAL_MAX_MB", "256"))
+PERSIST_RETRY_SECONDS = float(os.getenv("PERSIST_RETRY_SECONDS", "5"))
+DETECTION_HISTORY_SECONDS = float(os.getenv("DETECTION_HISTORY_SECONDS", "10"))  # 0 = no history
+
+metadata = MetaData()
+detection_history = Table(
+    "detection_history", metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("camera_id", String(128), nullable=False, index=True),
+    Column("ts", Float, nullable=False, index=True),   # bucket start
+    Column("frames", Integer, nullable=False),
+    Column("avg_count", Float, nullable=False),
+    Column("max_count", Integer, nullable=False),
+)
+ALERT_COLUMNS = ("type", "camera_id", "confidence", "message", "ts")
+
+def make_engine(url: str = DATABASE_URL):
+    kw = {"pool_pre_ping": True}
+    if not url.startswith("sqlite"): kw.update(pool_size=4, max_overflow=4, pool_recycle=1800)
+    return create_engine(url, **kw)
+
+class WriteBehind(threading.Thread):
+    def __init__(self, engine=None, url: str = DATABASE_URL, batch: int = PERSIST_BATCH,
+                 flush_seconds: float = PERSIST_FLUSH_SECONDS, queue_max: int = PERSIST_QUEUE_MAX,
+                 journal_dir: str = PERSIST_JOURNAL_DIR, journal_max_mb: float = PERSIST_JOURNAL_MAX_MB,
+                 retry_seconds: float = PERSIST_RETRY_SECONDS, history_seconds: float = DETECTION_HISTORY_SECONDS):
+        super().__init__(daemon=True, name="write-behind")
+        self.engine = engine if engine is not None else (make_engine(url) if url else None)
+        self.batch = batch
+        self.flush_seconds = flush_seconds
+        self.journal_dir = journal_dir
+        self.journal_max = journal_max_mb * 1024 * 1024
+        self.retry_seconds = retry_seconds
+        self.history_seconds = history_seconds
+        self.queue: deque = deque(maxlen=queue_max)   # (table name, row); oldest dropped if the writer falls far behind
+        self.cond = threading.Condition()
+        # (camera, backfill) -> [bucket start, frames, sum, max, last add (monotonic)]
+        self.buckets: Dict[Tuple[str, bool], List] = {}
+        self.db_up = self.engine is not None
+        self.journaled = bool(self._segments())  # segments left to replay (e.g. from before a restart)
+        self.tables: Optional[Dict[str, Table]] = None  # resolved on first write, see table()
+        self.next_retry = 0.0
+        self.stopped = False
+        self.counts = {"queued": 0, "written": 0, "batches": 0, "spilled": 0, "replayed": 0, "dropped": 0, "errors": 0}
+
+    def table(self, name: str) -> Table:
+        """"alerts" as reflected from the database (created by services.db.init_db), or detection_history.
+        Raises while the database is unreachable or init_db has not created the alerts table yet."""
+        if self.tables is None:
+            metadata.create_all(self.engine)
+            self.tables = {"alerts": Table("alerts", MetaData(), autoload_with=self.engine),
+                           "detection_history": detection_history}
+        return self.tables[name]
+
+    # --- producer side (any thread, never blocks on the database) ---
+    def add_alert(self, alert: Dict[str, Any]):
+        self._put("alerts", {k: alert.get(k) for k in ALERT_COLUMNS})
+
+    def add_detections(self, camera_id: str, ts: float, count: int, backfill: bool = False):
+        """Fold one frame's person count into the camera's current history bucket. Replayed (older)
+        frames get their own bucket so they do not cut the live one short."""
+        if not self.history_seconds: return
+        start = ts - ts % self.history_seconds
+        key = (camera_id, backfill)
+        with self.cond:
+            b = self.buckets.get(key)
+            if b is not None and b[0] != start:
+                self._append_bucket(camera_id, b)
+                b = None
+            if b is None: b = self.buckets[key] = [start, 0, 0, 0, 0.0]
+            b[1] += 1; b[2] += count; b[3] = max(b[3], count); b[4] = time.monotonic()
+
+    def close_buckets(self, now: Optional[float] = None) -> int:
+        """Queue the buckets whose window is over (wall clock) and that have been idle for flush_seconds,
+        so a camera that went quiet, or a finished backfill, does not sit in memory until the next frame."""
+        now = time.time() if now is None else now
+        idle = time.monotonic() - self.flush_seconds
+        with self.cond:
+            done = [k for k, b in self.buckets.items() if b[0] + self.history_seconds < now and b[4] <= idle]
+            for key in done: self._append_bucket(key[0], self.buckets.pop(key))
+        return len(done)
+
+    def _append_bucket(self, camera_id: str, b: List):
+        self._append("detection_history", {"camera_id": camera_id, "ts": b[0], "frames": b[1],
+                                           "avg_count": b[2] / b[1], "max_count": b[3]})
+
+    def _put(self, table: str, row: Dict[str, Any]):
+        with self.cond: self._append(table, row)
+
+    def _append(self, table, row):
+        if len(self.queue) == self.queue.maxlen: self.counts["dropped"] += 1
+        self.queue.append((table, row)); self.counts["queued"] += 1
+        if len(self.queue) >= self.batch: self.cond.notify()
+
+    # --- writer thread ---
+    def run(self):
+        while not self.stopped:
+            with self.cond:
+                if len(self.queue) < self.batch: self.cond.wait(self.flush_seconds)
+            try:
+                if self.buckets: self.close_buckets()
+                self.flush()
+            except Exception as e:
+                # never let one bad flush end the thread: everything queued after it would be lost silently
+                self.counts["errors"] += 1; print("write-behind: flush failed:", e)
+                time.sleep(min(self.retry_seconds, 1.0))
+
+    def flush(self):
+        while True:
+            with self.cond:
+                if not self.queue: break
+                n = min(self.batch, len(self.queue))
+                items = [self.queue.popleft() for _ in range(n)]
+            self._write(items)
+        # the journal is only looked at while it is known to hold segments, not on every wakeup
+        if self.journaled and (self.db_up or time.monotonic() >= self.next_retry): self._replay()
+
+    def _write(self, items: List[Tuple[str, Dict[str, Any]]]) -> bool:
+        if self.engine is None:
+            self.counts["dropped"] += len(items); return False
+        if self.db_up or time.monotonic() >= self.next_retry:
+            try:
+                self._insert(items)
+                self.db_up = True; return True
+            except Exception as e:
+                if self.db_up: print("write-behind: insert failed, journaling:", e)
+                self.db_up = False; self.next_retry = time.monotonic() + self.retry_seconds
+        try: self._spill(items)
+        except OSError as e:
+            self.counts["dropped"] += len(items); print("write-behind: journal write failed, dropping batch:", e)
+        return False
+
+    def _insert(self, items):
+        by_table: Dict[str, List[Dict[str, Any]]] = {}
+        for t, row in items: by_table.setdefault(t, []).append(row)
+        tables = {t: self.table(t) for t in by_table}
+        with self.engine.begin() as conn:
+            # executemany of one insert(): SQLAlchemy 2 sends it as multi-row INSERT ... VALUES batches
+            for t, rows in by_table.items():
+                cols = tables[t].c
+                if t == "alerts" and any(k not in cols for k in ALERT_COLUMNS):
+                    rows = [{k: v for k, v in r.items() if k in cols} for r in rows]
+                conn.execute(insert(tables[t]), rows)
+        self.counts["written"] += len(items); self.counts["batches"] += 1
+
+    # --- journal ---
+    def _segments(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.journal_dir, "*.jsonl")))
+
+    def _journal_size(self) -> int:
+        return sum(os.path.getsize(p) for p in self._segments())
+
+    def _spill(self, items):
+        os.makedirs(self.journal_dir, exist_ok=True)
+        if self._journal_size() > self.journal_max:
+            self.counts["dropped"] += len(items); return
+        path = os.path.join(self.journal_dir, f"{time.time_ns()}.jsonl")
+        with open(path + ".tmp", "w") as f:
+            for t, row in items: f.write(json.dumps([t, row]) + "\n")
+        os.replace(path + ".tmp", path)  # replay never sees half-written segments
+        self.counts["spilled"] += len(items); self.journaled = True
+
+    def _replay(self):
+        if self.engine is None: return
+        for path in self._segments():
+            with open(path) as f: items = [tuple(json.loads(l)) for l in f if l.strip()]
+            try:
+                for k in range(0, len(items), self.batch): self._insert(items[k:k + self.batch])
+            except Exception:
+                # segments are written per batch, so a partial replay can only repeat one segment's rows
+                self.db_up = False; self.next_retry = time.monotonic() + self.retry_seconds; return
+            os.remove(path); self.counts["replayed"] += len(items)
+        self.journaled = False
+
+    def stop(self, flush: bool = True):
+        self.stopped = True
+        with self.cond:
+            for (cam, _), b in self.buckets.items(): self._append_bucket(cam, b)
+            self.buckets.clear(); self.cond.notify()
+        if self.is_alive(): self.join(timeout=30)
+        if flush: self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counts, pending=len(self.queue), db_up=self.db_up)
+
+def benchmark(url: str = "sqlite:////tmp/sva_persist_bench.db", n: int = 20000):
+    """Row-at-a-time commits (what a synchronous save per alert costs) vs write-behind batches."""
+    if url.startswith("sqlite:///"):
+        p = url[len("sqlite:///"):]
+        if os.path.exists(p): os.remove(p)
+    eng = make_engine(url)
+    # stand-in for the alerts table services.db.init_db() creates in a deployment
+    alerts_table = Table("alerts", MetaData(), Column("id", Integer, primary_key=True, autoincrement=True),
+                         *(Column(c, String(128) if c in ("type", "camera_id", "message") else Float)
+                           for c in ALERT_COLUMNS))
+    alerts_table.metadata.create_all(eng)
+    rows = [{"type": "gun", "camera_id": f"cam_{i % 16}", "confidence": 0.9, "message": "bench", "ts": 1e9 + i}
+            for i in range(n)]
+    k = min(n, 2000)
+    t0 = time.perf_counter()
+    for r in rows[:k]:
+        with eng.begin() as c: c.execute(insert(alerts_table), r)
+    sync_rate = k / (time.perf_counter() - t0)
+    wb = WriteBehind(eng, journal_dir="/tmp/sva_persist_bench_journal", history_seconds=0)
+    wb.start()
+    t0 = time.perf_counter(); enqueue = 0.0
+    for r in rows:
+        s = time.perf_counter(); wb.add_alert(r); enqueue = max(enqueue, time.perf_counter() - s)
+    wb.stop()
+    wb_rate = n / (time.perf_counter() - t0)
+    return {"url": url, "sync_rows_per_s": round(sync_rate), "write_behind_rows_per_s": round(wb_rate),
+            "max_enqueue_us": round(enqueue * 1e6, 1), **wb.stats()}
+
+if __name__ == "__main__":
+    print(benchmark(*sys.argv[1:2]))
@@ -0,0 +1,55 @@
+import os, sys, threading, time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+# Opt-in sampling profiler (PROFILE_ENABLED): snapshots every thread's Python stack through
+# sys._current_frames() each `interval` seconds for a bounded time and aggregates where the time went.
+# "self" is the innermost frame (by line), "total" any frame on the stack (by function, once per
+# sample), "stacks" are collapsed root;...;leaf strings ready for a flame graph. Nothing is hooked into
+# calls, so the cost depends on the sample rate only and it is safe to run against live traffic.
+# The edge agent uses this same module (edge_agent/Dockerfile copies it into the agent image, and
+# edge_agent/profiling.py finds it here when run from a checkout), so it imports nothing but the stdlib.
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "30"))
+
+# stacks parked in one of these modules are waiting, not working (selector loop, queues, conditions)
+_IDLE = ("threading.py", "selectors.py", "queue.py", "base_events.py")
+_running = threading.Lock()
+
+def _where(code, line=None) -> str:
+    name = os.path.basename(code.co_filename)
+    return f"{name}:{code.co_name}" + (f":{line}" if line is not None else "")
+
+def sample(seconds: float, interval: float = PROFILE_INTERVAL, thread: Optional[str] = None,
+           top: int = 25, idle: bool = False) -> Dict[str, Any]:
+    """Blocks for `seconds` (run it off the event loop). `thread` keeps only threads whose name contains
+    it; idle stacks are dropped unless `idle`. Raises RuntimeError if a profile is already running."""
+    if not _running.acquire(blocking=False): raise RuntimeError("a profile is already running")
+    try:
+        seconds = min(seconds, PROFILE_MAX_SECONDS)
+        me = threading.get_ident()
+        own, total, stacks, per_thread = Counter(), Counter(), Counter(), Counter()
+        n = skipped = 0
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                name = names.get(tid, str(tid))
+                if tid == me or (thread and thread not in name): continue
+                if not idle and os.path.basename(frame.f_code.co_filename) in _IDLE:
+                    skipped += 1; continue
+                n += 1; per_thread[name] += 1
+                own[_where(frame.f_code, frame.f_lineno)] += 1
+                chain = []
+                while frame is not None:
+                    chain.append(_where(frame.f_code)); frame = frame.f_back
+                total.update(set(chain))
+                stacks[";".join(reversed(chain))] += 1
+            time.sleep(interval)
+        pct = lambda c: [{"where": k, "samples": v, "pct": round(100 * v / n, 1)} for k, v in c.most_common(top)] if n else []
+        return {"seconds": seconds, "interval": interval, "samples": n, "idle_samples": skipped,
+                "threads": dict(per_thread), "self": pct(own), "total": pct(total),
+                "stacks": [{"stack": k, "samples": v} for k, v in stacks.most_common(top)]}
+    finally:
+        _running.release()
@@ -0,0 +1,163 @@
+import asyncio, json, os
+from typing import Any, Callable, Dict, List, Optional
+
+# Cross-worker events (alerts for every worker's WebSocket clients, zone / camera changes, camera health).
+# Subscribers get every message on their channels, their own included; payloads are JSON objects.
+#   ""                 LocalPubSub: in-process only (single worker, tests)
+#   redis://...        RedisPubSub: PUBLISH / SUBSCRIBE on a shared Redis
+#   unix:///path.sock  SocketPubSub: the line-relay broker serve.py runs when there is no Redis
+# publish() never blocks: messages go through a bounded queue drained by a writer task, so the alert
+# path is unaffected by a slow or unreachable broker (it drops and counts instead).
+PUBSUB_URL = os.getenv("PUBSUB_URL", os.getenv("REDIS_URL", "")).strip()
+PUBSUB_QUEUE_MAX = int(os.getenv("PUBSUB_QUEUE_MAX", "10000"))
+PUBSUB_PREFIX = "sva:"
+
+Handler = Callable[[Dict[str, Any]], None]
+
+class LocalPubSub:
+    def __init__(self):
+        self.handlers: Dict[str, List[Handler]] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.counts = {"published": 0, "received": 0, "dropped": 0, "handler_errors": 0}
+
+    def subscribe(self, channel: str, handler: Handler):
+        """Register before start()."""
+        self.handlers.setdefault(channel, []).append(handler)
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+
+    async def close(self):
+        pass
+
+    def publish(self, channel: str, msg: Dict[str, Any]):
+        self.counts["published"] += 1
+        # delivered on a later loop iteration, like a remote broker would
+        self.loop.call_soon(self._dispatch, channel, msg)
+
+    def _dispatch(self, channel: str, msg: Dict[str, Any]):
+        self.counts["received"] += 1
+        for h in self.handlers.get(channel, ()):
+            try: h(msg)
+            except Exception as e:
+                self.counts["handler_errors"] += 1; print("pubsub handler failed:", channel, e)
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(self.counts, backend=type(self).__name__)
+
+class _RemotePubSub(LocalPubSub):
+    """Writer task drains the outbound queue; reader task dispatches; both reconnect after errors."""
+    def __init__(self, url: str, queue_max: int = PUBSUB_QUEUE_MAX):
+        super().__init__()
+        self.url = url
+        self.queue_max = queue_max
+        self.queue: Optional[asyncio.Queue] = None
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        await super().start()
+        self.queue = asyncio.Queue(self.queue_max)
+        self.tasks = [asyncio.create_task(self._reader()), asyncio.create_task(self._writer())]
+
+    async def close(self):
+        for t in self.tasks: t.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def publish(self, channel: str, msg: Dict[str, Any]):
+        try: self.queue.put_nowait((channel, json.dumps(msg)))
+        except asyncio.QueueFull: self.counts["dropped"] += 1; return
+        self.counts["published"] += 1
+
+    async def _reader(self):
+        while True:
+            try: await self._listen()
+            except asyncio.CancelledError: raise
+            except Exception as e: print("pubsub: subscriber disconnected:", e)
+            await asyncio.sleep(1.0)
+
+    async def _writer(self):
+        while True:
+            channel, data = await self.queue.get()
+            try: await self._send(channel, data)
+            except asyncio.CancelledError: raise
+            except Exception as e:
+                self.counts["dropped"] += 1; print("pubsub: publish failed:", e)
+                await asyncio.sleep(1.0)
+
+    def _received(self, channel: str, data):
+        try: msg = json.loads(data)
+        except ValueError: return
+        self._dispatch(channel, msg)
+
+class RedisPubSub(_RemotePubSub):
+    async def start(self):
+        import redis.asyncio as aioredis
+        self.client = aioredis.Redis.from_url(self.url, socket_connect_timeout=1.0)
+        await super().start()
+
+    async def close(self):
+        await super().close()
+        await self.client.aclose()
+
+    async def _listen(self):
+        ps = self.client.pubsub()
+        try:
+            await ps.subscribe(*(PUBSUB_PREFIX + c for c in self.handlers))
+            async for m in ps.listen():
+                if m["type"] == "message": self._received(m["channel"].decode()[len(PUBSUB_PREFIX):], m["data"])
+        finally:
+            await ps.aclose()
+
+    async def _send(self, channel: str, data: str):
+        await self.client.publish(PUBSUB_PREFIX + channel, data)
+
+class SocketPubSub(_RemotePubSub):
+    """Client of serve_broker(): one JSON line per message, {"c": channel, "m": payload}."""
+    def __init__(self, url: str, queue_max: int = PUBSUB_QUEUE_MAX):
+        super().__init__(url, queue_max)
+        self.path = url[len("unix://"):]
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def _listen(self):
+        reader, self.writer = await asyncio.open_unix_connection(self.path, limit=2 ** 22)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: raise ConnectionError("broker closed the connection")
+                try: env = json.loads(line)
+                except ValueError: continue
+                if env.get("c") in self.handlers: self._dispatch(env["c"], env["m"])
+        finally:
+            self.writer.close(); self.writer = None
+
+    async def _send(self, channel: str, data: str):
+        if self.writer is None: raise ConnectionError("not connected to broker")
+        self.writer.write(f'{{"c": {json.dumps(channel)}, "m": {data}}}\n'.encode())
+        await self.writer.drain()
+
+async def serve_broker(path: str):
+    """Relay every line from any client to all clients (sender included). Runs until cancelled."""
+    clients = set()
+
+    async def client(reader, writer):
+        clients.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line: break
+                for w in list(clients):
+                    w.write(line)
+                    # a subscriber this far behind is broken: cut it loose rather than buffer without bound
+                    if w.transport.get_write_buffer_size() > 2 ** 24: w.close(); clients.discard(w)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError): pass
+        finally:
+            clients.discard(writer); writer.close()
+
+    if os.path.exists(path): os.remove(path)
+    server = await asyncio.start_unix_server(client, path, limit=2 ** 22)
+    async with server: await server.serve_forever()
+
+def make_pubsub(url: str = PUBSUB_URL) -> LocalPubSub:
+    if url.startswith(("redis://", "rediss://")): return RedisPubSub(url)
+    if url.startswith("unix://"): return SocketPubSub(url)
+    return LocalPubSub()
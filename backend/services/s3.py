@@ -1,4 +1,5 @@
-import os, boto3
+import os, threading, boto3
+from boto3.s3.transfer import TransferConfig
 from botocore.config import Config
 
 S3_ENDPOINT_URL=os.getenv("S3_ENDPOINT_URL")
@@ -7,21 +8,38 @@ S3_ACCESS_KEY=os.getenv("S3_ACCESS_KEY")
 S3_SECRET_KEY=os.getenv("S3_SECRET_KEY")
 S3_BUCKET=os.getenv("S3_BUCKET","clips")
 S3_USE_SSL=os.getenv("S3_USE_SSL","false").lower()=="true"
+S3_MAX_POOL=int(os.getenv("S3_MAX_POOL","16"))
+S3_MULTIPART_MB=int(os.getenv("S3_MULTIPART_MB","8"))
+
+# clips are a few MB: multipart (parallel parts) only kicks in for the large ones
+TRANSFER = TransferConfig(multipart_threshold=S3_MULTIPART_MB * 1024 * 1024,
+                          multipart_chunksize=S3_MULTIPART_MB * 1024 * 1024, max_concurrency=4, use_threads=True)
+_client = None
+_lock = threading.Lock()
 
 def client():
+    """Shared client (boto3 clients are thread-safe); building one per upload costs more than small uploads."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None: _client = _make_client()
+    return _client
+
+def _make_client():
     return boto3.client(
         "s3",
         endpoint_url=S3_ENDPOINT_URL,
         region_name=S3_REGION,
         aws_access_key_id=S3_ACCESS_KEY,
         aws_secret_access_key=S3_SECRET_KEY,
-        config=Config(s3={"addressing_style":"path"}),
+        config=Config(s3={"addressing_style":"path"}, max_pool_connections=S3_MAX_POOL, retries={"max_attempts": 3, "mode": "standard"}),
         use_ssl=S3_USE_SSL,
         verify=S3_USE_SSL,
     )
 
-def upload_file(path: str, key: str) -> str:
+def upload_file(path: str, key: str, content_type: str | None = None) -> str:
     c = client()
-    c.upload_file(path, S3_BUCKET, key)
+    extra = {"ContentType": content_type} if content_type else None
+    c.upload_file(path, S3_BUCKET, key, ExtraArgs=extra, Config=TRANSFER)
     url = c.generate_presigned_url("get_object", Params={"Bucket": S3_BUCKET, "Key": key}, ExpiresIn=3600)
     return url
@@ -0,0 +1,162 @@
+import os, shutil, threading, time
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Per-camera index of recent HLS segments with absolute times, kept independently of the live playlist.
+# ffmpeg rewrites index.m3u8 in place (and with delete_segments removes old .ts files), so instead of
+# re-reading the whole playlist per clip, a poller re-parses it only when it changed and appends just
+# the segments past the last seen media sequence. Each new segment is hard-linked into a ring directory
+# so pre-event footage survives the playlist rolling over; the ring keeps `retention` seconds. The ring
+# lives outside the HLS tree (which is served as-is under /hls); links need it on the same filesystem,
+# otherwise segments are copied.
+SEGMENT_POLL_SECONDS = float(os.getenv("SEGMENT_POLL_SECONDS", "0.5"))
+SEGMENT_RETENTION_SECONDS = float(os.getenv("SEGMENT_RETENTION_SECONDS", "60"))
+SEGMENT_RING_DIR = os.getenv("SEGMENT_RING_DIR", "")  # default: <HLS_OUTPUT_DIR>-ring next to the HLS dir
+
+Segment = Tuple[float, float, str, int]  # (start_ts, end_ts, path, bytes)
+
+class SegmentIndex:
+    def __init__(self, camera_id: str, playlist: str, ring_dir: str, retention: float = SEGMENT_RETENTION_SECONDS):
+        self.camera_id = camera_id
+        self.playlist = playlist
+        self.ring_dir = ring_dir
+        self.retention = retention
+        self.starts: List[float] = []
+        self.segments: List[Segment] = []
+        self.last_seq = -1
+        self.last_file = None  # (inode, mtime_ns) of the segment last indexed
+        self.stamp = None  # (mtime_ns, size) of the playlist last parsed
+        self.restarts = 0
+        self.cond = threading.Condition()
+        os.makedirs(ring_dir, exist_ok=True)
+
+    def poll(self) -> int:
+        """Pick up segments added since the last poll; returns how many were added."""
+        try: st = os.stat(self.playlist)
+        except FileNotFoundError:
+            # the stream stopped; whatever playlist shows up next is a new one, numbered from scratch
+            if self.stamp is not None: self.stamp = None; self.last_seq = -1
+            return 0
+        if (st.st_mtime_ns, st.st_size) == self.stamp: return 0
+        self.stamp = (st.st_mtime_ns, st.st_size)
+        with open(self.playlist, "r", encoding="utf-8") as f: lines = f.read().splitlines()
+        seq, dur, pdt, entries = 0, None, None, []
+        base = os.path.dirname(self.playlist)
+        for l in lines:
+            if l.startswith("#EXT-X-MEDIA-SEQUENCE:"):
+                seq = int(l.split(":", 1)[1])
+            elif l.startswith("#EXT-X-PROGRAM-DATE-TIME:"):
+                pdt = datetime.fromisoformat(l.split(":", 1)[1].strip().replace("Z", "+00:00")).timestamp()
+            elif l.startswith("#EXTINF:"):
+                dur = float(l.split(":", 1)[1].split(",")[0])
+            elif l and not l.startswith("#") and dur is not None:
+                entries.append((seq, dur, pdt, os.path.join(base, l.strip())))
+                seq += 1; dur = pdt = None
+        if entries and (entries[-1][0] < self.last_seq or self._replaced(entries)):
+            # ffmpeg restarted and numbers its segments from the start again
+            self.last_seq = -1; self.restarts += 1
+        new = [e for e in entries if e[0] > self.last_seq]
+        added = [s for s in (self._add(*n) for n in new) if s]
+        if added:
+            with self.cond:
+                for s in added:
+                    if self.segments and s[0] < self.segments[-1][0]: continue  # clock went backwards
+                    self.starts.append(s[0]); self.segments.append(s)
+                self.cond.notify_all()
+        self._prune()
+        return len(added)
+
+    def _replaced(self, entries) -> bool:
+        """The playlist's segment at last_seq is another file than the one indexed: a restarted stream
+        that has already caught up with the old sequence number."""
+        for seq, _, _, src in entries:
+            if seq != self.last_seq: continue
+            try: st = os.stat(src)
+            except FileNotFoundError: return False
+            return (st.st_ino, st.st_mtime_ns) != self.last_file
+        return False
+
+    def _add(self, seq: int, dur: float, pdt: Optional[float], src: str) -> Optional[Segment]:
+        self.last_seq = seq
+        try:
+            st = os.stat(src)
+            self.last_file = (st.st_ino, st.st_mtime_ns)
+            # without PROGRAM-DATE-TIME the segment's mtime (when ffmpeg finished writing it) marks its end
+            start = pdt if pdt is not None else st.st_mtime - dur
+            # named by start time, not sequence: after an ffmpeg restart sequence numbers (and segment file
+            # names) repeat, and a ring entry must never be an older segment's footage
+            dst = os.path.join(self.ring_dir, f"{int(start * 1000)}-{seq}{os.path.splitext(src)[1]}")
+            try: os.link(src, dst)
+            except FileExistsError: return None  # this very segment is already in the ring
+            except OSError: shutil.copy2(src, dst)  # ring on another filesystem
+        except FileNotFoundError:
+            return None  # already rolled off before we saw it
+        return (start, start + dur, dst, st.st_size)
+
+    def _prune(self):
+        cutoff = time.time() - self.retention
+        n = bisect_left(self.starts, cutoff)
+        # keep the segment that overlaps the cutoff
+        n = max(0, n - 1)
+        if not n: return
+        with self.cond:
+            old = self.segments[:n]
+            del self.segments[:n]; del self.starts[:n]
+        for _, _, path, _ in old:
+            try: os.remove(path)
+            except OSError: pass
+
+    def window(self, t0: float, t1: float) -> List[Segment]:
+        """Segments overlapping [t0, t1], oldest first."""
+        with self.cond:
+            lo = max(0, bisect_right(self.starts, t0) - 1)
+            hi = bisect_left(self.starts, t1)
+            return [s for s in self.segments[lo:hi] if s[1] > t0]
+
+    def wait_until(self, t: float, timeout: float) -> bool:
+        """Block until a segment ending at or after `t` is indexed (post-roll has been recorded)."""
+        with self.cond:
+            return self.cond.wait_for(lambda: bool(self.segments) and self.segments[-1][1] >= t, timeout)
+
+    @property
+    def latest(self) -> Optional[float]:
+        return self.segments[-1][1] if self.segments else None
+
+class SegmentIndexer(threading.Thread):
+    """Keeps a SegmentIndex for every camera directory under hls_dir that has an index.m3u8."""
+    def __init__(self, hls_dir: str, poll: float = SEGMENT_POLL_SECONDS, retention: float = SEGMENT_RETENTION_SECONDS,
+                 ring_dir: Optional[str] = None, owns: Optional[Callable[[str], bool]] = None):
+        super().__init__(daemon=True, name="segment-index")
+        self.hls_dir = hls_dir
+        self.poll = poll
+        self.retention = retention
+        # not inside hls_dir (that is served publicly); a sibling is usually on the same filesystem for hard links
+        self.ring_dir = ring_dir or SEGMENT_RING_DIR or os.path.normpath(hls_dir) + "-ring"
+        self.indexes: Dict[str, SegmentIndex] = {}
+        self.owns = owns  # multi-worker: index (and cut clips for) only the cameras this worker owns
+        self.stopped = False
+
+    def get(self, camera_id: str) -> Optional[SegmentIndex]:
+        return self.indexes.get(camera_id)
+
+    def scan(self):
+        try: names = os.listdir(self.hls_dir)
+        except FileNotFoundError: return
+        for cam in names:
+            if cam.startswith(".") or cam in self.indexes: continue
+            if self.owns and not self.owns(cam): continue
+            pl = os.path.join(self.hls_dir, cam, "index.m3u8")
+            if os.path.exists(pl):
+                self.indexes[cam] = SegmentIndex(cam, pl, os.path.join(self.ring_dir, cam), self.retention)
+        for idx in list(self.indexes.values()):
+            try: idx.poll()
+            except Exception as e: print("segment index poll failed:", idx.camera_id, e)
+
+    def run(self):
+        while not self.stopped:
+            self.scan()
+            time.sleep(self.poll)
+
+    def stop(self):
+        self.stopped = True
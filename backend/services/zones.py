@@ -0,0 +1,202 @@
+import os, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+# Zone / rule engine evaluated on every ingested frame. Per camera it caches a compiled form of the zone
+# (a polygon, or a tripwire when the "polygon" has exactly two points) and of the ground-plane homography;
+# PUT /zones and PUT /calibration invalidate that cache. All geometry is vectorised over the frame's
+# people; per-track state (inside since, last side of the line, pairs too close) turns per-frame
+# conditions into edge-triggered alerts. Coordinates are normalised image coords like the ingest boxes
+# ([x1,y1,x2,y2,track_id]); a person's position is the bottom-centre of their box (feet).
+LOITER_SECONDS = float(os.getenv("LOITER_SECONDS", "30"))
+DISTANCE_METERS = float(os.getenv("DISTANCE_METERS", "1.5"))
+ZONE_TRACK_TTL = float(os.getenv("ZONE_TRACK_TTL", "10"))
+
+def homography_dlt(src, dst) -> np.ndarray:
+    """3x3 H with dst ~ H @ src from >= 4 point pairs (normalised DLT, least squares via SVD)."""
+    src = np.asarray(src, dtype=np.float64); dst = np.asarray(dst, dtype=np.float64)
+    if src.shape != dst.shape or src.ndim != 2 or src.shape[1] != 2 or len(src) < 4:
+        raise ValueError("homography needs >= 4 matching 2D points")
+    def norm(p):
+        c = p.mean(0); s = np.sqrt(2) / max(np.linalg.norm(p - c, axis=1).mean(), 1e-12)
+        return np.array([[s, 0, -s * c[0]], [0, s, -s * c[1]], [0, 0, 1]])
+    Ts, Td = norm(src), norm(dst)
+    s = np.c_[src, np.ones(len(src))] @ Ts.T
+    d = np.c_[dst, np.ones(len(dst))] @ Td.T
+    z = np.zeros((len(s), 3))
+    A = np.concatenate([np.c_[-s, z, d[:, :1] * s], np.c_[z, -s, d[:, 1:2] * s]])
+    H = np.linalg.svd(A)[2][-1].reshape(3, 3)
+    H = np.linalg.inv(Td) @ H @ Ts
+    return H / H[2, 2]
+
+def project(H: np.ndarray, pts: np.ndarray) -> np.ndarray:
+    p = pts @ H[:, :2].T + H[:, 2]
+    return p[:, :2] / p[:, 2:3]
+
+def points_in_polygon(pts: np.ndarray, poly: np.ndarray) -> np.ndarray:
+    """Even-odd rule for all points against all edges at once: (n,) bool."""
+    x, y = pts[:, :1], pts[:, 1:2]
+    x1, y1 = poly[:, 0], poly[:, 1]
+    x2, y2 = np.roll(x1, -1), np.roll(y1, -1)
+    straddle = (y1 > y) != (y2 > y)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xi = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+    return ((straddle & (x < xi)).sum(axis=1) % 2).astype(bool)
+
+def line_side(pts: np.ndarray, line: np.ndarray) -> np.ndarray:
+    (ax, ay), (bx, by) = line
+    return np.sign((bx - ax) * (pts[:, 1] - ay) - (by - ay) * (pts[:, 0] - ax))
+
+def segments_cross(p: np.ndarray, q: np.ndarray, line: np.ndarray) -> np.ndarray:
+    """Whether each movement p[i] -> q[i] crosses the tripwire segment (not just its infinite line)."""
+    s1, s2 = line_side(p, line), line_side(q, line)
+    a, b = line[0], line[1]
+    d = q - p
+    t1 = d[:, 0] * (a[1] - p[:, 1]) - d[:, 1] * (a[0] - p[:, 0])
+    t2 = d[:, 0] * (b[1] - p[:, 1]) - d[:, 1] * (b[0] - p[:, 0])
+    return (s1 * s2 < 0) & (np.sign(t1) * np.sign(t2) < 0)
+
+def close_pairs(pts: np.ndarray, radius: float) -> np.ndarray:
+    """(m, 2) index pairs i < j with distance < radius, using a uniform grid of `radius` cells so only
+    neighbouring cells are compared (O(n + pairs) instead of O(n^2))."""
+    n = len(pts)
+    if n < 2: return np.empty((0, 2), dtype=np.int64)
+    cell = np.floor(pts / radius).astype(np.int64)
+    cell -= cell.min(0)
+    width = int(cell[:, 1].max()) + 3
+    key = cell[:, 0] * width + cell[:, 1]
+    order = np.argsort(key, kind="stable"); sk = key[order]
+    out = []
+    # self cell plus 4 of the 8 neighbours: each unordered cell pair is visited once
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        target = key + dx * width + dy
+        lo = np.searchsorted(sk, target, "left"); hi = np.searchsorted(sk, target, "right")
+        cnt = hi - lo
+        if not cnt.any(): continue
+        i = np.repeat(np.arange(n), cnt)
+        j = order[np.repeat(lo - np.cumsum(cnt) + cnt, cnt) + np.arange(cnt.sum())]
+        if dx == 0 and dy == 0:
+            m = i < j; i, j = i[m], j[m]
+        d = pts[i] - pts[j]
+        m = (d * d).sum(1) < radius * radius
+        out.append(np.stack([np.minimum(i[m], j[m]), np.maximum(i[m], j[m])], 1))
+    return np.concatenate(out) if out else np.empty((0, 2), dtype=np.int64)
+
+class CameraRules:
+    """Compiled zone + homography for one camera, plus the per-track state the rules need."""
+    def __init__(self, polygon: Optional[List[List[float]]], homography: Optional[Dict[str, Any]]):
+        poly = np.asarray(polygon, dtype=np.float64) if polygon else None
+        self.line = poly if poly is not None and len(poly) == 2 else None
+        self.poly = poly if poly is not None and len(poly) >= 3 else None
+        self.H = None
+        if homography and homography.get("src") and homography.get("dst"):
+            self.H = homography_dlt(homography["src"], homography["dst"])
+        self.inside_since: Dict[int, float] = {}
+        self.loiter_sent: set = set()
+        self.last_pos: Dict[int, Tuple[float, float]] = {}
+        self.last_seen: Dict[int, float] = {}
+        self.close = np.empty(0, dtype=np.int64)   # track-id pairs currently too close
+        self.expired_at = 0.0
+
+    @property
+    def active(self) -> bool:
+        return self.poly is not None or self.line is not None or self.H is not None
+
+    def evaluate(self, camera_id: str, ts: float, persons) -> List[Dict[str, Any]]:
+        boxes = np.asarray(persons, dtype=np.float64).reshape(len(persons), -1) if len(persons) else np.empty((0, 5))
+        if boxes.shape[1] < 5 or not len(boxes):
+            return []  # rules need track ids
+        boxes = boxes[boxes[:, 4] >= 0]  # batch rows pad a missing id with -1
+        ids = boxes[:, 4].astype(np.int64); id_list = ids.tolist()
+        feet = np.stack([(boxes[:, 0] + boxes[:, 2]) / 2, boxes[:, 3]], 1)
+        alerts = []
+        def alert(typ, msg): alerts.append({"type": typ, "camera_id": camera_id, "confidence": 1.0, "message": msg, "ts": ts})
+
+        if self.poly is not None:
+            inside = points_in_polygon(feet, self.poly).tolist()
+            entered = [t for t, ins in zip(id_list, inside) if ins and t not in self.inside_since]
+            for t in entered: self.inside_since[t] = ts
+            for t in [t for t, ins in zip(id_list, inside) if not ins and t in self.inside_since]:
+                del self.inside_since[t]; self.loiter_sent.discard(t)
+            if entered: alert("zone_intrusion", f"{len(entered)} person(s) entered zone (track {', '.join(map(str, entered))})")
+            loiter = [t for t, t0 in self.inside_since.items() if ts - t0 >= LOITER_SECONDS and t not in self.loiter_sent]
+            if loiter:
+                self.loiter_sent.update(loiter)
+                alert("loitering", f"Track {', '.join(map(str, loiter))} in zone for over {int(LOITER_SECONDS)}s")
+
+        if self.line is not None:
+            known = np.array([t in self.last_pos for t in id_list], dtype=bool)
+            if known.any():
+                prev = np.array([self.last_pos[t] for t in ids[known].tolist()])
+                crossed = ids[known][segments_cross(prev, feet[known], self.line)]
+                if len(crossed): alert("line_cross", f"Track {', '.join(map(str, crossed.tolist()))} crossed the line")
+            self.last_pos.update(zip(id_list, feet.tolist()))
+
+        if self.H is not None:
+            pairs = close_pairs(project(self.H, feet), DISTANCE_METERS)
+            a, b = ids[pairs[:, 0]], ids[pairs[:, 1]]
+            now_close = np.unique(np.minimum(a, b) << 32 | np.maximum(a, b))  # pair of track ids as one int64
+            new = now_close[~np.isin(now_close, self.close, assume_unique=True)]
+            self.close = now_close
+            if len(new): alert("distance", f"{len(new)} pair(s) closer than {DISTANCE_METERS} m")
+
+        self.last_seen.update(dict.fromkeys(id_list, ts))
+        self._expire(ts)
+        return alerts
+
+    def _expire(self, ts: float):
+        if ts - self.expired_at < 1.0: return
+        self.expired_at = ts
+        gone = [t for t, seen in self.last_seen.items() if ts - seen > ZONE_TRACK_TTL]
+        for t in gone:
+            del self.last_seen[t]
+            self.inside_since.pop(t, None); self.loiter_sent.discard(t); self.last_pos.pop(t, None)
+
+class ZoneEngine:
+    """Camera id -> CameraRules, built lazily from the zone/homography stores and dropped on writes."""
+    def __init__(self, load_zone: Callable[[str], Optional[Dict[str, Any]]],
+                 load_homography: Callable[[str], Optional[Dict[str, Any]]]):
+        self.load_zone = load_zone
+        self.load_homography = load_homography
+        self.cameras: Dict[str, CameraRules] = {}
+
+    def invalidate(self, camera_id: str):
+        self.cameras.pop(camera_id, None)
+
+    def rules(self, camera_id: str) -> CameraRules:
+        r = self.cameras.get(camera_id)
+        if r is None:
+            z = self.load_zone(camera_id) or {}
+            try: r = CameraRules(z.get("polygon"), self.load_homography(camera_id))
+            except ValueError as e:
+                print("bad calibration for", camera_id, e); r = CameraRules(z.get("polygon"), None)
+            self.cameras[camera_id] = r  # cached even when empty: no store lookups on the hot path
+        return r
+
+    def evaluate(self, camera_id: str, ts: float, persons) -> List[Dict[str, Any]]:
+        r = self.rules(camera_id)
+        return r.evaluate(camera_id, ts, persons) if r.active else []
+
+def benchmark(people=(50, 200, 500), frames: int = 200, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    poly = [[0.1, 0.1], [0.6, 0.05], [0.9, 0.4], [0.8, 0.9], [0.3, 0.8], [0.05, 0.5]]
+    H = {"src": [[0, 0], [1, 0], [1, 1], [0, 1]], "dst": [[0, 0], [40, 0], [30, 25], [10, 25]]}
+    out = []
+    for n in people:
+        results = {}
+        for name, zone in (("polygon", poly), ("line", [[0.5, 0.0], [0.5, 1.0]])):
+            eng = ZoneEngine(lambda c: {"polygon": zone}, lambda c: H)
+            pos = rng.uniform(0, 1, (n, 2)); vel = rng.normal(0, 0.004, (n, 2))
+            ids = np.arange(n)
+            t0 = time.perf_counter(); n_alerts = 0
+            for f in range(frames):
+                pos = np.clip(pos + vel, 0, 1)
+                persons = np.c_[pos[:, 0] - 0.01, pos[:, 1] - 0.05, pos[:, 0] + 0.01, pos[:, 1], ids].tolist()
+                n_alerts += len(eng.evaluate("cam", f / 10, persons))
+            results[name] = round((time.perf_counter() - t0) / frames * 1000, 3)
+        out.append({"people": n, "ms_per_frame_polygon+distance": results["polygon"],
+                    "ms_per_frame_line+distance": results["line"]})
+    return out
+
+if __name__ == "__main__":
+    for r in benchmark(): print(r)
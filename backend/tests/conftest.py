@@ -0,0 +1,4 @@
+import os, sys
+
+# backend modules import `services.x` top-level, as they do when the API runs from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
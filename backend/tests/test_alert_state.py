@@ -0,0 +1,137 @@
+import asyncio, time
+
+import pytest
+
+from services import alert_state
+from services.alert_state import FakeRedis, MemoryAlertState, RedisAlertState, make_alert_state
+
+class Clock:
+    def __init__(self, t=1000.0): self.t = t
+    def __call__(self): return self.t
+
+class FlakyRedis(FakeRedis):
+    """FakeRedis that can be taken down: every command then fails like a refused connection."""
+    def __init__(self, clock):
+        super().__init__(clock); self.down = False
+    def __getattribute__(self, name):
+        if name in ("set", "get", "sadd", "pexpire", "sunion") and object.__getattribute__(self, "down"):
+            raise ConnectionError("Error 111 connecting to redis:6379. Connection refused.")
+        return object.__getattribute__(self, name)
+
+@pytest.fixture(params=["memory", "redis"])
+def state(request):
+    clock = Clock()
+    s = MemoryAlertState(clock) if request.param == "memory" else RedisAlertState(FakeRedis(clock), clock)
+    s.clock_ = clock
+    return s
+
+def test_claim_is_exclusive_until_expiry(state):
+    claim = lambda key: asyncio.run(state.claim(key, 60))
+    assert claim("dedupe:cam_1:gun")
+    assert not claim("dedupe:cam_1:gun")
+    assert claim("dedupe:cam_2:gun")
+    state.clock_.t += 61
+    assert claim("dedupe:cam_1:gun")
+
+def test_get_set_and_mapping(state):
+    async def main():
+        await state.set("thread:cam_1:gun", "123.45", 10)
+        assert await state.get("thread:cam_1:gun") == "123.45"
+        m = state.mapping("slack_ts:", 10)
+        await m.set("k", "9.0")
+        assert await m.get("k") == "9.0" and await m.get("other", "x") == "x"
+        state.clock_.t += 11
+        assert await state.get("thread:cam_1:gun") is None and await m.get("k") is None
+    asyncio.run(main())
+
+def test_correlation_window_slides(state):
+    corr = lambda typ, cam: asyncio.run(state.correlate(typ, cam, 60))
+    assert corr("gun", "cam_1") == {"cam_1"}
+    state.clock_.t += 30
+    assert corr("gun", "cam_2") == {"cam_1", "cam_2"}
+    assert corr("fire", "cam_3") == {"cam_3"}
+    state.clock_.t += 50  # cam_1 is 80 s old now, cam_2 only 50 s
+    assert corr("gun", "cam_4") == {"cam_2", "cam_4"}
+
+def test_replicas_sharing_redis_dedupe_once():
+    async def main():
+        r = FakeRedis(Clock())
+        a, b = RedisAlertState(r, r.m.clock), RedisAlertState(r, r.m.clock)
+        assert await a.claim("dedupe:cam_1:gun", 60) and not await b.claim("dedupe:cam_1:gun", 60)
+        await a.set("thread:cam_1:gun", "1.0", 60)
+        assert await b.get("thread:cam_1:gun") == "1.0"
+    asyncio.run(main())
+
+def test_redis_outage_falls_back_to_process_state(monkeypatch):
+    clock = Clock()
+    r = FlakyRedis(clock)
+    s = RedisAlertState(r, clock, retry_seconds=5)
+    run = asyncio.run
+    assert run(s.claim("dedupe:cam_1:gun", 60))
+    r.down = True
+    # no exception reaches the alert path: decisions are made in-process meanwhile
+    assert run(s.claim("dedupe:cam_2:gun", 60)) and not run(s.claim("dedupe:cam_2:gun", 60))
+    assert run(s.correlate("gun", "cam_2", 60)) == {"cam_2"}
+    run(s.set("thread:cam_2:gun", "2.0", 60))
+    assert run(s.get("thread:cam_2:gun")) == "2.0"
+    assert s.degraded and s.errors == 1  # one failed attempt, then Redis is left alone until the retry time
+    now = [0.0]
+    monkeypatch.setattr(alert_state.time, "monotonic", lambda: now[0])
+    s.down_until = 5.0
+    r.down = False
+    now[0] = 6.0
+    assert not run(s.claim("dedupe:cam_1:gun", 60))  # back on Redis, which still holds the earlier claim
+    assert not s.degraded
+
+async def _ticks_while(coro):
+    """Runs `coro` next to a task that ticks every millisecond: (its result, ticks seen meanwhile)."""
+    ticks = 0
+    async def tick():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.001); ticks += 1
+    t = asyncio.create_task(tick())
+    try: return await coro, ticks
+    finally: t.cancel()
+
+def test_slow_redis_does_not_block_the_event_loop():
+    from services.notifier import Notifier
+    from services.dispatch import Dispatcher
+    clock = Clock()
+    s = RedisAlertState(FakeRedis(clock, latency=0.05), clock, timeout=1.0)
+    n = Notifier(enabled=True, dispatcher=Dispatcher(), state=s)
+    alert = {"type": "gun", "camera_id": "cam_1", "confidence": 0.9, "message": "x", "ts": clock()}
+    (sent, _, _), ticks = asyncio.run(_ticks_while(n.maybe_send_with_blocks(alert)))
+    # correlate + claim are two round trips of 50 ms: the loop kept running the whole time
+    assert sent and ticks >= 20 and not s.degraded and s.errors == 0
+
+def test_redis_slower_than_the_timeout_counts_as_down():
+    clock = Clock()
+    r = FakeRedis(clock, latency=0.5)
+    s = RedisAlertState(r, clock, timeout=0.05, retry_seconds=60)
+    async def main():
+        t0 = time.monotonic()
+        first = await s.claim("dedupe:cam_1:gun", 60)
+        t1 = time.monotonic()
+        again = await s.claim("dedupe:cam_1:gun", 60)
+        return first, again, t1 - t0, time.monotonic() - t1
+    first, again, slow, fast = asyncio.run(main())
+    # one timeout, then the in-process state answers at once until the retry time
+    assert first and not again and s.degraded and s.errors == 1
+    assert slow < 0.3 and fast < 0.01
+
+def test_notifier_survives_redis_outage():
+    from services.notifier import Notifier
+    from services.dispatch import Dispatcher
+    clock = Clock()
+    r = FlakyRedis(clock); r.down = True
+    n = Notifier(enabled=True, dispatcher=Dispatcher(), state=RedisAlertState(r, clock))
+    alert = {"type": "gun", "camera_id": "cam_1", "confidence": 0.9, "message": "x", "ts": clock()}
+    sent, _, _ = asyncio.run(n.maybe_send_with_blocks(alert))
+    assert sent
+    assert not asyncio.run(n.maybe_send_with_blocks(alert))[0]
+
+def test_make_alert_state():
+    assert isinstance(make_alert_state(""), MemoryAlertState)
+    fake = make_alert_state("fake://")
+    assert isinstance(fake, RedisAlertState) and isinstance(fake.r, FakeRedis)
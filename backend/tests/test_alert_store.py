@@ -0,0 +1,91 @@
+import pytest
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, insert
+
+from services.alert_store import DbAlertStore, MemoryAlertStore
+
+# stand-in for the alerts table services.db.init_db() creates in a deployment
+alerts_table = Table("alerts", MetaData(), Column("id", Integer, primary_key=True, autoincrement=True),
+                     Column("type", String(64)), Column("camera_id", String(128)), Column("confidence", Float),
+                     Column("message", String(256)), Column("ts", Float, index=True))
+
+def _alert(i, ts, camera_id="cam_1", type="gun"):
+    return {"type": type, "camera_id": camera_id, "confidence": 0.9, "message": f"a{i}", "ts": ts}
+
+def _pages(store, limit, **filters):
+    out, cursor = [], None
+    while True:
+        page, cursor = store.query(limit=limit, cursor=cursor, **filters)
+        assert len(page) <= limit
+        out = page + out
+        if cursor is None: return out
+
+@pytest.fixture
+def db_store(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'alerts.db'}")
+    alerts_table.metadata.create_all(engine)
+    saved = []
+    store = DbAlertStore(saved.append, engine, lambda: alerts_table, lambda: True)
+    store.rows = lambda rows: _insert(engine, rows)
+    return store
+
+def _insert(engine, rows):
+    with engine.begin() as c: c.execute(insert(alerts_table), rows)
+
+# 30 alerts over 10 distinct timestamps (three share each ts), two cameras and two types
+ROWS = [_alert(i, 1000.0 + i // 3, camera_id=f"cam_{i % 2}", type="gun" if i % 3 else "fire") for i in range(30)]
+
+def test_memory_store_pages_through_equal_timestamps():
+    store = MemoryAlertStore(capacity=100)
+    for r in ROWS: store.add(r)
+    assert [a["message"] for a in _pages(store, 4)] == [r["message"] for r in ROWS]
+    got = _pages(store, 2, camera_id="cam_1", type="gun")
+    assert got == [r for r in ROWS if r["camera_id"] == "cam_1" and r["type"] == "gun"]
+
+def test_memory_store_zero_limit():
+    store = MemoryAlertStore(capacity=10)
+    for r in ROWS[:5]: store.add(r)
+    assert store.query(limit=0) == ([], None)
+
+def test_memory_store_window_and_eviction():
+    store = MemoryAlertStore(capacity=10)
+    for r in ROWS: store.add(r)
+    assert len(store) == 10
+    got, cursor = store.query(since=1006.0, until=1007.0)
+    assert got == ROWS[20:24] and cursor is None  # ROWS[18:20] (ts 1006) were evicted
+
+def test_db_store_filters_in_sql_and_pages_on_ts_id(db_store):
+    db_store.rows(ROWS)
+    assert [a["message"] for a in _pages(db_store, 4)] == [r["message"] for r in ROWS]
+    assert [a["message"] for a in _pages(db_store, 1, type="fire")] == [r["message"] for r in ROWS if r["type"] == "fire"]
+    got = _pages(db_store, 3, camera_id="cam_0", since=1002.0, until=1005.0)
+    assert got == [r for r in ROWS if r["camera_id"] == "cam_0" and 1002.0 <= r["ts"] <= 1005.0]
+
+def test_db_store_finds_old_matches_behind_many_newer_rows(db_store):
+    old = [_alert(i, 10.0 + i, camera_id="cam_rare") for i in range(3)]
+    db_store.rows(old + [_alert(i, 1e6 + i) for i in range(5000)])
+    page, cursor = db_store.query(camera_id="cam_rare", limit=2)
+    assert [a["ts"] for a in page] == [11.0, 12.0] and cursor
+    page, cursor = db_store.query(camera_id="cam_rare", limit=2, cursor=cursor)
+    assert [a["ts"] for a in page] == [10.0] and cursor is None
+
+def test_db_store_zero_limit_and_bad_cursor(db_store):
+    db_store.rows(ROWS)
+    assert db_store.query(limit=0) == ([], None)
+    with pytest.raises(ValueError):
+        db_store.query(cursor="nope")
+
+def test_db_store_falls_back_to_memory():
+    saved = []
+    store = DbAlertStore(saved.append, None, lambda: alerts_table, lambda: True)
+    for r in ROWS[:5]: store.add(r)
+    assert saved == ROWS[:5]
+    page, cursor = store.query(limit=3)
+    assert page == ROWS[2:5]
+    assert store.query(limit=3, cursor=cursor) == (ROWS[:2], None)
+
+def test_db_store_answers_from_memory_when_the_table_is_missing(tmp_path):
+    # database reachable but init_db has not created alerts yet: the query fails in SQL, not in the API
+    store = DbAlertStore(lambda a: None, create_engine(f"sqlite:///{tmp_path / 'empty.db'}"), lambda: alerts_table,
+                         lambda: True)
+    for r in ROWS[:5]: store.add(r)
+    assert store.query(limit=3) == (ROWS[2:5], store.memory.query(limit=3)[1])
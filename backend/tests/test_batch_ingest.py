@@ -0,0 +1,55 @@
+import os, struct, sys
+
+import numpy as np
+import pytest
+
+from services.batch_ingest import HEADER, MAGIC, decode_batch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "edge_agent"))
+from wire import encode_batch  # what agents actually send
+
+FRAMES = [("cam_1", 100.0, [[0.1, 0.2, 0.3, 0.4, 7], [0.5, 0.5, 0.6, 0.7, 8]]),
+          ("cam_2", 100.5, []),
+          ("cam_1", 99.0, [[0.0, 0.0, 0.1, 0.1, 7]]),
+          ("kamera-ü", 101.0, [[0.2, 0.2, 0.4, 0.4, 3]])]
+
+def test_round_trip_keeps_cameras_frames_and_boxes():
+    b = decode_batch(encode_batch(FRAMES))
+    assert b.cams == ["cam_1", "cam_2", "kamera-ü"] and b.n_frames == 4 and b.boxes.shape == (4, 5)
+    got = [(c, ts, boxes.tolist()) for c, ts, boxes in b.iter_frames()]
+    assert [(c, ts) for c, ts, _ in got] == [("cam_1", 99.0), ("cam_1", 100.0), ("cam_2", 100.5), ("kamera-ü", 101.0)]
+    assert np.allclose(got[1][2], FRAMES[0][2]) and got[2][2] == []
+
+def test_per_camera_reports_the_latest_frame():
+    per = decode_batch(encode_batch(FRAMES)).per_camera()
+    ts, count, boxes = per["cam_1"]
+    assert ts == 100.0 and count == 2 and boxes.shape == (3, 5)
+    assert per["cam_2"][:2] == (100.5, 0)
+
+def test_rows_without_an_id_are_padded():
+    b = decode_batch(encode_batch([("cam_1", 1.0, [[0.1, 0.1, 0.2, 0.2]])]))
+    assert b.boxes[0, 4] == -1.0
+    assert decode_batch(encode_batch([("cam_1", 1.0, [[0.1, 0.1, 0.2, 0.2]])], width=4)).boxes.shape == (1, 4)
+
+def test_empty_batch():
+    b = decode_batch(encode_batch([]))
+    assert b.n_frames == 0 and b.cams == [] and list(b.iter_frames()) == []
+
+@pytest.mark.parametrize("mangle", [
+    lambda body: body[:HEADER.size - 1],                                          # too short
+    lambda body: b"XXXX" + body[4:],                                              # bad magic
+    lambda body: HEADER.pack(MAGIC, 1, 3, 1, 1) + body[HEADER.size:],             # width < 4
+    lambda body: body[:-4],                                                       # boxes cut short
+    lambda body: body + b"\0" * 4,                                                # trailing garbage
+    lambda body: HEADER.pack(MAGIC, 1, 5, 1, 1) + struct.pack("<B", 5) + b"cam_1", # frame table missing
+])
+def test_malformed_bodies_are_rejected(mangle):
+    with pytest.raises(ValueError):
+        decode_batch(mangle(encode_batch(FRAMES[:1])))
+
+def test_camera_index_out_of_range_is_rejected():
+    body = bytearray(encode_batch(FRAMES[:1]))
+    off = HEADER.size + 1 + len("cam_1")
+    body[off:off + 2] = struct.pack("<H", 3)
+    with pytest.raises(ValueError):
+        decode_batch(bytes(body))
@@ -0,0 +1,82 @@
+import asyncio, json
+
+from services.broadcaster import Broadcaster
+
+class _Socket:
+    """Stands in for a WebSocket: sends wait on `gate` (a stuck client) or fail when `broken`."""
+    def __init__(self, stuck=False, broken=False):
+        self.gate = asyncio.Event()
+        if not stuck: self.gate.set()
+        self.broken = broken
+        self.sent = []; self.closed = False
+
+    async def accept(self): pass
+
+    async def send_text(self, text):
+        if self.broken: raise ConnectionError("gone")
+        await self.gate.wait()
+        self.sent.append(json.loads(text)["payload"]["seq"])
+
+    async def close(self): self.closed = True
+
+def _event(seq, camera_id="cam_1", type="gun"):
+    return {"event": "alert", "payload": {"camera_id": camera_id, "type": type, "seq": seq}}
+
+async def _settle():
+    for _ in range(20): await asyncio.sleep(0)
+
+def test_full_queue_drops_the_oldest_events_of_that_client_only():
+    async def main():
+        b = Broadcaster(queue_max=3, max_drops=100)
+        slow, fast = _Socket(stuck=True), _Socket()
+        await b.connect(slow); await b.connect(fast)
+        await _settle()
+        for k in range(6):
+            b.publish(_event(k)); await _settle()
+        slow.gate.set(); await _settle()
+        return b, slow, fast
+    b, slow, fast = asyncio.run(main())
+    assert fast.sent == [0, 1, 2, 3, 4, 5]
+    # the writer was already blocked sending 0; the queue kept the newest three
+    assert slow.sent == [0, 3, 4, 5] and b.clients[slow].dropped == 2 and b.counts["dropped"] == 2
+
+def test_client_full_for_max_drops_publishes_in_a_row_is_evicted():
+    async def main():
+        counts = []
+        b = Broadcaster(queue_max=2, max_drops=3, on_count=counts.append)
+        slow, fast = _Socket(stuck=True), _Socket()
+        await b.connect(slow); await b.connect(fast)
+        await _settle()
+        for k in range(8):
+            b.publish(_event(k)); await _settle()
+        return b, slow, fast, counts
+    b, slow, fast, counts = asyncio.run(main())
+    assert slow not in b.clients and fast in b.clients and slow.closed
+    assert b.counts["evicted"] == 1 and counts == [1, 2, 1] and len(fast.sent) == 8
+
+def test_send_timeout_and_send_errors_evict():
+    async def main():
+        b = Broadcaster(send_timeout=0.05)
+        stuck, broken, ok = _Socket(stuck=True), _Socket(broken=True), _Socket()
+        for s in (stuck, broken, ok): await b.connect(s)
+        b.publish(_event(0))
+        await asyncio.sleep(0.2)
+        return b, ok
+    b, ok = asyncio.run(main())
+    assert list(b.clients) == [ok] and b.counts["evicted"] == 2 and ok.sent == [0]
+
+def test_subscriptions_filter_by_camera_and_type():
+    async def main():
+        b = Broadcaster()
+        lobby, guns, both = _Socket(), _Socket(), _Socket()
+        await b.connect(lobby, cameras="cam_lobby")
+        await b.connect(guns, types="gun,knife")
+        c = await b.connect(both)
+        c.subscribe(cameras=["cam_lobby"], types="fire")
+        n = [b.publish(_event(0, "cam_lobby", "gun")), b.publish(_event(1, "cam_2", "knife")),
+             b.publish(_event(2, "cam_lobby", "fire"))]
+        await _settle()
+        return n, lobby, guns, both
+    n, lobby, guns, both = asyncio.run(main())
+    assert n == [2, 1, 2]
+    assert lobby.sent == [0, 2] and guns.sent == [0, 1] and both.sent == [2]
@@ -0,0 +1,105 @@
+import threading
+
+import pytest
+
+from services.clip_jobs import ClipJobs
+
+class MinioStub:
+    """Stands in for the MinIO upload: keeps the objects in memory and hands back their URLs."""
+    def __init__(self, fail=False):
+        self.objects = {}
+        self.fail = fail
+
+    def upload(self, camera_id, mp4, seconds, gif):
+        if self.fail: raise ConnectionError("minio unreachable")
+        urls = {}
+        for kind, path in (("mp4", mp4), ("gif", gif)):
+            if path:
+                key = f"{camera_id}/{len(self.objects)}.{kind}"
+                self.objects[key] = path; urls[kind] = f"http://minio:9000/clips/{key}"
+        return urls
+
+def _jobs(encode, store=None, expect=1, **kw):
+    finished, done = [], threading.Event()
+    def on_finish(job):
+        finished.append(job)
+        if len(finished) >= expect: done.set()
+    jobs = ClipJobs(encode, (store or MinioStub()).upload, on_finish=on_finish, **kw)
+    return jobs, finished, done
+
+def _wait(done):
+    assert done.wait(5)
+
+def test_clip_is_cut_and_uploaded_once_per_window():
+    store, gate = MinioStub(), threading.Event()
+    def encode(camera_id, seconds, ts=None):
+        gate.wait(5); return f"/tmp/{camera_id}.mp4", f"/tmp/{camera_id}.gif"
+    jobs, finished, done = _jobs(encode, store, dedupe_seconds=10)
+    got = []
+    a = jobs.submit("cam_1", 100.0, callback=got.append)
+    b = jobs.submit("cam_1", 104.0, callback=got.append)  # same window: joins the running job
+    assert a is b
+    gate.set(); _wait(done)
+    assert finished[0]["status"] == "done" and sorted(store.objects) == ["cam_1/0.mp4", "cam_1/1.gif"]
+    assert got == [finished[0]["urls"]] * 2
+    late = []
+    jobs.submit("cam_1", 105.0, callback=late.append)  # already uploaded: called right away
+    assert late == [finished[0]["urls"]]
+    assert jobs.stats() == dict(jobs.counts, pending=0) and jobs.counts["deduped"] == 2
+    jobs.close()
+
+def test_no_segments_is_skipped_not_failed():
+    jobs, finished, done = _jobs(lambda camera_id, seconds, ts=None: (None, None))
+    got = []
+    jobs.submit("cam_1", 100.0, callback=got.append); _wait(done)
+    job = finished[0]
+    assert job["status"] == "skipped" and job["urls"] is None and got == []
+    assert jobs.counts["skipped"] == 1 and jobs.counts["failed"] == 0
+    # a later alert in the same window tries again (the recording may have started since)
+    again = jobs.submit("cam_1", 101.0)
+    assert again["id"] != job["id"]
+    jobs.close()
+
+def test_upload_error_fails_the_job():
+    jobs, finished, done = _jobs(lambda camera_id, seconds, ts=None: ("/tmp/x.mp4", None), MinioStub(fail=True))
+    jobs.submit("cam_1", 100.0); _wait(done)
+    assert finished[0]["status"] == "failed" and "minio unreachable" in finished[0]["error"]
+    assert jobs.counts["failed"] == 1
+    jobs.close()
+
+def test_full_queue_rejects_new_cameras():
+    gate = threading.Event()
+    def encode(camera_id, seconds, ts=None):
+        gate.wait(5); return None, None
+    jobs, _, done = _jobs(encode, workers=1, queue_max=2, expect=2)
+    assert [jobs.submit(f"cam_{i}", 100.0)["status"] for i in range(3)][2] == "rejected"
+    assert jobs.counts["rejected"] == 1
+    gate.set(); _wait(done)
+    jobs.close()
+
+def test_pending_is_safe_while_jobs_are_submitted():
+    # on_finish (the gauge update) runs on the worker threads while submit() keeps adding jobs
+    seen, errors = [], []
+    def on_finish(job):
+        try: seen.append(jobs.pending())
+        except Exception as e: errors.append(e)
+    jobs = ClipJobs(lambda camera_id, seconds, ts=None: (None, None), MinioStub().upload, workers=4,
+                    queue_max=10000, keep=50, on_finish=on_finish)
+    for i in range(2000): jobs.submit(f"cam_{i}", 100.0)
+    jobs.pool.shutdown(wait=True)
+    assert errors == [] and len(seen) == 2000 and jobs.pending() == 0
+    assert jobs.counts["submitted"] == jobs.counts["skipped"] == 2000
+
+def test_upload_clip_and_gif_against_stub(tmp_path, monkeypatch):
+    pytest.importorskip("boto3")
+    from services import clipper
+    store = {}
+    def upload_file(path, key, content_type=None):
+        store[key] = (open(path, "rb").read(), content_type); return f"http://minio:9000/clips/{key}"
+    monkeypatch.setattr(clipper, "upload_file", upload_file)
+    mp4, gif = tmp_path / "c.mp4", tmp_path / "c.gif"
+    mp4.write_bytes(b"mp4"); gif.write_bytes(b"gif")
+    urls = clipper.upload_clip_and_gif("cam_1", str(mp4), gif_path=str(gif))
+    assert urls["mp4"].endswith(".mp4") and urls["gif"].endswith(".gif")
+    assert sorted(v for v in store.values()) == [(b"gif", "image/gif"), (b"mp4", "video/mp4")]
+    assert not mp4.exists() and not gif.exists()  # temp outputs are removed after upload
@@ -0,0 +1,61 @@
+import asyncio, os, sys
+from collections import Counter
+
+import httpx
+import numpy as np
+
+from services.batch_ingest import decode_batch
+from services.cluster import FORWARDED_HEADER, Cluster, HashRing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "edge_agent"))
+from wire import encode_batch  # what agents actually send
+
+CAMS = [f"cam_{i}" for i in range(400)]
+
+def test_ring_spreads_cameras_and_moves_few_when_a_worker_is_added():
+    four, five = Cluster(4, 0), Cluster(5, 0)
+    load = Counter(four.owner(c) for c in CAMS)
+    assert set(load) == {0, 1, 2, 3} and min(load.values()) > 50
+    moved = sum(four.owner(c) != five.owner(c) for c in CAMS)
+    assert moved < len(CAMS) * 0.35  # ~1/5 expected; a modulo hash would move ~4/5
+    assert HashRing(["a", "b"]).node("cam_7") == HashRing(["a", "b"]).node("cam_7")
+
+def test_group_and_owns():
+    c = Cluster(3, 1)
+    groups = c.group(CAMS[:30])
+    assert sorted(x for cams in groups.values() for x in cams) == sorted(CAMS[:30])
+    assert all(c.owns(x) == (i == 1) for i, cams in groups.items() for x in cams)
+    single = Cluster(1, 0)
+    assert not single.enabled and single.owns("anything") and single.owner("anything") == 0
+
+def test_only_the_private_port_is_private():
+    c = Cluster(4, 2, base_port=8100)
+    assert c.private(("127.0.0.1", 8102))
+    assert not c.private(("0.0.0.0", 8000)) and not c.private(("127.0.0.1", 8101)) and not c.private(None)
+
+def test_forward_marks_the_request_and_counts_failures():
+    seen = []
+    def handler(request):
+        seen.append((request.url.port, request.headers.get(FORWARDED_HEADER), request.headers.get("x-api-key"),
+                     request.headers.get("cookie")))
+        return httpx.Response(200 if request.url.port == 8101 else 503)
+    async def main():
+        c = Cluster(3, 0, base_port=8100)
+        c.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        headers = {"X-API-Key": "k", "Cookie": "session=1"}
+        ok = [await c.forward(1, "/ingest/batch", b"x", headers, 5), await c.forward(2, "/ingest/batch", b"x", headers, 3)]
+        await c.close()
+        return ok, c.describe()
+    ok, info = asyncio.run(main())
+    assert ok == [True, False]
+    assert seen == [(8101, "1", "k", None), (8102, "1", "k", None)]
+    assert info["forwarded"] == 2 and info["forward_frames"] == 8 and info["forward_errors"] == 1
+
+def test_batch_subset_round_trips():
+    frames = [(f"cam_{i % 3}", 100.0 + i, [[0.1, 0.1, 0.2, 0.2, i]] * (i % 2 + 1)) for i in range(9)]
+    batch = decode_batch(encode_batch(frames))
+    part = decode_batch(batch.subset(["cam_2", "cam_0"]).encode())
+    want = [f for f in frames if f[0] in ("cam_0", "cam_2")]
+    got = [(c, ts, b.tolist()) for c, ts, b in part.iter_frames()]
+    assert [(c, ts) for c, ts, _ in got] == [(c, ts) for c, ts, _ in want]
+    assert all(np.allclose(b, p) for (_, _, b), (_, _, p) in zip(got, want))
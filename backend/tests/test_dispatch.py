@@ -0,0 +1,117 @@
+import asyncio, json, time
+
+import httpx
+
+from services.alert_state import FakeRedis, RedisAlertState
+from services.dispatch import SLACK_API_BASE, TWILIO_API_BASE, Dispatcher, Message, TokenBucket
+
+class StandIn:
+    """Slack / Twilio stand-in: scripted responses per path, records every request."""
+    def __init__(self, script=None):
+        self.script = script or {}   # path -> list of (status, body, headers), last one repeats
+        self.requests = []
+        self.calls = {}
+        self.n = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        path = request.url.path
+        k = self.calls[path] = self.calls.get(path, 0) + 1
+        steps = self.script.get(path, [(200, {"ok": True}, {})])
+        status, body, headers = steps[min(k, len(steps)) - 1]
+        if body == "ts":
+            self.n += 1; body = {"ok": True, "ts": f"{self.n}.0"}
+        return httpx.Response(status, json=body, headers=headers)
+
+    def bodies(self, path):
+        return [json.loads(r.content) for r in self.requests if r.url.path == path]
+
+POST = httpx.URL(SLACK_API_BASE + "/chat.postMessage").path
+
+def _run(stand_in, body, **kw):
+    async def main():
+        d = Dispatcher(rate=1000, burst=1000, transport=httpx.MockTransport(stand_in), **kw)
+        await d.start()
+        try: await body(d)
+        finally: await d.close()
+        return d
+    return asyncio.run(main())
+
+def _slack(text, **kw):
+    return Message("slack:C1", f"{SLACK_API_BASE}/chat.postMessage", json={"channel": "C1", "text": text}, **kw)
+
+def test_replies_resolve_thread_ts_of_their_root():
+    srv = StandIn({POST: [(200, "ts", {})]})
+    async def body(d):
+        d.enqueue(_slack("root", root_key="k"))
+        d.enqueue(_slack("reply", thread_key="k"))
+        d.enqueue(_slack("other", thread_key="unknown"))
+    d = _run(srv, body)
+    root, reply, other = srv.bodies(POST)
+    assert "thread_ts" not in root and reply["thread_ts"] == "1.0" and "thread_ts" not in other
+    assert asyncio.run(d.threads.get("k")) == "1.0" and d.counts["sent"] == 3
+
+def test_thread_ts_on_a_slow_redis_is_awaited_not_blocked_on():
+    srv = StandIn({POST: [(200, "ts", {})]})
+    r = FakeRedis(latency=0.05)
+    async def body(d):
+        d.enqueue(_slack("root", root_key="k")); d.enqueue(_slack("reply", thread_key="k"))
+        t0 = time.monotonic(); ticks = 0
+        while d.counts["sent"] < 2 and time.monotonic() - t0 < 2:
+            await asyncio.sleep(0.005); ticks += 1
+        assert ticks >= 10  # the set and get of the ts took 100 ms, the loop kept ticking meanwhile
+    d = _run(srv, body, threads=RedisAlertState(r).mapping("slack_ts:", 60))
+    assert srv.bodies(POST)[1]["thread_ts"] == "1.0" and r.m._get("sva:slack_ts:k") == "1.0"
+
+def test_retry_after_and_server_errors_are_retried(tmp_path):
+    srv = StandIn({POST: [(429, {}, {"Retry-After": "0.01"}), (503, {}, {}), (200, {"ok": True}, {})]})
+    async def body(d): d.enqueue(_slack("x"))
+    d = _run(srv, body, dead_letter=str(tmp_path / "dead.jsonl"))
+    assert d.counts["retried"] == 2 and d.counts["sent"] == 1 and d.counts["dead"] == 0
+    assert len(srv.requests) == 3
+
+def test_permanent_failures_go_to_the_dead_letter_log(tmp_path):
+    dead = tmp_path / "dead.jsonl"
+    twilio = f"{TWILIO_API_BASE}/2010-04-01/Accounts/AC1/Messages.json"
+    srv = StandIn({POST: [(200, {"ok": False, "error": "channel_not_found"}, {})],
+                   httpx.URL(twilio).path: [(400, {"message": "bad number"}, {})]})
+    async def body(d):
+        d.enqueue(_slack("x"))
+        d.enqueue(Message("twilio", twilio, data={"To": "+1", "Body": "x"}, auth=("AC1", "tok")))
+    d = _run(srv, body, dead_letter=str(dead))
+    recs = [json.loads(l) for l in dead.read_text().splitlines()]
+    assert d.counts["dead"] == 2 and d.counts["retried"] == 0
+    assert sorted(r["dest"] for r in recs) == ["slack:C1", "twilio"]
+    assert any(r["error"] == "slack: channel_not_found" for r in recs)
+
+def test_repeats_are_coalesced_into_one_message():
+    srv = StandIn()
+    def render(msg): msg.json = {"text": f"{msg.count} more"}
+    async def body(d):
+        for _ in range(4): d.enqueue_coalesced("k", Message("slack:C1", f"{SLACK_API_BASE}/chat.postMessage", render=render))
+        await asyncio.sleep(0.1)
+    d = _run(srv, body, coalesce_seconds=0.02)
+    assert srv.bodies(POST) == [{"text": "4 more"}]
+    assert d.counts["coalesced"] == 3
+
+def test_full_queue_sheds_oldest():
+    srv = StandIn()
+    async def body(d):
+        for i in range(5): d.enqueue(_slack(str(i)))
+    d = _run(srv, body, queue_max=2)
+    assert [b["text"] for b in srv.bodies(POST)] == ["3", "4"]
+    assert d.counts["dropped"] == 3
+
+def test_enqueue_from_another_thread():
+    srv = StandIn()
+    async def body(d):
+        await asyncio.to_thread(d.enqueue, _slack("from a thread"))
+    _run(srv, body)
+    assert [b["text"] for b in srv.bodies(POST)] == ["from a thread"]
+
+def test_token_bucket_paces_after_burst():
+    b = TokenBucket(rate=10, burst=2)
+    assert b.delay() == 0.0 and b.delay() == 0.0
+    assert 0.09 < b.delay() <= 0.1
+    b.penalize(1.0)
+    assert b.delay() > 1.0
@@ -0,0 +1,78 @@
+import os, time
+
+import numpy as np
+import pytest
+
+from services import heatmap
+from services.heatmap import GRID_H, GRID_W, HeatmapAggregator
+
+PEOPLE = [[0.1, 0.1, 0.2, 0.5, 1], [0.6, 0.2, 0.7, 0.9, 2]]
+
+def test_windows_count_feet_and_expire():
+    h = HeatmapAggregator(snapshot_dir=None)
+    t = time.time()
+    h.add("cam_1", PEOPLE, now=t)
+    cam = h.cams["cam_1"]
+    g = cam.grid("5m", t)
+    assert g.sum() == 2 and g[int(0.5 * GRID_H), int(0.15 * GRID_W)] == 1
+    assert cam.grid("1h", t + 400).sum() == 2
+    assert cam.grid("5m", t + 400).sum() == 0
+    before = float(cam.grid("live", t + 400).sum())
+    assert cam.grid("live", t + 400 + heatmap.HEATMAP_HALF_LIFE).sum() == pytest.approx(before / 2, rel=1e-3)
+
+def test_render_reuses_png_until_grid_moves():
+    h = HeatmapAggregator(snapshot_dir=None, threshold=0.5)
+    h.add("cam_1", PEOPLE, now=1000.0)
+    png, etag = h.render("cam_1", "1h", now=1000.0)
+    assert png[:4] == b"\x89PNG"
+    assert h.render("cam_1", "1h", now=1001.0) == (png, etag)
+    h.add("cam_1", PEOPLE[:1], now=1001.0)  # +50 %: within the threshold, cached image is still close enough
+    assert h.render("cam_1", "1h", now=1001.0)[1] == etag
+    for _ in range(5): h.add("cam_1", [[0.4, 0.4, 0.5, 0.6, 3]], now=1002.0)
+    assert h.render("cam_1", "1h", now=1002.0)[1] != etag
+    with pytest.raises(ValueError):
+        h.render("cam_1", "2h")
+
+def test_unknown_cameras_share_one_blank_image():
+    h = HeatmapAggregator(snapshot_dir=None)
+    first = h.render("nobody")
+    for i in range(100): assert h.render(f"probe-{i}", "live") == first
+    assert h.png == {} and h.cams == {}
+
+def test_snapshot_round_trip_with_unsafe_ids(tmp_path):
+    d = tmp_path / "snap"
+    h = HeatmapAggregator(snapshot_dir=str(d))
+    ids = ["cam_1", "../escape", "a/b", "..", ".hidden"]
+    for cid in ids: h.add(cid, PEOPLE, now=1000.0)
+    h.snapshot()
+    assert sorted(os.listdir(tmp_path)) == ["snap"]  # nothing written outside the snapshot dir
+    assert all(not f.startswith(".") and "/" not in f for f in os.listdir(d))
+    restored = HeatmapAggregator(snapshot_dir=str(d))
+    assert sorted(restored.cams) == sorted(ids)
+    for cid in ids:
+        assert np.array_equal(restored.cams[cid].grid("24h", 1000.0), h.cams[cid].grid("24h", 1000.0))
+    only = HeatmapAggregator(snapshot_dir=str(d), owns=lambda cid: cid == "a/b")
+    assert list(only.cams) == ["a/b"]
+
+def test_one_failing_camera_does_not_stop_the_snapshot(tmp_path, monkeypatch):
+    h = HeatmapAggregator(snapshot_dir=str(tmp_path))
+    for cid in ("cam_1", "cam_2", "cam_3"): h.add(cid, PEOPLE, now=1000.0)
+    savez = np.savez_compressed
+    def flaky(path, **arrays):
+        if "cam_2" in path: raise OSError("disk full")
+        savez(path, **arrays)
+    monkeypatch.setattr(heatmap.np, "savez_compressed", flaky)
+    assert h.snapshot() == 2
+    assert sorted(os.listdir(tmp_path)) == ["cam_1.npz", "cam_3.npz"]
+    monkeypatch.setattr(heatmap.np, "savez_compressed", savez)
+    assert h.snapshot() == 1  # only the one that failed is retried
+
+def test_snapshot_rewrites_only_changed_cameras(tmp_path):
+    h = HeatmapAggregator(snapshot_dir=str(tmp_path))
+    for i in range(20): h.add(f"cam_{i}", PEOPLE, now=1000.0)
+    assert h.snapshot() == 20 and h.snapshot() == 0
+    h.add("cam_3", PEOPLE, now=1001.0)
+    assert h.snapshot() == 1
+    # compressed: a camera with a few people is a few KB, not the ~0.5 MB of its float32 grids
+    assert os.path.getsize(tmp_path / "cam_3.npz") < 20000
+    assert HeatmapAggregator(snapshot_dir=str(tmp_path)).snapshot() == 0  # restored cameras are not rewritten
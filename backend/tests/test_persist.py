@@ -0,0 +1,147 @@
+import os, time
+
+from sqlalchemy import Column, Float, Integer, MetaData, String, Table, create_engine, func, select
+
+from services.persist import WriteBehind, detection_history
+
+def _alerts(engine, message=True):
+    """What services.db.init_db() would create; message=False is an older schema without the column."""
+    cols = [Column("id", Integer, primary_key=True, autoincrement=True), Column("type", String(64)),
+            Column("camera_id", String(128)), Column("confidence", Float), Column("ts", Float)]
+    if message: cols.append(Column("message", String(256)))
+    t = Table("alerts", MetaData(), *cols)
+    t.metadata.create_all(engine)
+    return t
+
+def _alert(i):
+    return {"type": "gun", "camera_id": "cam_1", "confidence": 0.9, "message": f"a{i}", "ts": 1000.0 + i}
+
+def _count(engine, name):
+    with engine.connect() as c: return c.execute(select(func.count()).select_from(Table(name, MetaData(), autoload_with=engine))).scalar()
+
+def _writer(tmp_path, engine, **kw):
+    kw.setdefault("history_seconds", 0)
+    return WriteBehind(engine, journal_dir=str(tmp_path / "journal"), retry_seconds=0, **kw)
+
+def test_writes_into_the_reflected_alerts_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    _alerts(engine)
+    wb = _writer(tmp_path, engine)
+    for i in range(5): wb.add_alert(_alert(i))
+    wb.flush()
+    assert _count(engine, "alerts") == 5 and wb.table("alerts").c.keys() == [c.name for c in _alerts(engine).c]
+    assert wb.stats()["written"] == 5
+
+def test_older_alerts_schema_drops_unknown_columns(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    _alerts(engine, message=False)
+    wb = _writer(tmp_path, engine)
+    wb.add_alert(_alert(0)); wb.flush()
+    assert _count(engine, "alerts") == 1 and wb.stats()["spilled"] == 0
+
+def test_spills_until_init_db_creates_the_table_then_replays(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    wb = _writer(tmp_path, engine)
+    for i in range(3): wb.add_alert(_alert(i))
+    wb.flush()
+    assert wb.stats()["spilled"] == 3 and not wb.db_up
+    _alerts(engine)
+    wb.flush()
+    assert _count(engine, "alerts") == 3 and wb.stats()["replayed"] == 3
+    assert not os.listdir(tmp_path / "journal")
+
+def test_unwritable_journal_drops_the_batch(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    (tmp_path / "journal").write_text("not a directory")
+    wb = _writer(tmp_path, engine)
+    wb.add_alert(_alert(0)); wb.flush()
+    assert wb.stats()["dropped"] == 1 and wb.stats()["pending"] == 0
+
+def test_flush_errors_do_not_end_the_writer_thread(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    _alerts(engine)
+    wb = _writer(tmp_path, engine, flush_seconds=0.01)
+    calls = []
+    real = wb.flush
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1: raise RuntimeError("boom")
+        real()
+    wb.flush = flaky
+    wb.start()
+    wb.add_alert(_alert(0))
+    wb.stop()
+    assert wb.stats()["errors"] == 1 and _count(engine, "alerts") == 1
+
+def test_detection_history_buckets(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    _alerts(engine)
+    wb = _writer(tmp_path, engine, history_seconds=10)
+    for ts, n in ((1000.0, 2), (1005.0, 4), (1012.0, 1)): wb.add_detections("cam_1", ts, n)
+    wb.stop(flush=True)
+    with engine.connect() as c:
+        t = wb.table("detection_history")
+        rows = [tuple(r) for r in c.execute(select(t.c.ts, t.c.frames, t.c.avg_count, t.c.max_count).order_by(t.c.ts))]
+    assert rows == [(1000.0, 2, 3.0, 4), (1010.0, 1, 1.0, 1)]
+
+def _history(engine):
+    t = detection_history
+    t.create(engine, checkfirst=True)
+    with engine.connect() as c:
+        return [tuple(r) for r in c.execute(select(t.c.camera_id, t.c.ts, t.c.frames).order_by(t.c.ts))]
+
+def test_closed_buckets_are_written_without_waiting_for_the_next_frame(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    _alerts(engine)
+    wb = _writer(tmp_path, engine, history_seconds=10, flush_seconds=0)
+    wb.add_detections("cam_quiet", 1000.0, 2)
+    wb.add_detections("cam_live", 1095.0, 1)
+    assert wb.close_buckets(now=1100.0) == 1
+    wb.flush()
+    assert _history(engine) == [("cam_quiet", 1000.0, 1)] and list(wb.buckets) == [("cam_live", False)]
+
+def test_backfill_bucket_stays_open_while_frames_keep_arriving(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    _alerts(engine)
+    wb = _writer(tmp_path, engine, history_seconds=10, flush_seconds=60)
+    wb.add_detections("cam_1", 1000.0, 2, backfill=True)
+    assert wb.close_buckets() == 0  # the window is long over, but the replay is still adding to it
+    wb.buckets[("cam_1", True)][4] -= 60
+    assert wb.close_buckets() == 1
+
+def test_writer_thread_closes_buckets_on_its_timed_wakeup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    _alerts(engine)
+    wb = _writer(tmp_path, engine, history_seconds=10, flush_seconds=0.01)
+    wb.start()
+    try:
+        wb.add_detections("cam_1", 1000.0, 3, backfill=True)
+        end = time.monotonic() + 5
+        while not _history(engine) and time.monotonic() < end: time.sleep(0.01)
+        assert _history(engine) == [("cam_1", 1000.0, 1)] and not wb.buckets
+    finally:
+        wb.stop()
+
+def test_journal_is_only_replayed_while_it_has_segments(tmp_path, monkeypatch):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    wb = _writer(tmp_path, engine)
+    wb.add_alert(_alert(0)); wb.flush()  # no alerts table yet: spilled
+    assert wb.journaled
+    replays = []
+    real = wb._replay
+    monkeypatch.setattr(wb, "_replay", lambda: (replays.append(1), real()))
+    _alerts(engine)
+    for _ in range(3): wb.flush()
+    assert len(replays) == 1 and _count(engine, "alerts") == 1 and not wb.journaled
+    wb.add_alert(_alert(1)); wb.flush()
+    assert len(replays) == 1 and _count(engine, "alerts") == 2
+
+def test_segments_left_from_a_previous_run_are_replayed(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'db.sqlite'}")
+    first = _writer(tmp_path, engine)
+    first.add_alert(_alert(0)); first.flush()  # spilled: the table does not exist yet
+    _alerts(engine)
+    second = _writer(tmp_path, engine)
+    assert second.journaled
+    second.flush()
+    assert _count(engine, "alerts") == 1 and not second.journaled
@@ -0,0 +1,32 @@
+import os, sys, threading, time
+
+import pytest
+
+from services import profiler
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "edge_agent"))
+
+def test_edge_agent_runs_this_sampler():
+    import profiling
+    assert os.path.samefile(profiling.sample.__code__.co_filename, profiler.__file__)
+
+def _spin(stop):
+    while not stop.is_set(): sum(range(1000))
+
+def test_sample_finds_the_busy_thread_and_clamps(monkeypatch):
+    monkeypatch.setattr(profiler, "PROFILE_MAX_SECONDS", 0.2)
+    stop = threading.Event()
+    t = threading.Thread(target=_spin, args=(stop,), name="busy-worker", daemon=True); t.start()
+    try:
+        t0 = time.perf_counter()
+        prof = profiler.sample(30, interval=0.002, thread="busy")
+        assert time.perf_counter() - t0 < 5 and prof["seconds"] == 0.2
+    finally:
+        stop.set(); t.join()
+    assert prof["samples"] > 0 and set(prof["threads"]) == {"busy-worker"}
+    assert any(e["where"].startswith("test_profiler.py:_spin") for e in prof["total"])
+
+def test_one_profile_at_a_time():
+    with profiler._running:
+        with pytest.raises(RuntimeError):
+            profiler.sample(0.01)
@@ -0,0 +1,79 @@
+import asyncio, os
+
+from services.pubsub import LocalPubSub, SocketPubSub, make_pubsub, serve_broker
+
+def _collect(bus, channel):
+    got = []
+    bus.subscribe(channel, got.append)
+    return got
+
+async def _until(cond, timeout=5.0):
+    end = asyncio.get_running_loop().time() + timeout
+    while not cond():
+        assert asyncio.get_running_loop().time() < end, "timed out"
+        await asyncio.sleep(0.01)
+
+def test_local_delivers_on_a_later_iteration_to_every_subscriber():
+    async def main():
+        bus = LocalPubSub()
+        a, b, other = _collect(bus, "alert"), _collect(bus, "alert"), _collect(bus, "zone")
+        await bus.start()
+        bus.publish("alert", {"w": 0, "n": 1})
+        assert a == []  # not synchronously
+        await asyncio.sleep(0)
+        return a, b, other, bus.stats()
+    a, b, other, stats = asyncio.run(main())
+    assert a == b == [{"w": 0, "n": 1}] and other == []
+    assert stats["published"] == stats["received"] == 1 and stats["backend"] == "LocalPubSub"
+
+def test_local_handler_errors_are_counted_not_raised():
+    async def main():
+        bus = LocalPubSub()
+        bus.subscribe("alert", lambda msg: 1 / 0)
+        got = _collect(bus, "alert")
+        await bus.start()
+        bus.publish("alert", {"n": 1}); await asyncio.sleep(0)
+        return got, bus.stats()
+    got, stats = asyncio.run(main())
+    assert got == [{"n": 1}] and stats["handler_errors"] == 1
+
+def test_socket_pubsub_relays_between_workers_through_the_broker(tmp_path):
+    path = str(tmp_path / "pubsub.sock")
+    async def main():
+        broker = asyncio.create_task(serve_broker(path))
+        await _until(lambda: os.path.exists(path))
+        buses = [make_pubsub("unix://" + path) for _ in range(2)]
+        assert all(isinstance(b, SocketPubSub) for b in buses)
+        got = [_collect(b, "camera") for b in buses]
+        zones = _collect(buses[1], "zone")
+        for b in buses: await b.start()
+        await _until(lambda: all(b.writer is not None for b in buses))
+        buses[0].publish("camera", {"w": 0, "id": "cam_1", "camera": {"name": "Lobby"}})
+        buses[0].publish("unsubscribed", {"w": 0})
+        await _until(lambda: all(got))
+        for b in buses: await b.close()
+        broker.cancel()
+        return got, zones
+    got, zones = asyncio.run(main())
+    # the sender gets its own message too: handlers filter on "w"
+    assert got[0] == got[1] == [{"w": 0, "id": "cam_1", "camera": {"name": "Lobby"}}] and zones == []
+
+def test_socket_publish_without_a_broker_drops_instead_of_blocking(tmp_path):
+    async def main():
+        bus = SocketPubSub("unix://" + str(tmp_path / "missing.sock"))
+        await bus.start()
+        bus.publish("alert", {"n": 1})
+        await _until(lambda: bus.counts["dropped"] == 1)
+        await bus.close()
+        return bus.stats()
+    stats = asyncio.run(main())
+    assert stats["published"] == 1 and stats["received"] == 0
+
+def test_socket_queue_full_drops():
+    async def main():
+        bus = SocketPubSub("unix:///nonexistent.sock", queue_max=2)
+        bus.queue = asyncio.Queue(2)  # no writer task draining it
+        for i in range(5): bus.publish("alert", {"n": i})
+        return bus.counts
+    counts = asyncio.run(main())
+    assert counts["published"] == 2 and counts["dropped"] == 3
@@ -0,0 +1,88 @@
+import os, time
+from datetime import datetime, timezone
+
+import pytest
+
+from services.segment_index import SegmentIndex, SegmentIndexer
+
+T0 = time.time() - 20  # recent enough that nothing is pruned
+
+def _pdt(t):
+    return datetime.fromtimestamp(t, timezone.utc).isoformat().replace("+00:00", "Z")
+
+def _write(cam_dir, first_seq, segs):
+    """segs: [(name, start_ts, payload)], 2 s each, written like ffmpeg's hls muxer does."""
+    os.makedirs(cam_dir, exist_ok=True)
+    lines = ["#EXTM3U", "#EXT-X-TARGETDURATION:2", f"#EXT-X-MEDIA-SEQUENCE:{first_seq}"]
+    for name, start, payload in segs:
+        path = os.path.join(cam_dir, name)
+        if not os.path.exists(path):  # segments already listed are never rewritten
+            with open(path, "wb") as f: f.write(payload)
+        lines += [f"#EXT-X-PROGRAM-DATE-TIME:{_pdt(start)}", "#EXTINF:2.000000,", name]
+    pl = os.path.join(cam_dir, "index.m3u8")
+    with open(pl + ".tmp", "w") as f: f.write("\n".join(lines) + "\n")
+    os.replace(pl + ".tmp", pl)
+    st = os.stat(pl); os.utime(pl, ns=(st.st_atime_ns, st.st_mtime_ns + 1))  # mtime moves even within a tick
+    return pl
+
+def _read(seg):
+    with open(seg[2], "rb") as f: return f.read()
+
+def test_poll_indexes_only_new_segments(tmp_path):
+    cam = tmp_path / "hls" / "cam_1"
+    pl = _write(cam, 0, [("index0.ts", T0, b"a"), ("index1.ts", T0 + 2, b"b")])
+    idx = SegmentIndex("cam_1", pl, str(tmp_path / "ring" / "cam_1"))
+    assert idx.poll() == 2 and idx.poll() == 0
+    _write(cam, 1, [("index1.ts", T0 + 2, b"b"), ("index2.ts", T0 + 4, b"c")])
+    os.remove(cam / "index0.ts")  # rolled off the live playlist, still in the ring
+    assert idx.poll() == 1
+    assert [_read(s) for s in idx.window(T0, T0 + 6)] == [b"a", b"b", b"c"]
+    assert [_read(s) for s in idx.window(T0 + 2.5, T0 + 3)] == [b"b"]
+    assert idx.latest == pytest.approx(T0 + 6) and idx.restarts == 0
+
+def test_ffmpeg_restart_resets_the_sequence(tmp_path):
+    cam = tmp_path / "hls" / "cam_1"
+    pl = _write(cam, 5, [("index5.ts", T0, b"old5"), ("index6.ts", T0 + 2, b"old6")])
+    idx = SegmentIndex("cam_1", pl, str(tmp_path / "ring" / "cam_1"))
+    assert idx.poll() == 2
+    # restarted stream: numbering starts over and reuses the old file names
+    os.remove(cam / "index5.ts"); os.remove(cam / "index6.ts")
+    _write(cam, 0, [("index0.ts", T0 + 10, b"new0")])
+    assert idx.poll() == 1 and idx.restarts == 1
+    _write(cam, 0, [("index0.ts", T0 + 10, b"new0"), ("index1.ts", T0 + 12, b"new1")])
+    assert idx.poll() == 1
+    assert [_read(s) for s in idx.window(T0, T0 + 14)] == [b"old5", b"old6", b"new0", b"new1"]
+
+def test_recreated_playlist_starts_over(tmp_path):
+    cam = tmp_path / "hls" / "cam_1"
+    pl = _write(cam, 0, [("index0.ts", T0, b"a"), ("index1.ts", T0 + 2, b"b"), ("index2.ts", T0 + 4, b"c")])
+    idx = SegmentIndex("cam_1", pl, str(tmp_path / "ring" / "cam_1"))
+    assert idx.poll() == 3
+    os.remove(pl)
+    assert idx.poll() == 0
+    # new stream already past the old sequence number by the time it is seen
+    _write(cam, 3, [("index3.ts", T0 + 10, b"x")])
+    assert idx.poll() == 1
+
+def test_ring_entries_never_alias_reused_names(tmp_path):
+    cam = tmp_path / "hls" / "cam_1"
+    pl = _write(cam, 0, [("index0.ts", T0, b"first")])
+    idx = SegmentIndex("cam_1", pl, str(tmp_path / "ring" / "cam_1"))
+    idx.poll()
+    os.remove(cam / "index0.ts")
+    _write(cam, 0, [("index0.ts", T0 + 10, b"second")])
+    idx.poll()
+    assert [_read(s) for s in idx.segments] == [b"first", b"second"]
+    assert len(set(s[2] for s in idx.segments)) == 2
+
+def test_indexer_keeps_the_ring_out_of_the_served_tree(tmp_path):
+    hls = tmp_path / "hls"
+    _write(hls / "cam_1", 0, [("index0.ts", T0, b"a")])
+    _write(hls / "cam_2", 0, [("index0.ts", T0, b"b")])
+    ix = SegmentIndexer(str(hls), owns=lambda cam: cam == "cam_1")
+    ix.scan()
+    assert list(ix.indexes) == ["cam_1"]
+    ring = os.path.abspath(ix.ring_dir)
+    assert not ring.startswith(os.path.abspath(hls) + os.sep)
+    assert sorted(os.listdir(hls)) == ["cam_1", "cam_2"]
+    assert ix.get("cam_1").segments[0][2].startswith(ring)
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from services import zones
+from services.zones import (CameraRules, ZoneEngine, close_pairs, homography_dlt, points_in_polygon, project,
+                            segments_cross)
+
+SQUARE = [[0.2, 0.2], [0.8, 0.2], [0.8, 0.8], [0.2, 0.8]]
+METRES = {"src": [[0, 0], [1, 0], [1, 1], [0, 1]], "dst": [[0, 0], [10, 0], [10, 10], [0, 10]]}
+
+def _person(x, y, tid):
+    """Box whose feet (bottom centre) are at (x, y)."""
+    return [x - 0.02, y - 0.1, x + 0.02, y, tid]
+
+def test_points_in_polygon_matches_a_concave_shape():
+    l_shape = np.array([[0, 0], [2, 0], [2, 1], [1, 1], [1, 2], [0, 2]], dtype=float)
+    pts = np.array([[0.5, 0.5], [1.5, 0.5], [0.5, 1.5], [1.5, 1.5], [3, 3]])
+    assert points_in_polygon(pts, l_shape).tolist() == [True, True, True, False, False]
+
+def test_segments_cross_only_within_the_tripwire():
+    line = np.array([[0.5, 0.2], [0.5, 0.8]])
+    p = np.array([[0.4, 0.5], [0.4, 0.9], [0.4, 0.5]])
+    q = np.array([[0.6, 0.5], [0.6, 0.9], [0.45, 0.5]])
+    assert segments_cross(p, q, line).tolist() == [True, False, False]
+
+def test_close_pairs_matches_brute_force():
+    pts = np.random.default_rng(0).uniform(0, 20, (300, 2))
+    got = {tuple(p) for p in close_pairs(pts, 1.5).tolist()}
+    d = np.hypot(*(pts[:, None] - pts[None]).transpose(2, 0, 1))
+    assert got == {(i, j) for i, j in zip(*np.nonzero(d < 1.5)) if i < j}
+
+def test_homography_maps_the_calibration_points():
+    H = homography_dlt(METRES["src"], METRES["dst"])
+    assert np.allclose(project(H, np.array([[0.5, 0.5], [1.0, 1.0]])), [[5, 5], [10, 10]])
+    with pytest.raises(ValueError):
+        homography_dlt([[0, 0], [1, 0], [1, 1]], [[0, 0], [1, 0], [1, 1]])
+
+def test_intrusion_fires_on_entry_and_loitering_once(monkeypatch):
+    monkeypatch.setattr(zones, "LOITER_SECONDS", 5.0)
+    r = CameraRules(SQUARE, None)
+    assert r.evaluate("cam_1", 0.0, [_person(0.1, 0.5, 1)]) == []
+    got = r.evaluate("cam_1", 1.0, [_person(0.5, 0.5, 1), _person(0.1, 0.1, 2)])
+    assert [(a["type"], a["message"]) for a in got] == [("zone_intrusion", "1 person(s) entered zone (track 1)")]
+    assert r.evaluate("cam_1", 3.0, [_person(0.5, 0.5, 1)]) == []
+    assert [a["type"] for a in r.evaluate("cam_1", 6.5, [_person(0.5, 0.5, 1)])] == ["loitering"]
+    assert r.evaluate("cam_1", 9.0, [_person(0.5, 0.5, 1)]) == []
+    # leaving and coming back is a new entry
+    r.evaluate("cam_1", 10.0, [_person(0.9, 0.5, 1)])
+    assert [a["type"] for a in r.evaluate("cam_1", 11.0, [_person(0.5, 0.5, 1)])] == ["zone_intrusion"]
+
+def test_tripwire_needs_a_previous_position():
+    r = CameraRules([[0.5, 0.0], [0.5, 1.0]], None)
+    assert r.evaluate("cam_1", 0.0, [_person(0.4, 0.5, 1)]) == []
+    assert r.evaluate("cam_1", 0.1, [_person(0.6, 0.5, 2)]) == []  # first sighting of track 2
+    got = r.evaluate("cam_1", 0.2, [_person(0.6, 0.5, 1), _person(0.4, 0.5, 2)])
+    assert [a["message"] for a in got] == ["Track 1, 2 crossed the line"]
+
+def test_distance_alerts_on_new_close_pairs_only():
+    r = CameraRules(None, METRES)  # 0.1 normalised = 1 m
+    assert r.evaluate("cam_1", 0.0, [_person(0.1, 0.5, 1), _person(0.5, 0.5, 2)]) == []
+    assert len(r.evaluate("cam_1", 0.1, [_person(0.1, 0.5, 1), _person(0.2, 0.5, 2)])) == 1
+    assert r.evaluate("cam_1", 0.2, [_person(0.1, 0.5, 1), _person(0.2, 0.5, 2)]) == []
+
+def test_rows_without_ids_are_ignored():
+    r = CameraRules(SQUARE, None)
+    assert r.evaluate("cam_1", 0.0, [[0.4, 0.4, 0.6, 0.6]]) == []
+    assert r.evaluate("cam_1", 0.0, [[0.4, 0.4, 0.6, 0.6, -1]]) == []
+
+def test_engine_caches_rules_until_invalidated():
+    loads = []
+    def zone(cam):
+        loads.append(cam); return {"polygon": SQUARE}
+    eng = ZoneEngine(zone, lambda cam: {"src": [[0, 0]], "dst": [[0, 0]]})  # bad calibration: ignored
+    eng.evaluate("cam_1", 0.0, [_person(0.5, 0.5, 1)]); eng.evaluate("cam_1", 1.0, [])
+    assert loads == ["cam_1"] and eng.rules("cam_1").H is None
+    eng.invalidate("cam_1"); eng.evaluate("cam_1", 2.0, [])
+    assert loads == ["cam_1", "cam_1"]
+    assert ZoneEngine(lambda c: None, lambda c: None).evaluate("cam_2", 0.0, [_person(0.5, 0.5, 1)]) == []
@@ -0,0 +1,19 @@
+"""Synthetic load and benchmarks for the whole pipeline.
+
+    python -m benchmarks micro [--people 50]                     tracker, heatmap, notifier dedupe, zones, wire
+    python -m benchmarks load  [--cameras 16 --people 20 ...]    drive the FastAPI app in-process (or --url)
+    python -m benchmarks fanout [--clients 5000]                 WebSocket fan-out with slow clients, in-process
+    python -m benchmarks scale [--workers 1,2,4 --clients 8]     ingest throughput of backend/serve.py per worker count
+    python -m benchmarks compare OLD.json NEW.json               flag regressions between two runs
+
+Every run writes a JSON result (benchmarks/results/<kind>-<time>.json by default) with the parameters,
+host and git revision, so numbers from before and after an upgrade can be compared directly.
+"""
+import os, sys
+
+# backend (api, services) and edge_agent (tracker_plugins, wire, ...) are both run from their own
+# directory with top-level imports; make them importable from here the same way
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _d in ("backend", "edge_agent"):
+    _p = os.path.join(ROOT, _d)
+    if _p not in sys.path: sys.path.insert(0, _p)
@@ -0,0 +1,59 @@
+import argparse, asyncio, json, sys
+
+from benchmarks import fanout, load, micro, results, scale
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    m = sub.add_parser("micro", help="tracker / heatmap / notifier dedupe / zones / wire microbenchmarks")
+    m.add_argument("--people", type=int, default=20)
+    m.add_argument("--fps", type=float, default=10.0)
+    l = sub.add_parser("load", help="synthetic cameras through the ingest API")
+    l.add_argument("--cameras", type=int, default=8)
+    l.add_argument("--people", type=int, default=20)
+    l.add_argument("--fps", type=float, default=10.0)
+    l.add_argument("--alert-rate", type=float, default=0.1, help="tripwire crossings per camera per second")
+    l.add_argument("--seconds", type=float, default=10.0, help="scene time to send")
+    l.add_argument("--mode", choices=("batch", "json"), default="batch")
+    l.add_argument("--batch-frames", type=int, default=50)
+    l.add_argument("--concurrency", type=int, default=8)
+    l.add_argument("--realtime", action="store_true", help="pace to the cameras' frame rate instead of flat out")
+    l.add_argument("--url", default=None, help="running server (e.g. http://127.0.0.1:8000); default: app in-process")
+    l.add_argument("--seed", type=int, default=0)
+    s = sub.add_parser("scale", help="ingest throughput of serve.py at several worker counts")
+    s.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    s.add_argument("--cameras", type=int, default=64)
+    s.add_argument("--people", type=int, default=20)
+    s.add_argument("--batch-frames", type=int, default=50)
+    s.add_argument("--clients", type=int, default=8, help="load generator processes")
+    s.add_argument("--seconds", type=float, default=10.0, help="wall time per worker count")
+    s.add_argument("--via-port", action="store_true", help="post to the shared port (workers forward) instead of the owners")
+    f = sub.add_parser("fanout", help="WebSocket broadcaster with thousands of simulated clients, a few slow")
+    f.add_argument("--clients", type=int, default=2000)
+    f.add_argument("--slow-fraction", type=float, default=0.02)
+    f.add_argument("--events", type=int, default=200)
+    f.add_argument("--rate", type=float, default=50.0, help="events per second")
+    for p in (m, l, s, f): p.add_argument("--out", default="", help="result file (default benchmarks/results/<kind>-<time>.json)")
+    c = sub.add_parser("compare", help="compare two result files")
+    c.add_argument("old"); c.add_argument("new")
+    c.add_argument("--threshold", type=float, default=0.10, help="relative change counted as a regression")
+    a = ap.parse_args(argv)
+
+    if a.cmd == "compare":
+        rows = results.compare(a.old, a.new, a.threshold)
+        results.print_table(rows)
+        return 1 if any(r["regression"] for r in rows) else 0
+    params = {k: v for k, v in vars(a).items() if k not in ("cmd", "out")}
+    if a.cmd == "micro": metrics = micro.run(a.people, a.fps)
+    elif a.cmd == "fanout":
+        metrics = asyncio.run(fanout.run(a.clients, a.slow_fraction, events=a.events, rate=a.rate))
+    elif a.cmd == "scale":
+        metrics = scale.run(tuple(int(n) for n in a.workers.split(",")), a.cameras, a.people, batch_frames=a.batch_frames,
+                            clients=a.clients, seconds=a.seconds, direct=not a.via_port)
+    else: metrics = asyncio.run(load.run(**{k.replace("-", "_"): v for k, v in params.items()}))
+    print(json.dumps(metrics, indent=2))
+    print("saved", results.save(a.cmd, params, metrics, a.out))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+import asyncio, json, random, time
+from typing import Any, Dict
+
+import benchmarks  # noqa: F401  (sys.path for backend / edge_agent)
+
+class _SimSocket:
+    """Stand-in WebSocket with a fixed per-send delay."""
+    def __init__(self, delay: float): self.delay = delay; self.arrivals = []
+    async def send_text(self, text: str):
+        if self.delay: await asyncio.sleep(self.delay)
+        self.arrivals.append((time.perf_counter(), text))
+    async def close(self): pass
+
+async def run(clients: int = 2000, slow_fraction: float = 0.02, slow_delay: float = 0.5, events: int = 200,
+              rate: float = 50.0, cameras: int = 8, filtered_fraction: float = 0.5, seed: int = 0) -> Dict[str, Any]:
+    """Thousands of simulated WebSocket clients in-process (services/broadcaster.py): a few slow, half
+    subscribed to a single camera. Reports delivery latency for the clients that keep up and how the
+    slow ones were handled."""
+    from services.broadcaster import Broadcaster
+    rng = random.Random(seed)
+    b = Broadcaster()
+    socks = []
+    for i in range(clients):
+        s = _SimSocket(slow_delay if rng.random() < slow_fraction else 0.0)
+        cam = f"cam_{rng.randrange(cameras)}" if rng.random() < filtered_fraction else None
+        await b.connect(s, cameras=cam, accept=False); socks.append(s)
+    t0 = time.perf_counter(); fanout = 0; sent_at = {}; pub_ms = []
+    for k in range(events):
+        ev = {"event": "alert", "payload": {"camera_id": f"cam_{k % cameras}", "type": "gun", "seq": k}}
+        t = time.perf_counter(); fanout += b.publish(ev); pub_ms.append((time.perf_counter() - t) * 1000)
+        sent_at[json.dumps(ev)] = t
+        await asyncio.sleep(1.0 / rate)
+    await asyncio.sleep(0.5)
+    fast = [s for s in socks if not s.delay]
+    lat = sorted(at - sent_at[text] for s in fast for at, text in s.arrivals)
+    pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 3) if lat else None
+    out = dict(b.stats(), events=events, fanout=fanout, publish_s=round(time.perf_counter() - t0, 2),
+               publish_ms_max=round(max(pub_ms), 3), slow_clients=len(socks) - len(fast),
+               fast_delivered=len(lat), fast_p50_ms=pct(0.5), fast_p99_ms=pct(0.99))
+    for ws in list(b.clients): b.disconnect(ws)
+    return out
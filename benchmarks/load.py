@@ -0,0 +1,91 @@
+import asyncio, contextlib, os, re, time
+from typing import Any, Dict, Optional
+
+import benchmarks  # noqa: F401  (sys.path for backend / edge_agent)
+from benchmarks.scene import Scene
+
+API_KEY = os.getenv("API_KEY", "changeme")
+
+@contextlib.asynccontextmanager
+async def _client(url: Optional[str]):
+    """(httpx client, in_process): against a running server at `url`, or against the real FastAPI app in
+    this process through ASGITransport, inside the app's lifespan (startup/shutdown handlers)."""
+    import httpx
+    headers = {"X-API-Key": API_KEY}
+    if url:
+        async with httpx.AsyncClient(base_url=url, headers=headers, timeout=30) as c: yield c, False
+        return
+    # the app reads its config at import time: no mock alert loop; Slack/SMS only if configured in env
+    os.environ.setdefault("MODE", "bench")
+    from api.main import app
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     headers=headers, timeout=30) as c:
+            yield c, True
+
+def _bodies(scene: Scene, ticks: int, mode: str, batch_frames: int, t0: float):
+    if mode == "json":
+        for cam, ts, persons in scene.frames(ticks, t0):
+            yield 1, ts, {"json": {"camera_id": cam, "ts": ts, "persons": persons}}
+        return
+    from wire import encode_batch, CONTENT_TYPE
+    buf = []
+    for frame in scene.frames(ticks, t0):
+        buf.append(frame)
+        if len(buf) >= batch_frames:
+            yield len(buf), buf[-1][1], {"content": encode_batch(buf), "headers": {"Content-Type": CONTENT_TYPE}}; buf = []
+    if buf: yield len(buf), buf[-1][1], {"content": encode_batch(buf), "headers": {"Content-Type": CONTENT_TYPE}}
+
+def _stage_means(text: str) -> Dict[str, float]:
+    """Mean ms per pipeline stage from the /metrics exposition (sum / count of the histogram)."""
+    vals = {}
+    for kind, stage, v in re.findall(r'pipeline_stage_seconds_(sum|count)\{stage="([^"]+)"\} ([0-9.e+-]+)', text):
+        vals.setdefault(stage, {})[kind] = float(v)
+    return {f"stage_{s}_ms": round(v["sum"] / v["count"] * 1000, 3) for s, v in vals.items() if v.get("count")}
+
+async def run(cameras: int = 8, people: int = 20, fps: float = 10.0, alert_rate: float = 0.1, seconds: float = 10.0,
+              mode: str = "batch", batch_frames: int = 50, concurrency: int = 8, realtime: bool = False,
+              url: Optional[str] = None, seed: int = 0) -> Dict[str, Any]:
+    """Drive `seconds` of scene time through POST /ingest/*. realtime paces requests to the scene clock
+    (a fixed camera count at its real frame rate); otherwise frames go in as fast as the app takes them,
+    which measures ingests per second."""
+    scene = Scene(cameras, people, fps, alert_rate, seed)
+    path = "/ingest/detections" if mode == "json" else "/ingest/batch"
+    async with _client(url) as (client, in_process):
+        for cam, poly in scene.zones():
+            r = await client.put(f"/zones/{cam}", json={"camera_id": cam, "polygon": poly}); r.raise_for_status()
+        t0 = time.time(); start = time.perf_counter(); cpu0 = time.process_time()
+        bodies = _bodies(scene, int(seconds * fps), mode, batch_frames, t0)
+        lat, counts = [], {"requests": 0, "frames": 0, "errors": 0}
+
+        async def worker():
+            for n, ts, kw in bodies:  # one shared generator: workers take the next request in scene order
+                if realtime:
+                    delay = (ts - t0) - (time.perf_counter() - start)
+                    if delay > 0: await asyncio.sleep(delay)
+                t = time.perf_counter()
+                try:
+                    r = await client.post(path, **kw)
+                    ok = r.status_code < 400
+                except Exception:
+                    ok = False
+                lat.append(time.perf_counter() - t)
+                counts["requests"] += 1; counts["frames"] += n; counts["errors"] += not ok
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start; cpu = time.process_time() - cpu0
+        metrics = (await client.get("/metrics")).text
+    lat.sort()
+    pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 3) if lat else None
+    out = {"frames_per_s": round(counts["frames"] / wall, 1), "requests_per_s": round(counts["requests"] / wall, 1),
+           "request_p50_ms": pct(0.5), "request_p99_ms": pct(0.99), "errors": counts["errors"],
+           "frames": counts["frames"], "wall_s": round(wall, 2), "scene_crossings": scene.crossings}
+    alerts = re.findall(r'^alerts_total\{type="line_cross"\} ([0-9.e+]+)', metrics, re.M)
+    if alerts: out["alerts"] = float(alerts[0])
+    if in_process:
+        # client and app share this process, so CPU time covers both: a conservative per-core figure
+        out["cpu_s"] = round(cpu, 2)
+        out["frames_per_cpu_s"] = round(counts["frames"] / max(cpu, 1e-6), 1)
+        out["cameras_per_core"] = round(counts["frames"] / max(cpu, 1e-6) / fps, 1)
+    out.update(_stage_means(metrics))
+    return out
@@ -0,0 +1,82 @@
+import asyncio, time
+from typing import Dict
+
+import benchmarks  # noqa: F401  (sys.path for backend / edge_agent)
+from benchmarks.scene import Scene
+
+def _timeit(fn, n: int) -> float:
+    """Seconds per call, best of 3 rounds of n calls."""
+    best = float("inf")
+    for _ in range(3):
+        t0 = time.perf_counter()
+        for _ in range(n): fn()
+        best = min(best, (time.perf_counter() - t0) / n)
+    return best
+
+def tracker(people: int, fps: float, plugins=("centroid", "bytetrack"), frames: int = 300) -> Dict[str, float]:
+    """Tracker.update on the synthetic trajectories of tracker_plugins/synthetic.py (1080p, noisy, misses)."""
+    from tracker_plugins.synthetic import evaluate
+    out = {}
+    for name in plugins:
+        mod = __import__(f"tracker_plugins.{name}", fromlist=["Tracker"])
+        r = evaluate(mod.Tracker(), n=people, frames=frames)
+        out[f"tracker_{name}_update_ms"] = r["ms_per_frame"]
+        out[f"tracker_{name}_id_switches"] = r["id_switches"]
+        # tracker alone, one core: how many cameras at `fps` before it saturates
+        out[f"tracker_{name}_cameras_per_core"] = round(1000 / (r["ms_per_frame"] * fps), 1)
+    return out
+
+def heatmap(people: int, frames: int = 2000) -> Dict[str, float]:
+    from services.heatmap import HeatmapAggregator
+    agg = HeatmapAggregator(snapshot_dir=None)
+    scene = Scene(cameras=1, people=people)
+    rows = [p for _, _, p in scene.frames(frames)]
+    it = iter(range(10 ** 9)); now = time.time()
+    add = lambda: agg.add("bench", rows[next(it) % frames], now=now)
+    out = {"heatmap_add_us": round(_timeit(add, frames) * 1e6, 2)}
+    out["heatmap_render_cold_ms"] = round(_timeit(lambda: (agg.png.clear(), agg.render("bench", "1h")), 20) * 1000, 3)
+    agg.render("bench", "1h")
+    out["heatmap_render_cached_us"] = round(_timeit(lambda: agg.render("bench", "1h"), 2000) * 1e6, 2)
+    return out
+
+def notifier_dedupe(alerts: int = 20000, cameras: int = 50) -> Dict[str, float]:
+    """maybe_send_with_blocks with no Slack/Twilio configured: dedupe claim + correlation only, against
+    the in-process state and against the Redis code path (FakeRedis)."""
+    from services.notifier import Notifier
+    from services.alert_state import MemoryAlertState, RedisAlertState, FakeRedis
+    types = ["gun", "knife", "intruder", "loitering", "line_cross"]
+    batch = [{"type": types[i % len(types)], "camera_id": f"cam_{i % cameras}", "confidence": 0.9,
+              "message": "bench", "ts": 1e9 + i} for i in range(alerts)]
+    async def per_alert(n: Notifier) -> float:
+        best = float("inf")
+        for _ in range(3):
+            t0 = time.perf_counter()
+            for a in batch: await n.maybe_send_with_blocks(a)
+            best = min(best, (time.perf_counter() - t0) / alerts)
+        return best
+    out = {}
+    for name, state in (("memory", MemoryAlertState()), ("redis_fake", RedisAlertState(FakeRedis()))):
+        per = asyncio.run(per_alert(Notifier(enabled=True, state=state)))
+        out[f"notifier_dedupe_{name}_us"] = round(per * 1e6, 2)
+    return out
+
+def zones(people: int) -> Dict[str, float]:
+    from services import zones as z
+    r = z.benchmark(people=(people,), frames=200)[0]
+    return {"zones_polygon_ms": r["ms_per_frame_polygon+distance"], "zones_line_ms": r["ms_per_frame_line+distance"]}
+
+def wire(people: int, frames: int = 50) -> Dict[str, float]:
+    from wire import encode_batch
+    from services.batch_ingest import decode_batch
+    batch = list(Scene(cameras=frames, people=people).frames(1))
+    body = encode_batch(batch)
+    return {"wire_encode_50_frames_us": round(_timeit(lambda: encode_batch(batch), 200) * 1e6, 1),
+            "wire_decode_50_frames_us": round(_timeit(lambda: list(decode_batch(body).iter_frames()), 200) * 1e6, 1),
+            "wire_bytes_per_frame": round(len(body) / frames, 1)}
+
+def run(people: int = 20, fps: float = 10.0) -> Dict[str, float]:
+    out = {}
+    for part in (lambda: tracker(people, fps), lambda: heatmap(people), notifier_dedupe, lambda: zones(people),
+                 lambda: wire(people)):
+        out.update(part())
+    return out
@@ -0,0 +1,46 @@
+import json, os, platform, subprocess, time
+from typing import Any, Dict, List
+
+from benchmarks import ROOT
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+# metric name suffix -> which way is better; anything else is informational and never flagged
+HIGHER = ("_per_s", "_per_cpu_s", "_fps", "_per_core", "_speedup")
+LOWER = ("_ms", "_us")
+
+def _git() -> str:
+    try: return subprocess.run(["git", "-C", ROOT, "rev-parse", "--short", "HEAD"], capture_output=True,
+                               text=True, timeout=5).stdout.strip()
+    except Exception: return ""
+
+def save(kind: str, params: Dict[str, Any], metrics: Dict[str, float], path: str = "") -> str:
+    doc = {"kind": kind, "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "git": _git(),
+           "host": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+           "params": params, "metrics": metrics}
+    if not path:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f: json.dump(doc, f, indent=2)
+    return path
+
+def compare(old_path: str, new_path: str, threshold: float = 0.10) -> List[Dict[str, Any]]:
+    """One row per metric present in both runs; `regression` when it moved the wrong way by more than
+    `threshold` (relative)."""
+    with open(old_path) as f: old = json.load(f)
+    with open(new_path) as f: new = json.load(f)
+    if old.get("params") != new.get("params"): print("warning: runs used different parameters")
+    rows = []
+    for name in sorted(set(old["metrics"]) & set(new["metrics"])):
+        a, b = old["metrics"][name], new["metrics"][name]
+        if not isinstance(a, (int, float)) or not isinstance(b, (int, float)): continue
+        change = (b - a) / abs(a) if a else 0.0
+        worse = -change if name.endswith(HIGHER) else change if name.endswith(LOWER) else 0.0
+        rows.append({"metric": name, "old": a, "new": b, "change_pct": round(change * 100, 1),
+                     "regression": worse > threshold})
+    return rows
+
+def print_table(rows: List[Dict[str, Any]]):
+    w = max([len(r["metric"]) for r in rows] + [6])
+    for r in rows:
+        flag = "  REGRESSION" if r["regression"] else ""
+        print(f"{r['metric']:<{w}}  {r['old']:>12g}  {r['new']:>12g}  {r['change_pct']:>+7.1f}%{flag}")
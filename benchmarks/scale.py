@@ -0,0 +1,101 @@
+import multiprocessing as mp
+import os, socket, subprocess, sys, tempfile, time
+from typing import Any, Dict, List, Tuple
+
+import benchmarks  # noqa: F401  (sys.path for backend / edge_agent)
+from benchmarks import ROOT
+from benchmarks.scene import Scene
+
+API_KEY = os.getenv("API_KEY", "changeme")
+
+def _free_port(n: int = 1) -> int:
+    """First of n consecutive free ports (best effort)."""
+    while True:
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0)); base = s.getsockname()[1]
+        if base + n >= 65535: continue
+        try:
+            for p in range(base, base + n):
+                with socket.socket() as t: t.bind(("127.0.0.1", p))
+            return base
+        except OSError:
+            continue
+
+def _start(workers: int, port: int, base_port: int, env_extra: Dict[str, str]) -> subprocess.Popen:
+    tmp = tempfile.mkdtemp(prefix="sva-scale-")
+    env = dict(os.environ, WORKERS=str(workers), API_HOST="127.0.0.1", API_PORT=str(port), WORKER_BASE_PORT=str(base_port),
+               MODE="bench", ENABLE_NOTIFICATIONS="false", LOG_LEVEL="warning", HLS_OUTPUT_DIR=os.path.join(tmp, "hls"),
+               HEATMAP_SNAPSHOT_DIR=os.path.join(tmp, "heatmaps"), PERSIST_JOURNAL_DIR=os.path.join(tmp, "journal"),
+               API_KEY=API_KEY, **env_extra)
+    return subprocess.Popen([sys.executable, os.path.join(ROOT, "backend", "serve.py")], env=env,
+                            cwd=os.path.join(ROOT, "backend"))
+
+def _wait(url: str, timeout: float = 60.0):
+    import httpx
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        try:
+            if httpx.get(url + "/health", timeout=1).status_code == 200: return
+        except httpx.HTTPError: pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server at {url} did not come up")
+
+def _client(args) -> Tuple[int, int, float]:
+    """One load process: pre-encodes its cameras' batches, then posts them in a loop for `seconds`.
+    Returns (frames, errors, seconds)."""
+    import httpx
+    from wire import encode_batch, CONTENT_TYPE
+    from services.cluster import Cluster
+    k, cams_per_client, people, fps, batch_frames, seconds, url, info = args
+    scene = Scene(cams_per_client, people, fps, seed=k, first=1 + k * cams_per_client)
+    frames = list(scene.frames(max(1, batch_frames // cams_per_client) * 20))
+    # direct: group by owning worker (ring from GET /cluster) and post there; otherwise the public port
+    if info and info["workers"] > 1:
+        ring = Cluster(info["workers"], -1, vnodes=info["vnodes"])
+        targets = lambda cam: info["urls"][ring.owner(cam)]
+    else:
+        targets = lambda cam: url
+    by_target: Dict[str, List] = {}
+    for f in frames: by_target.setdefault(targets(f[0]), []).append(f)
+    bodies = [(t, encode_batch(fs[i:i + batch_frames]), len(fs[i:i + batch_frames]))
+              for t, fs in by_target.items() for i in range(0, len(fs), batch_frames)]
+    headers = {"X-API-Key": API_KEY, "Content-Type": CONTENT_TYPE}
+    sent = errors = 0
+    with httpx.Client(headers=headers, timeout=30) as c:
+        t0 = time.perf_counter(); i = 0
+        while time.perf_counter() - t0 < seconds:
+            target, body, n = bodies[i % len(bodies)]; i += 1
+            try: ok = c.post(target + "/ingest/batch", content=body).status_code < 400
+            except httpx.HTTPError: ok = False
+            sent += n if ok else 0; errors += not ok
+        return sent, errors, time.perf_counter() - t0
+
+def run(workers=(1, 2, 4), cameras: int = 64, people: int = 20, fps: float = 10.0, batch_frames: int = 50,
+        clients: int = 8, seconds: float = 10.0, direct: bool = True, env: Dict[str, str] = None) -> Dict[str, Any]:
+    """Start serve.py with each worker count and drive ingest flat out from `clients` processes.
+    direct=True posts each camera's batches to its owner's port (ring-aware client); False posts
+    everything to the shared port and lets the workers forward."""
+    import httpx
+    out: Dict[str, Any] = {"cpus": os.cpu_count()}
+    cams_per_client = max(1, cameras // clients)
+    for n in workers:
+        port, base = _free_port(), _free_port(n)
+        proc = _start(n, port, base, env or {})
+        url = f"http://127.0.0.1:{port}"
+        try:
+            _wait(url)
+            info = httpx.get(url + "/cluster", timeout=5).json() if direct else None
+            with mp.get_context("spawn").Pool(clients) as pool:
+                res = pool.map(_client, [(k, cams_per_client, people, fps, batch_frames, seconds, url, info)
+                                         for k in range(clients)])
+            frames = sum(r[0] for r in res); errors = sum(r[1] for r in res); wall = max(r[2] for r in res)
+            out[f"workers_{n}_frames_per_s"] = round(frames / wall, 1)
+            out[f"workers_{n}_errors"] = errors
+        finally:
+            proc.terminate()
+            try: proc.wait(timeout=30)
+            except subprocess.TimeoutExpired: proc.kill()
+    base_rate = out.get(f"workers_{workers[0]}_frames_per_s")
+    for n in workers[1:]:
+        if base_rate: out[f"workers_{n}_speedup"] = round(out[f"workers_{n}_frames_per_s"] / base_rate, 2)
+    return out
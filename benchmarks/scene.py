@@ -0,0 +1,50 @@
+from typing import Iterator, List, Tuple
+import numpy as np
+
+# Deterministic synthetic scenes: N cameras with M people each walking (and bouncing off the borders)
+# in normalised image coordinates, with stable track ids like the edge agent sends. People stay left of
+# a vertical tripwire at x = 0.5; at `alert_rate` crossings per camera per second of scene time one
+# of them is moved across it, so the zone engine raises line_cross alerts at a known rate.
+TRIPWIRE = [[0.5, 0.0], [0.5, 1.0]]
+
+class Scene:
+    def __init__(self, cameras: int = 8, people: int = 20, fps: float = 10.0, alert_rate: float = 0.1, seed: int = 0,
+                 first: int = 1):
+        self.cameras = [f"bench_cam_{i + first}" for i in range(cameras)]
+        self.people = people
+        self.fps = fps
+        self.alert_rate = alert_rate
+        self.rng = np.random.default_rng(seed)
+        n = cameras * people
+        self.size = self.rng.uniform(0.7, 1.3, (n, 1)) * np.array([0.02, 0.08])
+        self.pos = self.rng.uniform(0, 1, (n, 2)) * (np.array([0.45, 1.0]) - self.size)
+        self.vel = self.rng.normal(0, 0.002, (n, 2))
+        self.ids = np.tile(np.arange(1, people + 1), cameras)
+        self.crossings = 0
+
+    def zones(self):
+        """(camera_id, polygon) to install before driving the scene."""
+        return [(cam, TRIPWIRE) for cam in self.cameras]
+
+    def step(self):
+        self.pos += self.vel
+        hi = np.array([0.45, 1.0]) - self.size
+        for k in (0, 1):
+            out = (self.pos[:, k] < 0) | (self.pos[:, k] > hi[:, k])
+            self.vel[out, k] *= -1
+            self.pos[:, k] = np.clip(self.pos[:, k], 0, hi[:, k])
+        # Poisson crossings: the person jumps past the line and is clipped back on the next step (two crossings)
+        cross = self.rng.random(len(self.cameras)) < self.alert_rate / self.fps
+        for c in np.flatnonzero(cross):
+            i = c * self.people + self.rng.integers(self.people)
+            self.pos[i, 0] = 0.55
+            self.crossings += 2
+
+    def frames(self, ticks: int, t0: float = 0.0) -> Iterator[Tuple[str, float, List[List[float]]]]:
+        """(camera_id, ts, persons) for `ticks` ticks of every camera, in time order."""
+        for k in range(ticks):
+            self.step()
+            ts = t0 + k / self.fps
+            boxes = np.concatenate([self.pos, self.pos + self.size, self.ids[:, None]], axis=1)
+            for c, cam in enumerate(self.cameras):
+                yield cam, ts, boxes[c * self.people:(c + 1) * self.people].tolist()
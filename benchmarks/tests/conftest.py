@@ -0,0 +1,4 @@
+import os, sys
+
+# `benchmarks` is imported as a package from the repository root, as `python -m benchmarks` does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -0,0 +1,35 @@
+import json
+
+from benchmarks import micro, results
+from benchmarks.__main__ import main
+
+def _run(tmp_path, name, **metrics):
+    return results.save("micro", {"people": 20}, metrics, str(tmp_path / f"{name}.json"))
+
+def test_save_records_params_metrics_and_host(tmp_path):
+    path = _run(tmp_path, "a", zones_polygon_ms=1.5)
+    doc = json.load(open(path))
+    assert doc["kind"] == "micro" and doc["params"] == {"people": 20} and doc["metrics"] == {"zones_polygon_ms": 1.5}
+    assert doc["host"]["cpus"] and "created" in doc
+
+def test_compare_flags_moves_the_wrong_way_past_the_threshold(tmp_path):
+    old = _run(tmp_path, "old", ingest_frames_per_s=1000, zones_polygon_ms=2.0, tracker_id_switches=3,
+               heatmap_add_us=10.0, only_old_ms=1.0, label="x")
+    new = _run(tmp_path, "new", ingest_frames_per_s=850, zones_polygon_ms=1.0, tracker_id_switches=30,
+               heatmap_add_us=10.5, label="y")
+    rows = {r["metric"]: r for r in results.compare(old, new, threshold=0.10)}
+    assert set(rows) == {"ingest_frames_per_s", "zones_polygon_ms", "tracker_id_switches", "heatmap_add_us"}
+    assert rows["ingest_frames_per_s"]["regression"] and rows["ingest_frames_per_s"]["change_pct"] == -15.0
+    assert not rows["zones_polygon_ms"]["regression"]       # faster
+    assert not rows["tracker_id_switches"]["regression"]    # no direction: informational
+    assert not rows["heatmap_add_us"]["regression"]         # +5 %, inside the threshold
+
+def test_compare_command_exits_non_zero_on_a_regression(tmp_path, capsys):
+    a = _run(tmp_path, "a", wire_encode_50_frames_us=100.0)
+    b = _run(tmp_path, "b", wire_encode_50_frames_us=150.0)
+    assert main(["compare", a, a]) == 0
+    assert main(["compare", a, b]) == 1 and "REGRESSION" in capsys.readouterr().out
+
+def test_wire_microbenchmark_round_trips():
+    out = micro.wire(people=5, frames=4)
+    assert out["wire_bytes_per_frame"] > 0 and out["wire_decode_50_frames_us"] > 0
@@ -0,0 +1,30 @@
+import numpy as np
+
+from benchmarks.scene import TRIPWIRE, Scene
+
+def test_same_seed_same_scene():
+    a = list(Scene(cameras=3, people=5, seed=7).frames(20))
+    assert a == list(Scene(cameras=3, people=5, seed=7).frames(20))
+    assert a != list(Scene(cameras=3, people=5, seed=8).frames(20))
+
+def test_frames_are_in_time_order_with_stable_ids_inside_the_image():
+    s = Scene(cameras=2, people=4, fps=5.0, alert_rate=0.0)
+    frames = list(s.frames(50, t0=100.0))
+    assert [cam for cam, _, _ in frames[:4]] == ["bench_cam_1", "bench_cam_2"] * 2
+    assert [ts for _, ts, _ in frames[::2]] == [100.0 + k / 5.0 for k in range(50)]
+    boxes = np.array([p for _, _, persons in frames for p in persons])
+    assert boxes[:, 4].tolist() == [1, 2, 3, 4] * 100
+    assert (boxes[:, :4] >= 0).all() and (boxes[:, [0, 2]] <= 0.5).all() and (boxes[:, [1, 3]] <= 1).all()
+    assert s.crossings == 0
+
+def test_crossings_raise_line_cross_alerts_at_the_configured_rate():
+    from services.zones import CameraRules
+    s = Scene(cameras=2, people=10, alert_rate=2.0, seed=1)
+    rules = {cam: CameraRules(TRIPWIRE, None) for cam, _ in s.zones()}
+    crossed = 0
+    for cam, ts, persons in s.frames(100):
+        for a in rules[cam].evaluate(cam, ts, persons):
+            assert a["type"] == "line_cross"
+            crossed += len(a["message"].split(" crossed")[0].split(","))
+    # 2 cameras x 10 s x 2/s jumps, each crossing the line and back
+    assert 60 <= s.crossings <= 100 and 0.8 * s.crossings <= crossed <= s.crossings
@@ -1,14 +1,35 @@
 import os, time, json
-import cv2
-import numpy as np
-import requests
+from capture import VideoSource
+from wire import FrameBatcher
+from sender import Sender
+from scheduler import CpuBudget, FrameScheduler, MotionGate, IDLE_FPS
+from profiling import StageTimers, install_signal_hook
 
 BACKEND=os.getenv("BACKEND_URL","http://backend:8000")
 API_KEY=os.getenv("API_KEY","changeme")
 MODEL_PATH=os.getenv("AGENT_MODEL_PATH","")
 CAMERA_ID=os.getenv("CAMERA_ID","cam_1")
 VIDEO_PATH=os.getenv("VIDEO_PATH","/samples/demo.mp4")
-TRACKER_IMPL=os.getenv("TRACKER_IMPL","centroid")  # centroid | ocsort_stub | your_plugin
+STREAMS=os.getenv("STREAMS","")  # multi-stream mode: "cam_1=/samples/a.mp4,cam_2=rtsp://..." (overrides CAMERA_ID/VIDEO_PATH)
+MAX_BATCH=int(os.getenv("MAX_BATCH","32"))
+CAPTURE_MODE=os.getenv("CAPTURE_MODE","inline")  # inline | process (decode in a child process into a shared-memory ring; multi-stream uses threads otherwise)
+RING_SLOTS=int(os.getenv("RING_SLOTS","4"))
+TRACKER_IMPL=os.getenv("TRACKER_IMPL","centroid")  # centroid | bytetrack | ocsort_stub | your_plugin
+DETECTOR_IMPL=os.getenv("DETECTOR_IMPL","onnx_cpu" if MODEL_PATH else "mock")  # mock | onnx_cpu | your_plugin
+DETECT_EVERY=int(os.getenv("DETECT_EVERY","1"))  # run the detector every N frames, tracker-only in between
+INGEST_MODE=os.getenv("INGEST_MODE","json")  # json (one POST per frame) | batch (packed, see wire.py)
+BATCH_MAX_FRAMES=int(os.getenv("BATCH_MAX_FRAMES","50"))
+BATCH_MAX_SECONDS=float(os.getenv("BATCH_MAX_SECONDS","1.0"))
+SEND_QUEUE_MAX=int(os.getenv("SEND_QUEUE_MAX","256"))
+SEND_QUEUE_POLICY=os.getenv("SEND_QUEUE_POLICY","drop_oldest")  # drop_oldest | coalesce
+JOURNAL_DIR=os.getenv("JOURNAL_DIR","journal")  # offline journal for detections the backend missed; "" = drop them
+JOURNAL_MAX_MB=float(os.getenv("JOURNAL_MAX_MB","512"))
+JOURNAL_SEGMENT_MB=float(os.getenv("JOURNAL_SEGMENT_MB","8"))
+JOURNAL_FSYNC_SECONDS=float(os.getenv("JOURNAL_FSYNC_SECONDS","1.0"))
+REPLAY_FPS=float(os.getenv("REPLAY_FPS","500"))  # backfill rate once the backend is reachable again
+FRAME_INTERVAL=float(os.getenv("FRAME_INTERVAL","0.1"))  # fastest detection cadence (busy scene)
+ADAPTIVE_FPS=os.getenv("ADAPTIVE_FPS","true").lower()=="true"  # motion gate + IDLE_FPS when static, see scheduler.py
+STATS_INTERVAL=float(os.getenv("STATS_INTERVAL","30"))
 
 def load_tracker():
     try:
@@ -19,14 +40,14 @@ def load_tracker():
         from tracker_plugins.centroid import Tracker
         return Tracker()
 
-def mock_person_boxes(frame, t):
-  h,w = frame.shape[:2]
-  boxes=[]
-  for i in range(5):
-    x = int((t*5 + i*60) % (w-60))
-    y = 120 + int(40*np.sin((t+i)/10))
-    boxes.append([x,y,x+40,y+80])
-  return boxes
+def load_detector():
+    try:
+        mod = __import__(f"detector_plugins.{DETECTOR_IMPL}", fromlist=['Detector'])
+        return mod.Detector()
+    except Exception as e:
+        print("detector load failed; using mock:", e)
+        from detector_plugins.mock import Detector
+        return Detector()
 
 def to_norm(boxes, w, h):
   out=[]
@@ -37,26 +58,98 @@ def to_norm(boxes, w, h):
     out.append(norm)
   return out
 
+def make_scheduler():
+  if not ADAPTIVE_FPS: return FrameScheduler(1.0/FRAME_INTERVAL, 1.0/FRAME_INTERVAL)
+  return FrameScheduler(1.0/FRAME_INTERVAL, IDLE_FPS, gate=MotionGate())
+
+def make_sender():
+  batcher = FrameBatcher(BATCH_MAX_FRAMES, BATCH_MAX_SECONDS) if INGEST_MODE == "batch" else None
+  journal = None
+  if JOURNAL_DIR:
+    from journal import Journal
+    journal = Journal(JOURNAL_DIR, int(JOURNAL_SEGMENT_MB * 2**20), int(JOURNAL_MAX_MB * 2**20), JOURNAL_FSYNC_SECONDS)
+  sender = Sender(BACKEND, API_KEY, max_queue=SEND_QUEUE_MAX, policy=SEND_QUEUE_POLICY, batcher=batcher,
+                  journal=journal, replay_fps=REPLAY_FPS)
+  sender.start()
+  return sender
+
+def main_multi():
+  from multistream import MultiStreamRunner, CaptureThread, parse_streams
+  capture_cls = CaptureThread
+  if CAPTURE_MODE == "process":
+    from frame_ring import RingCapture
+    capture_cls = lambda cam_id, src: RingCapture(cam_id, src, RING_SLOTS)
+  runner = MultiStreamRunner(parse_streams(STREAMS), load_detector(), load_tracker, make_sender(), to_norm,
+                             max_batch=MAX_BATCH, frame_interval=FRAME_INTERVAL, stats_interval=STATS_INTERVAL,
+                             capture_cls=capture_cls, detect_every=DETECT_EVERY,
+                             scheduler_factory=make_scheduler, budget=CpuBudget(), timers=StageTimers())
+  install_signal_hook(runner.timers)
+  runner.run()
+
+def open_capture():
+  """Returns (read() -> frame or None, current() -> bool). 'process' decodes in a child process into a
+  shared-memory ring and hands out zero-copy views of the newest frame; current() says whether the last
+  one is still intact (the ring has not wrapped onto its slot)."""
+  if CAPTURE_MODE == "process":
+    from frame_ring import RingCapture
+    ring = RingCapture(CAMERA_ID, VIDEO_PATH, RING_SLOTS); ring.start()
+    return ring.take, ring.current
+  cap = VideoSource(VIDEO_PATH)
+  if not cap.opened(): return None, None
+  def read():
+    ok, frame = cap.read()  # rewinds files, reconnects live sources with a backoff
+    return frame if ok else None
+  return read, lambda: True
+
 def main():
-  cap = cv2.VideoCapture(VIDEO_PATH)
-  if not cap.isOpened():
+  if STREAMS: return main_multi()
+  read, current = open_capture()
+  if read is None:
     print("Failed to open", VIDEO_PATH); return
   tracker = load_tracker()
-  t=0
+  detector = load_detector()
+  sender = make_sender()
+  sched = make_scheduler(); budget = CpuBudget()
+  timers = StageTimers(); install_signal_hook(timers)
+  tracked = []
+  t=0; overwritten=0
+  next_tick = next_stats = time.monotonic()
   while True:
-    ok, frame = cap.read()
-    if not ok:
-      cap.set(cv2.CAP_PROP_POS_FRAMES, 0); continue
-    boxes = mock_person_boxes(frame, t)
-    tracked = tracker.update(boxes)
-    h,w = frame.shape[:2]
-    payload = {"camera_id": CAMERA_ID, "ts": time.time(), "persons": to_norm(tracked, w, h)}
-    try:
-      requests.post(f"{BACKEND}/ingest/detections", json=payload, headers={"X-API-Key": API_KEY}, timeout=2)
-    except Exception as e:
-      print("post failed:", e)
-    t += 1
-    time.sleep(0.1)
+    frame = read()
+    if frame is None:
+      time.sleep(0.005); continue
+    captured = time.time()  # frame ts is its capture time; the backend measures every later stage from it
+    now = time.monotonic(); t0 = time.perf_counter()
+    # frames the scheduler turns down (static scene between idle-rate detections) only pay for the motion gate
+    due = sched.offer(frame, now, budget.update(now))
+    t1 = time.perf_counter(); timers.add("schedule", t1 - t0)
+    if due:
+      if t % DETECT_EVERY == 0:
+        boxes = detector.detect([frame], [CAMERA_ID])[0]
+        t2 = time.perf_counter(); timers.add("detect", t2 - t1)
+        # ring capture wrapped onto this view while it was being detected: boxes may mix two frames, drop them
+        due = current()
+        if due: tracked = tracker.update(boxes)
+        else: overwritten += 1
+      else:
+        # skipped detector frame: let the motion model coast (trackers without one repeat the last result)
+        t2 = t1
+        tracked = tracker.predict() if hasattr(tracker, "predict") else tracked
+    if due:
+      timers.add("track", time.perf_counter() - t2)
+      h,w = frame.shape[:2]
+      payload = {"camera_id": CAMERA_ID, "ts": captured, "persons": to_norm(tracked, w, h)}
+      sender.submit(payload)
+      sched.observe(len(tracked), now)
+      t += 1
+    now = time.monotonic()
+    if now >= next_stats:
+      print("stream", sched.stats(now), "overwritten", overwritten, "cpu", budget.stats(), "stages", timers.stats(),
+            "sender", sender.stats())
+      next_stats = now + STATS_INTERVAL
+    # pace to FRAME_INTERVAL, counting the time already spent on this frame
+    next_tick = max(next_tick + FRAME_INTERVAL, now)
+    time.sleep(max(0.0, next_tick - now))
 
 if __name__ == "__main__":
   main()
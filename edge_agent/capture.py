@@ -0,0 +1,48 @@
+import os, time
+import cv2
+
+# Video source that keeps going. Files rewind when they end. A live source (rtsp://, http://, ...)
+# that stops delivering frames is released and reopened after an exponential backoff from
+# RECONNECT_MIN_SECONDS up to RECONNECT_MAX_SECONDS, reset by the next good frame. A file that still
+# fails right after a rewind is treated the same way, so no failure mode spins the CPU.
+RECONNECT_MIN_SECONDS = float(os.getenv("RECONNECT_MIN_SECONDS", "0.5"))
+RECONNECT_MAX_SECONDS = float(os.getenv("RECONNECT_MAX_SECONDS", "30"))
+
+class VideoSource:
+    def __init__(self, source: str, min_backoff: float = RECONNECT_MIN_SECONDS,
+                 max_backoff: float = RECONNECT_MAX_SECONDS, open_fn=cv2.VideoCapture, sleep=time.sleep):
+        self.source = source
+        self.live = "://" in source
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.open_fn = open_fn
+        self.sleep = sleep
+        self.cap = open_fn(source)
+        self.failures = 0; self.backoff = 0.0; self.reconnects = 0
+
+    def opened(self) -> bool:
+        return self.cap.isOpened()
+
+    def fps(self) -> float:
+        return self.cap.get(cv2.CAP_PROP_FPS) or 15.0
+
+    def read(self, out=None):
+        """(ok, frame) like VideoCapture.read (decoding into `out` when given). After a failure this has
+        already rewound, or waited out the backoff and reopened the source; the caller just reads again."""
+        ok, frame = self.cap.read() if out is None else self.cap.read(out)
+        if ok:
+            self.failures = 0; self.backoff = 0.0
+            return True, frame
+        self.failures += 1
+        if not self.live and self.failures == 1:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            return False, None
+        self.backoff = min(self.max_backoff, max(self.min_backoff, self.backoff * 2))
+        print(f"capture: {self.source} stopped delivering frames, reopening in {self.backoff:.1f}s")
+        self.cap.release()
+        self.sleep(self.backoff)
+        self.cap = self.open_fn(self.source); self.reconnects += 1
+        return False, None
+
+    def release(self):
+        self.cap.release()
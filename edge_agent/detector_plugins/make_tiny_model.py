@@ -0,0 +1,47 @@
+# Builds a tiny ONNX "detector" for pipeline tests and CPU benchmarks (needs the onnx package):
+#   python -m detector_plugins.make_tiny_model /models/tiny.onnx [input_size]
+# Output uses the YOLOv8 layout (B, 4+1, anchors): the input is average-pooled to a GRID x GRID map and
+# each cell's darkness becomes the "person" score of a fixed box covering that cell, so dark shapes on a
+# light background (like demo.mp4) produce detections. Batch dimension is dynamic.
+import sys
+import numpy as np
+
+GRID = 16
+
+def build(path: str, size: int = 320):
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    cell = size / GRID
+    yy, xx = np.mgrid[0:GRID, 0:GRID].astype(np.float32)
+    anchors = np.stack([(xx.ravel() + 0.5) * cell, (yy.ravel() + 0.5) * cell,
+                        np.full(GRID * GRID, cell), np.full(GRID * GRID, cell)])[None].astype(np.float32)  # (1, 4, A)
+    inits = [numpy_helper.from_array(anchors, "anchors"),
+             numpy_helper.from_array(np.array([1.0], np.float32), "one"),
+             numpy_helper.from_array(np.array([0, 1, GRID * GRID], np.int64), "score_shape"),
+             numpy_helper.from_array(np.array([1, 1], np.int64), "ones2"),
+             numpy_helper.from_array(np.array([0], np.int64), "s0"),
+             numpy_helper.from_array(np.array([1], np.int64), "s1")]
+    k = size // GRID
+    nodes = [
+        helper.make_node("AveragePool", ["images"], ["pooled"], kernel_shape=[k, k], strides=[k, k]),
+        helper.make_node("ReduceMean", ["pooled"], ["gray"], axes=[1], keepdims=1),
+        helper.make_node("Sub", ["one", "gray"], ["dark"]),
+        helper.make_node("Reshape", ["dark", "score_shape"], ["scores"]),
+        helper.make_node("Shape", ["images"], ["in_shape"]),
+        helper.make_node("Slice", ["in_shape", "s0", "s1"], ["batch"]),
+        helper.make_node("Concat", ["batch", "ones2"], ["reps"], axis=0),
+        helper.make_node("Tile", ["anchors", "reps"], ["boxes"]),
+        helper.make_node("Concat", ["boxes", "scores"], ["output0"], axis=1),
+    ]
+    graph = helper.make_graph(
+        nodes, "tiny_detector",
+        [helper.make_tensor_value_info("images", TensorProto.FLOAT, ["batch", 3, size, size])],
+        [helper.make_tensor_value_info("output0", TensorProto.FLOAT, ["batch", 5, GRID * GRID])], inits)
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.checker.check_model(model)
+    onnx.save(model, path)
+    return path
+
+if __name__ == "__main__":
+    print(build(sys.argv[1] if len(sys.argv) > 1 else "tiny.onnx", int(sys.argv[2]) if len(sys.argv) > 2 else 320))
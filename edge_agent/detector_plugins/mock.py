@@ -0,0 +1,22 @@
+# Synthetic detector used by the demo stack (boxes follow the rectangles drawn into demo.mp4).
+# Detector plugins provide class Detector with detect(frames, camera_ids) -> [[x1,y1,x2,y2,score], ...] per frame.
+import numpy as np
+
+def mock_person_boxes(frame, t):
+  h,w = frame.shape[:2]
+  boxes=[]
+  for i in range(5):
+    x = int((t*5 + i*60) % (w-60))
+    y = 120 + int(40*np.sin((t+i)/10))
+    boxes.append([x,y,x+40,y+80])
+  return boxes
+
+class Detector:
+  def __init__(self, *args, **kwargs):
+    self.t = {}
+  def detect(self, frames, camera_ids):
+    out=[]
+    for frame, cam in zip(frames, camera_ids):
+      t = self.t.get(cam, 0); self.t[cam] = t+1
+      out.append(mock_person_boxes(frame, t))
+    return out
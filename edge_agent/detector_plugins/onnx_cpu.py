@@ -0,0 +1,147 @@
+# ONNXRuntime CPU person detector for YOLO-style exports (ultralytics v8 layout: (B, 4+classes, anchors),
+# boxes as cx,cy,w,h in input pixels). Preprocessing letterboxes every frame of a batch straight into
+# one reused uint8 canvas and normalises the whole batch in a single vectorised pass; NMS is matrix
+# based (Cluster-NMS, same result as greedy NMS) instead of a per-box Python loop.
+#   python -m detector_plugins.onnx_cpu model.onnx     -> CPU benchmark
+import os, sys, time
+import cv2
+import numpy as np
+
+MODEL_PATH = os.getenv("AGENT_MODEL_PATH", "")
+INPUT_SIZE = int(os.getenv("DETECTOR_INPUT_SIZE", "640"))
+MAX_BATCH = int(os.getenv("DETECTOR_MAX_BATCH", "8"))
+CONF_THRESH = float(os.getenv("DETECTOR_CONF", "0.35"))
+IOU_THRESH = float(os.getenv("DETECTOR_IOU", "0.45"))
+PERSON_CLASS = int(os.getenv("DETECTOR_PERSON_CLASS", "0"))
+INTRA_THREADS = int(os.getenv("ORT_INTRA_THREADS", "0"))  # 0 = onnxruntime default (all cores)
+INTER_THREADS = int(os.getenv("ORT_INTER_THREADS", "1"))
+MAX_CANDIDATES = 1000
+PAD_VALUE = 114
+
+def nms(boxes: np.ndarray, scores: np.ndarray, iou_thresh: float) -> np.ndarray:
+    """Indices kept by greedy NMS, computed with matrix ops (Cluster-NMS) instead of a Python loop."""
+    if not len(boxes): return np.empty(0, dtype=np.int64)
+    order = np.argsort(-scores, kind="stable")[:MAX_CANDIDATES]
+    b = boxes[order]
+    x1, y1, x2, y2 = b[:, 0], b[:, 1], b[:, 2], b[:, 3]
+    area = (x2 - x1) * (y2 - y1)
+    iw = np.clip(np.minimum(x2[:, None], x2[None]) - np.maximum(x1[:, None], x1[None]), 0, None)
+    ih = np.clip(np.minimum(y2[:, None], y2[None]) - np.maximum(y1[:, None], y1[None]), 0, None)
+    inter = iw * ih
+    iou = np.triu(inter / np.maximum(area[:, None] + area[None] - inter, 1e-9), k=1)
+    keep = np.ones(len(b), bool)
+    for _ in range(len(b)):
+        # a box survives unless a higher-scoring *surviving* box overlaps it; iterate to the fixed point
+        new = iou[keep].max(axis=0, initial=0.0) < iou_thresh
+        if (new == keep).all(): break
+        keep = new
+    return order[keep]
+
+class Detector:
+    def __init__(self, model_path: str = MODEL_PATH, input_size: int = INPUT_SIZE, max_batch: int = MAX_BATCH,
+                 conf_thresh: float = CONF_THRESH, iou_thresh: float = IOU_THRESH, person_class: int = PERSON_CLASS,
+                 intra_threads: int = INTRA_THREADS, inter_threads: int = INTER_THREADS):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("onnx_cpu detector needs onnxruntime (pip install onnxruntime)") from e
+        if not model_path or not os.path.exists(model_path):
+            raise RuntimeError(f"AGENT_MODEL_PATH not found: {model_path!r}")
+        so = ort.SessionOptions()
+        so.intra_op_num_threads = intra_threads
+        so.inter_op_num_threads = inter_threads
+        so.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.sess = ort.InferenceSession(model_path, so, providers=["CPUExecutionProvider"])
+        inp = self.sess.get_inputs()[0]
+        self.input_name = inp.name
+        # exports with a fixed batch dimension are fed one frame at a time
+        self.max_batch = max_batch if not isinstance(inp.shape[0], int) else inp.shape[0]
+        self.size = input_size
+        self.conf_thresh = conf_thresh
+        self.iou_thresh = iou_thresh
+        self.person_class = person_class
+        self.canvas = np.full((self.max_batch, input_size, input_size, 3), PAD_VALUE, dtype=np.uint8)
+        self.blob = np.empty((self.max_batch, 3, input_size, input_size), dtype=np.float32)
+        self.geom = [None] * self.max_batch  # letterbox geometry last written to each canvas slot
+
+    def preprocess(self, frames):
+        s = self.size
+        meta = np.empty((len(frames), 3), dtype=np.float32)  # scale, pad_x, pad_y
+        for i, f in enumerate(frames):
+            h, w = f.shape[:2]
+            r = min(s / h, s / w)
+            nw, nh = int(round(w * r)), int(round(h * r))
+            left, top = (s - nw) // 2, (s - nh) // 2
+            if self.geom[i] != (nw, nh, left, top):
+                # borders only need repainting when the geometry changes (i.e. not for a steady stream)
+                self.canvas[i].fill(PAD_VALUE); self.geom[i] = (nw, nh, left, top)
+            cv2.resize(f, (nw, nh), dst=self.canvas[i, top:top+nh, left:left+nw], interpolation=cv2.INTER_LINEAR)
+            meta[i] = (r, left, top)
+        n = len(frames)
+        # BGR HWC uint8 -> RGB CHW float32 [0,1] for the whole batch in one pass
+        np.multiply(self.canvas[:n, :, :, ::-1].transpose(0, 3, 1, 2), np.float32(1 / 255), out=self.blob[:n])
+        return self.blob[:n], meta
+
+    def postprocess(self, out: np.ndarray, meta: np.ndarray, shapes):
+        if out.ndim == 3 and out.shape[1] > out.shape[2]: out = out.transpose(0, 2, 1)  # (B, N, C) exports
+        scores = out[:, 4 + self.person_class, :]                     # (B, N)
+        b_idx, a_idx = np.nonzero(scores >= self.conf_thresh)
+        result = [[] for _ in range(len(meta))]
+        if not len(b_idx): return result
+        cx, cy, bw, bh = (out[b_idx, k, a_idx] for k in range(4))
+        m = meta[b_idx]
+        boxes = np.stack([cx - bw / 2 - m[:, 1], cy - bh / 2 - m[:, 2], cx + bw / 2 - m[:, 1], cy + bh / 2 - m[:, 2]], 1) / m[:, :1]
+        sc = scores[b_idx, a_idx]
+        hw = np.asarray(shapes, dtype=np.float32)[b_idx]
+        boxes = np.clip(boxes, 0, np.stack([hw[:, 1], hw[:, 0], hw[:, 1], hw[:, 0]], 1))
+        ok = (boxes[:, 2] - boxes[:, 0] > 1) & (boxes[:, 3] - boxes[:, 1] > 1)  # drop boxes that were all padding
+        boxes, sc, b_idx = boxes[ok], sc[ok], b_idx[ok]
+        # b_idx is sorted (np.nonzero order), so each image's candidates are one contiguous run
+        starts = np.searchsorted(b_idx, np.arange(len(meta) + 1))
+        for i in range(len(meta)):
+            lo, hi = starts[i], starts[i + 1]
+            if lo == hi: continue
+            keep = lo + nms(boxes[lo:hi], sc[lo:hi], self.iou_thresh)
+            result[i] = np.concatenate([boxes[keep], sc[keep, None]], 1).tolist()
+        return result
+
+    def detect(self, frames, camera_ids=None):
+        out = []
+        for k in range(0, len(frames), self.max_batch):
+            chunk = frames[k:k + self.max_batch]
+            blob, meta = self.preprocess(chunk)
+            pred = self.sess.run(None, {self.input_name: blob})[0]
+            out.extend(self.postprocess(pred, meta, [f.shape[:2] for f in chunk]))
+        return out
+
+def benchmark(model_path: str, batches=(1, 4, 8), frames: int = 64, shape=(720, 1280, 3), threads=(1, 0)):
+    rng = np.random.default_rng(0)
+    imgs = []
+    for _ in range(8):
+        # light background with a handful of dark people-sized boxes, like the demo stream
+        img = np.full(shape, 240, dtype=np.uint8)
+        for x, y in rng.uniform(0, 1, (8, 2)) * (shape[1] - 80, shape[0] - 160):
+            cv2.rectangle(img, (int(x), int(y)), (int(x) + 80, int(y) + 160), (60, 60, 200), -1)
+        imgs.append(img)
+    results = []
+    for th in threads:
+        for bs in batches:
+            det = Detector(model_path, max_batch=bs, intra_threads=th)
+            det.detect(imgs[:bs])  # warm-up
+            t_pre = t_inf = t_post = 0.0
+            for k in range(0, frames, bs):
+                chunk = [imgs[(k + j) % len(imgs)] for j in range(bs)]
+                t0 = time.perf_counter(); blob, meta = det.preprocess(chunk)
+                t1 = time.perf_counter(); pred = det.sess.run(None, {det.input_name: blob})[0]
+                t2 = time.perf_counter(); det.postprocess(pred, meta, [f.shape[:2] for f in chunk])
+                t3 = time.perf_counter()
+                t_pre += t1 - t0; t_inf += t2 - t1; t_post += t3 - t2
+            per = lambda t: round(t / frames * 1000, 3)
+            results.append({"intra_threads": th, "batch": bs, "pre_ms": per(t_pre), "infer_ms": per(t_inf),
+                            "post_ms": per(t_post), "fps": round(frames / (t_pre + t_inf + t_post), 1)})
+    return results
+
+if __name__ == "__main__":
+    for r in benchmark(sys.argv[1] if len(sys.argv) > 1 else MODEL_PATH):
+        print(r)
@@ -0,0 +1,147 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+# Shared-memory frame ring: one writer (capture) and any number of readers (detector workers).
+# Layout: int64 header [latest_seq, slot_seq[0..slots-1]] followed by `slots` preallocated frames.
+# The writer always moves on to the next slot, so a slow reader never blocks capture: it simply
+# finds newer frames and the stale ones are overwritten (counted as skipped), never queued.
+_HDR = 1
+
+class FrameRing:
+    def __init__(self, shm: shared_memory.SharedMemory, shape, slots: int, dtype=np.uint8, owner: bool = False):
+        self.shm = shm
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = owner
+        self.header = np.ndarray((_HDR + slots,), dtype=np.int64, buffer=shm.buf)
+        off = (_HDR + slots) * 8
+        self.frames = np.ndarray((slots,) + self.shape, dtype=dtype, buffer=shm.buf, offset=off)
+        self.last_read = 0; self.skipped = 0
+
+    @classmethod
+    def create(cls, shape, slots: int = 4, dtype=np.uint8, name: str | None = None):
+        size = (_HDR + slots) * 8 + slots * int(np.prod(shape)) * np.dtype(dtype).itemsize
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        ring = cls(shm, shape, slots, dtype, owner=True)
+        ring.header[:] = 0
+        return ring
+
+    @classmethod
+    def attach(cls, name: str, shape, slots: int = 4, dtype=np.uint8):
+        return cls(shared_memory.SharedMemory(name=name), shape, slots, dtype)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def written(self) -> int:
+        return int(self.header[0])
+
+    # --- writer ---
+    def next_slot(self) -> np.ndarray:
+        """View of the slot the next frame goes into; fill it (e.g. cap.read(view)) and call commit()."""
+        seq = self.written + 1
+        self.header[_HDR + seq % self.slots] = -1  # being written; readers skip it
+        return self.frames[seq % self.slots]
+
+    def commit(self):
+        seq = self.written + 1
+        self.header[_HDR + seq % self.slots] = seq
+        self.header[0] = seq
+
+    def write(self, frame: np.ndarray):
+        np.copyto(self.next_slot(), frame); self.commit()
+
+    # --- reader ---
+    def read_latest(self):
+        """(seq, view) of the newest frame not read yet, or None. The view aliases shared memory and
+        stays valid until the writer wraps around to that slot (`slots` frames later); use is_current()
+        to check after processing, or copy() it if it must outlive that."""
+        seq = self.written
+        if seq <= self.last_read: return None
+        slot = seq % self.slots
+        if self.header[_HDR + slot] != seq: return None  # writer is already overwriting it
+        if self.last_read: self.skipped += seq - self.last_read - 1
+        self.last_read = seq
+        return seq, self.frames[slot]
+
+    def is_current(self, seq: int) -> bool:
+        return self.header[_HDR + seq % self.slots] == seq
+
+    def close(self):
+        self.header = self.frames = None
+        self.shm.close()
+        if self.owner: self.shm.unlink()
+
+def probe_shape(source: str):
+    import cv2
+    cap = cv2.VideoCapture(source)
+    ok, frame = cap.read()
+    cap.release()
+    if not ok: raise RuntimeError(f"cannot read from {source}")
+    return frame.shape
+
+def capture_into_ring(source: str, name: str, shape, slots: int):
+    """Capture loop for a child process: decodes straight into the ring slots."""
+    import cv2
+    from capture import VideoSource
+    ring = FrameRing.attach(name, shape, slots)
+    cap = VideoSource(source)
+    period = 0.0 if cap.live else 1.0 / cap.fps()
+    next_t = time.monotonic()
+    try:
+        while True:
+            view = ring.next_slot()
+            ok, frame = cap.read(view)
+            if not ok: continue  # rewound, or reopened after a backoff (capture.py)
+            if frame is not view:
+                if frame.shape == view.shape: np.copyto(view, frame)
+                else: cv2.resize(frame, (view.shape[1], view.shape[0]), dst=view)
+            ring.commit()
+            if period:
+                next_t = max(next_t + period, time.monotonic() - period)
+                time.sleep(max(0.0, next_t - time.monotonic()))
+    finally:
+        cap.release(); ring.close()
+
+class RingCapture:
+    """Capture in a separate process, frames handed over through a FrameRing. Same interface as
+    multistream.CaptureThread, so both single- and multi-stream loops can use it."""
+    def __init__(self, camera_id: str, source: str, slots: int = 4):
+        self.camera_id = camera_id
+        self.source = source
+        self.ring = FrameRing.create(probe_shape(source), slots)
+        self.proc = mp.get_context("spawn").Process(target=capture_into_ring, daemon=True,
+                                                    args=(source, self.ring.name, self.ring.shape, slots))
+        self.processed = 0; self.overwritten = 0
+        self.seq = 0
+
+    @property
+    def decoded(self) -> int:
+        return self.ring.written
+
+    @property
+    def skipped(self) -> int:
+        return self.ring.skipped
+
+    def start(self):
+        self.proc.start()
+
+    def take(self):
+        """Zero-copy view of the newest frame, or None. Check current() once done with it."""
+        got = self.ring.read_latest()
+        if not got: return None
+        self.seq = got[0]
+        return got[1]
+
+    def current(self) -> bool:
+        """False if capture has wrapped around onto the last taken frame's slot since take(), i.e. anything
+        computed from that view may mix two frames and must be thrown away."""
+        return self.ring.is_current(self.seq)
+
+    def stop(self):
+        if self.proc.is_alive(): self.proc.terminate(); self.proc.join(timeout=2)
+        self.ring.close()
@@ -0,0 +1,149 @@
+import os, struct, time, zlib
+from wire import HEADER, encode_batch
+
+# Offline journal for detections the backend did not take. Records are the same packed batches
+# POST /ingest/batch accepts (wire.py), so replay just posts them back:
+#   record  : magic "SVJ1" | length u32 | crc32 u32 | SVB1 batch body       (little-endian)
+#   segment : <seq:012d>.svj, records appended until it reaches `segment_bytes`, then a new one is opened
+# Frames are buffered in memory and written as one record (and fsync'd) every `fsync_seconds`, so a
+# crash loses at most that much; a torn record at the tail fails its crc and ends that segment. When
+# the journal outgrows `max_bytes` the oldest segments are deleted. Replay reads oldest first and
+# remembers how far it got in `replay.pos`, so a restart does not resend a finished part.
+REC = struct.Struct("<4sII")
+REC_MAGIC = b"SVJ1"
+
+class Journal:
+    def __init__(self, directory: str, segment_bytes: int = 8 << 20, max_bytes: int = 512 << 20,
+                 fsync_seconds: float = 1.0, record_frames: int = 500, width: int = 5):
+        self.dir = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_seconds = fsync_seconds
+        self.record_frames = record_frames
+        self.width = width
+        os.makedirs(directory, exist_ok=True)
+        self.segments = sorted(int(f[:-4]) for f in os.listdir(directory) if f.endswith(".svj"))
+        self.sizes = {s: os.path.getsize(self._path(s)) for s in self.segments}
+        self.f = None                   # active segment, opened lazily
+        self.pending = []               # frames not written yet
+        self.pending_bodies = []        # already-encoded batches not written yet
+        self.last_sync = time.monotonic()
+        self.read_seg, self.read_off = self._load_pos()
+        # sequence numbers only grow, so a stale replay.pos can never point into a newer segment
+        self.next_seq = max(self.segments[-1] if self.segments else 0, self.read_seg) + 1
+        self.counts = {"journaled": 0, "replayed": 0, "evicted": 0, "corrupt": 0}
+
+    def _path(self, seq: int) -> str:
+        return os.path.join(self.dir, f"{seq:012d}.svj")
+
+    # --- writing ---
+    def add(self, camera_id: str, ts: float, persons):
+        self.pending.append((camera_id, ts, persons))
+        if len(self.pending) >= self.record_frames: self.sync()
+
+    def add_batch(self, body: bytes):
+        self.pending_bodies.append(body)
+
+    def tick(self, now: float):
+        if (self.pending or self.pending_bodies) and now - self.last_sync >= self.fsync_seconds: self.sync()
+
+    def sync(self):
+        """Write everything buffered as records and fsync the active segment."""
+        bodies = self.pending_bodies
+        if self.pending: bodies.append(encode_batch(self.pending, self.width))
+        self.pending, self.pending_bodies = [], []
+        self.last_sync = time.monotonic()
+        if not bodies: return
+        for body in bodies:
+            if self.f is None or self.f.tell() >= self.segment_bytes: self._rotate()
+            self.f.write(REC.pack(REC_MAGIC, len(body), zlib.crc32(body)) + body)
+            self.counts["journaled"] += HEADER.unpack_from(body, 0)[4]
+        self.f.flush(); os.fsync(self.f.fileno())
+        self.sizes[self.segments[-1]] = self.f.tell()
+        self._evict()
+
+    def _rotate(self):
+        if self.f is not None:
+            self.sizes[self.segments[-1]] = self.f.tell(); self.f.close()
+        seq = self.next_seq; self.next_seq += 1
+        self.segments.append(seq); self.sizes[seq] = 0
+        self.f = open(self._path(seq), "ab")
+
+    def _evict(self):
+        # the active segment is never evicted; once it is the only one left the cap is best effort
+        while sum(self.sizes.values()) > self.max_bytes and len(self.segments) > 1:
+            seq = self.segments.pop(0)
+            self.counts["evicted"] += self._frames_in(seq, self.read_off if seq == self.read_seg else 0)
+            os.remove(self._path(seq)); del self.sizes[seq]
+
+    def _frames_in(self, seq: int, offset: int) -> int:
+        return sum(HEADER.unpack_from(body, 0)[4] for body, _ in self._records(seq, offset))
+
+    # --- replay ---
+    @property
+    def backlog_bytes(self) -> int:
+        return sum(self.sizes.values()) - (self.read_off if self.read_seg in self.sizes else 0)
+
+    def has_backlog(self) -> bool:
+        return bool(self.pending or self.pending_bodies) or self.backlog_bytes > 0
+
+    def _records(self, seq: int, offset: int):
+        """(body, end offset) for the valid records of a segment from `offset`."""
+        try:
+            with open(self._path(seq), "rb") as f:
+                f.seek(offset)
+                while True:
+                    head = f.read(REC.size)
+                    if len(head) < REC.size: return
+                    magic, n, crc = REC.unpack(head)
+                    body = f.read(n)
+                    if magic != REC_MAGIC or len(body) < n or zlib.crc32(body) != crc:
+                        self.counts["corrupt"] += 1; return
+                    yield body, f.tell()
+        except FileNotFoundError:
+            return
+
+    def peek(self):
+        """(body, frames) of the oldest record not replayed yet, or None. Call commit() once the
+        backend took it. Reads into the active segment too, up to what has been synced."""
+        if self.pending or self.pending_bodies: self.sync()
+        while self.segments:
+            seq = self.segments[0]
+            if self.read_seg != seq: self.read_seg, self.read_off = seq, 0
+            for body, end in self._records(seq, self.read_off):
+                self.next_off = end
+                return body, HEADER.unpack_from(body, 0)[4]
+            if self.f is not None and seq == self.segments[-1]:
+                if self.f.tell() == self.read_off: return None   # caught up with the writer
+                self.f.close(); self.f = None                   # torn tail: start a fresh segment
+            self.segments.pop(0); self.sizes.pop(seq, None)
+            os.remove(self._path(seq)); self._save_pos()
+        return None
+
+    def commit(self, frames: int):
+        self.read_off = self.next_off; self.counts["replayed"] += frames
+        if self.f is not None and self.read_seg == self.segments[-1] and self.read_off >= self.f.tell():
+            # active segment fully replayed: drop it now; the next write opens a fresh one
+            self.f.close(); self.f = None
+            seq = self.segments.pop(); self.sizes.pop(seq, None); os.remove(self._path(seq))
+        self._save_pos()
+
+    def _load_pos(self):
+        try:
+            with open(os.path.join(self.dir, "replay.pos")) as f: seg, off = f.read().split()
+            return int(seg), int(off)
+        except (OSError, ValueError):
+            return 0, 0
+
+    def _save_pos(self):
+        tmp = os.path.join(self.dir, "replay.pos.tmp")
+        with open(tmp, "w") as f: f.write(f"{self.read_seg} {self.read_off}")
+        os.replace(tmp, os.path.join(self.dir, "replay.pos"))
+
+    def close(self):
+        self.sync()
+        if self.f is not None: self.f.close(); self.f = None
+
+    def stats(self) -> dict:
+        return dict(self.counts, segments=len(self.segments), backlog_bytes=self.backlog_bytes,
+                    pending_frames=len(self.pending))
@@ -0,0 +1,150 @@
+import threading, time
+from capture import VideoSource
+
+def parse_streams(spec: str):
+    """"cam_1=/samples/a.mp4,cam_2=rtsp://host/stream" -> [("cam_1", "/samples/a.mp4"), ...]"""
+    out = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item: continue
+        cam_id, _, src = item.partition("=")
+        if not src: raise ValueError(f"bad stream spec {item!r}, expected camera_id=source")
+        out.append((cam_id.strip(), src.strip()))
+    return out
+
+class CaptureThread(threading.Thread):
+    """Decodes one source and keeps only the newest frame; the inference loop never waits on decode
+    and a slow loop skips stale frames instead of queueing them."""
+    def __init__(self, camera_id: str, source: str, open_source=VideoSource):
+        super().__init__(daemon=True, name=f"capture-{camera_id}")
+        self.camera_id = camera_id
+        self.source = source
+        self.open_source = open_source
+        self.lock = threading.Lock()
+        self.frame = None; self.seq = 0; self.taken = 0
+        self.decoded = 0; self.skipped = 0; self.processed = 0; self.overwritten = 0
+        self.ok = False; self.stopped = False
+
+    def run(self):
+        cap = self.open_source(self.source)
+        self.ok = cap.opened()
+        if not self.ok:
+            print("Failed to open", self.source); return
+        # files decode as fast as the CPU allows; pace them to their native rate like a live feed
+        period = 0.0 if cap.live else 1.0 / cap.fps()
+        next_t = time.monotonic()
+        while not self.stopped:
+            ok, frame = cap.read()
+            if not ok: continue  # rewound, or reopened after a backoff (capture.py)
+            if period:
+                next_t = max(next_t + period, time.monotonic() - period)
+                time.sleep(max(0.0, next_t - time.monotonic()))
+            with self.lock:
+                if self.seq > self.taken: self.skipped += 1
+                self.frame = frame; self.seq += 1
+            self.decoded += 1
+        cap.release()
+
+    def take(self):
+        """Newest frame not yet handed out, or None."""
+        with self.lock:
+            if self.seq == self.taken: return None
+            self.taken = self.seq
+            return self.frame
+
+    def current(self) -> bool:
+        """Taken frames are never written to again (same interface as frame_ring.RingCapture)."""
+        return True
+
+class MultiStreamRunner:
+    """One process, many cameras: per-source capture threads, one batched detector call per tick,
+    results fanned back out to per-camera trackers and the shared sender."""
+    def __init__(self, streams, detector, tracker_factory, sender, to_norm, max_batch: int = 32,
+                 frame_interval: float = 0.1, stats_interval: float = 30.0, capture_cls=CaptureThread,
+                 detect_every: int = 1, scheduler_factory=None, budget=None, timers=None):
+        self.captures = [capture_cls(cam_id, src) for cam_id, src in streams]
+        self.trackers = {c.camera_id: tracker_factory() for c in self.captures}
+        self.detector = detector
+        self.sender = sender
+        self.to_norm = to_norm
+        self.max_batch = max_batch
+        self.frame_interval = frame_interval
+        self.stats_interval = stats_interval
+        self.detect_every = max(1, detect_every)
+        # per-camera FrameScheduler (motion gate + adaptive fps) and a shared CpuBudget, see scheduler.py
+        self.schedulers = {c.camera_id: scheduler_factory() for c in self.captures} if scheduler_factory else {}
+        self.budget = budget
+        self.timers = timers  # profiling.StageTimers: schedule / detect (per batch) / track (per frame)
+        self.last = {}
+        self.started = time.monotonic()
+
+    def _time(self, stage: str, t0: float):
+        if self.timers: self.timers.add(stage, time.perf_counter() - t0)
+
+    def step(self) -> int:
+        now = time.monotonic(); t0 = time.perf_counter()
+        self.captured = time.time()  # ts of every frame taken this tick
+        scale = self.budget.update(now) if self.budget else 1.0
+        ready = []
+        for c in self.captures:
+            f = c.take()
+            if f is None: continue
+            s = self.schedulers.get(c.camera_id)
+            if s is None or s.offer(f, now, scale): ready.append((c, f))
+        self._time("schedule", t0)
+        due, coast = [], []
+        for c, f in ready: (due if c.processed % self.detect_every == 0 else coast).append((c, f))
+        for k in range(0, len(due), self.max_batch):
+            batch = due[k:k + self.max_batch]
+            t0 = time.perf_counter()
+            results = self.detector.detect([f for _, f in batch], [c.camera_id for c, _ in batch])
+            self._time("detect", t0)
+            for (cap, frame), boxes in zip(batch, results):
+                if not cap.current():
+                    # ring capture wrapped onto this view while it was being detected: boxes may mix two frames
+                    cap.overwritten += 1; continue
+                t0 = time.perf_counter()
+                tracked = self.trackers[cap.camera_id].update(boxes)
+                self._time("track", t0)
+                self._emit(cap, frame, tracked)
+        for cap, frame in coast:
+            # skipped detector frame: coast on the motion model (or repeat the last result)
+            t0 = time.perf_counter()
+            tr = self.trackers[cap.camera_id]
+            tracked = tr.predict() if hasattr(tr, "predict") else self.last.get(cap.camera_id, [])
+            self._time("track", t0)
+            self._emit(cap, frame, tracked)
+        return len(ready)
+
+    def _emit(self, cap, frame, tracked):
+        self.last[cap.camera_id] = tracked
+        s = self.schedulers.get(cap.camera_id)
+        if s: s.observe(len(tracked), time.monotonic())
+        h, w = frame.shape[:2]
+        self.sender.submit({"camera_id": cap.camera_id, "ts": self.captured, "persons": self.to_norm(tracked, w, h)})
+        cap.processed += 1
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        el = max(now - self.started, 1e-6)
+        per = {}
+        for c in self.captures:
+            per[c.camera_id] = {"fps": round(c.processed / el, 2), "decoded": c.decoded, "skipped": c.skipped,
+                                "overwritten": c.overwritten}
+            s = self.schedulers.get(c.camera_id)
+            if s: per[c.camera_id].update(s.stats(now))  # fps becomes the rate since the last report
+        out = {"streams": per, "total_fps": round(sum(p["fps"] for p in per.values()), 2)}
+        if self.budget: out["cpu"] = self.budget.stats()
+        if self.timers: out["stages"] = self.timers.stats()
+        return out
+
+    def run(self):
+        for c in self.captures: c.start()
+        next_tick = next_stats = time.monotonic()
+        while True:
+            self.step()
+            now = time.monotonic()
+            if now >= next_stats:
+                print("streams", self.stats(), "sender", self.sender.stats()); next_stats = now + self.stats_interval
+            next_tick = max(next_tick + self.frame_interval, now)
+            time.sleep(max(0.0, next_tick - now))
@@ -0,0 +1,48 @@
+import json, os, signal, sys, threading
+from collections import Counter, deque
+
+# Hot-path stats for the agent loop and an opt-in sampling profiler.
+#   StageTimers: per-stage durations (detect, track, ...) in small rings; stats() gives count/avg/p50/p99/max
+#   sample():    the backend's sampling profiler (backend/services/profiler.py, copied into the agent
+#                image): every thread's Python stack through sys._current_frames() every PROFILE_INTERVAL
+#                seconds for at most PROFILE_MAX_SECONDS, aggregated into where time went
+#   install_signal_hook(): with PROFILE_ENABLED=true, `kill -USR1 <agent pid>` prints a PROFILE_SECONDS
+#                profile to stdout as one JSON line, without stopping the loop
+PROFILE_ENABLED = os.getenv("PROFILE_ENABLED", "false").lower() == "true"
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "10"))
+
+try:
+    from profiler import sample
+except ImportError:  # running from a checkout: the sampler lives with the backend (see its header)
+    sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "backend", "services"))
+    from profiler import sample
+
+class StageTimers:
+    def __init__(self, keep: int = 1024):
+        self.keep = keep
+        self.samples = {}
+        self.counts = Counter()
+
+    def add(self, stage: str, seconds: float):
+        d = self.samples.get(stage)
+        if d is None: d = self.samples[stage] = deque(maxlen=self.keep)
+        d.append(seconds); self.counts[stage] += 1
+
+    def stats(self) -> dict:
+        out = {}
+        for stage, d in list(self.samples.items()):
+            lat = sorted(d)
+            if not lat: continue
+            pct = lambda p: round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 2)
+            out[stage] = {"n": self.counts[stage], "avg_ms": round(sum(lat) / len(lat) * 1000, 2),
+                          "p50_ms": pct(0.5), "p99_ms": pct(0.99), "max_ms": round(lat[-1] * 1000, 2)}
+        return out
+
+def install_signal_hook(timers: StageTimers = None, seconds: float = PROFILE_SECONDS):
+    if not PROFILE_ENABLED or not hasattr(signal, "SIGUSR1"): return
+    def run():
+        try: prof = sample(seconds)
+        except RuntimeError as e: print("profile:", e); return
+        if timers: prof["stages"] = timers.stats()
+        print("profile", json.dumps(prof))
+    signal.signal(signal.SIGUSR1, lambda *_: threading.Thread(target=run, daemon=True, name="profiler").start())
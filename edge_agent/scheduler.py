@@ -0,0 +1,115 @@
+import os, time
+import cv2
+import numpy as np
+
+# Adaptive frame scheduling. Every frame the loop takes goes through a cheap motion gate (absolute
+# difference of two downscaled grayscale frames held in preallocated buffers); the detector then runs
+# at the stream's full rate while there is motion or live tracks, and drops to IDLE_FPS once the scene
+# has been static for ACTIVE_HOLD_SECONDS. A process-wide CpuBudget scales every stream's rate down
+# while the agent's CPU time (all threads) is over CPU_BUDGET cores, and back up when it is under.
+MOTION_SIZE = tuple(int(v) for v in os.getenv("MOTION_SIZE", "160x90").lower().split("x"))
+MOTION_PIXEL_DELTA = int(os.getenv("MOTION_PIXEL_DELTA", "20"))    # grey levels a pixel must change by
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", "0.001"))   # fraction of changed pixels = motion
+IDLE_FPS = float(os.getenv("IDLE_FPS", "1"))
+ACTIVE_HOLD_SECONDS = float(os.getenv("ACTIVE_HOLD_SECONDS", "5"))
+CPU_BUDGET = float(os.getenv("CPU_BUDGET", "0"))  # cores for the whole agent process, e.g. 0.5; 0 = unlimited
+
+class MotionGate:
+    """frame -> motion? Downscales into fixed buffers, converts to grey in place and diffs against the
+    previous frame; no per-frame allocations. The downscale is a nearest-neighbour pass to 4x the gate
+    size and an INTER_AREA pass from there: each gate pixel still averages 16 samples (enough to smooth
+    sensor and compression noise) at a sixth of the cost of INTER_AREA on the full frame."""
+    def __init__(self, size=MOTION_SIZE, delta: int = MOTION_PIXEL_DELTA, threshold: float = MOTION_THRESHOLD):
+        w, h = size
+        self.size = (w, h)
+        self.mid = np.empty((4 * h, 4 * w, 3), np.uint8)
+        self.small = np.empty((h, w, 3), np.uint8)
+        self.grey = [np.empty((h, w), np.uint8), np.empty((h, w), np.uint8)]
+        self.diff = np.empty((h, w), np.uint8)
+        self.delta = delta
+        self.threshold = threshold
+        self.cur = 0; self.primed = False
+        self.level = 0.0  # fraction of changed pixels in the last frame
+
+    def __call__(self, frame: np.ndarray) -> bool:
+        g = self.grey[self.cur]
+        if frame.ndim == 2:
+            cv2.resize(frame, self.size, dst=g, interpolation=cv2.INTER_AREA)
+        else:
+            src = frame
+            if frame.shape[0] > self.mid.shape[0]:
+                cv2.resize(frame, self.mid.shape[1::-1], dst=self.mid, interpolation=cv2.INTER_NEAREST); src = self.mid
+            cv2.resize(src, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=g)
+        prev = self.grey[self.cur ^ 1]; self.cur ^= 1
+        if not self.primed:
+            self.primed = True; return True
+        cv2.absdiff(g, prev, dst=self.diff)
+        cv2.threshold(self.diff, self.delta, 1, cv2.THRESH_BINARY, dst=self.diff)
+        self.level = cv2.countNonZero(self.diff) / self.diff.size
+        return self.level >= self.threshold
+
+class FrameScheduler:
+    """Per-stream detection rate: `max_fps` while active (motion, or the tracker still has people),
+    `idle_fps` after `hold` quiet seconds. offer() says whether this frame should be processed;
+    observe() feeds back the number of tracks. Without a gate every frame counts as motion."""
+    def __init__(self, max_fps: float, idle_fps: float = IDLE_FPS, hold: float = ACTIVE_HOLD_SECONDS, gate=None):
+        self.max_fps = max_fps
+        self.idle_fps = min(idle_fps, max_fps)
+        self.hold = hold
+        self.gate = gate
+        self.active_until = 0.0
+        self.last_run = float("-inf"); self.next_due = 0.0; self.interval = 1.0 / max_fps
+        self.target = max_fps
+        self.processed = 0; self.gated = 0
+        self.win_t = None; self.win_n = 0
+
+    def offer(self, frame: np.ndarray, now: float, scale: float = 1.0) -> bool:
+        if self.win_t is None: self.win_t = now
+        if self.gate is None or self.gate(frame): self.active_until = now + self.hold
+        fps = (self.max_fps if now < self.active_until else self.idle_fps) * scale
+        self.target = fps
+        interval = 1.0 / fps
+        # waking up from idle shortens the interval right away instead of after the pending idle one
+        # (only when the rate goes up: on every frame it would also eat the jitter slack below)
+        if interval < self.interval: self.next_due = min(self.next_due, self.last_run + interval)
+        self.interval = interval
+        if now < self.next_due - 0.5 / self.max_fps:  # half a loop tick of slack for jitter
+            self.gated += 1; return False
+        self.next_due = max(self.next_due, now - interval) + interval
+        self.last_run = now; self.processed += 1
+        return True
+
+    def observe(self, n_tracks: int, now: float):
+        if n_tracks: self.active_until = max(self.active_until, now + self.hold)
+
+    def stats(self, now: float) -> dict:
+        """Effective fps since the previous stats() call, plus lifetime gated-frame count."""
+        el = max(now - (now if self.win_t is None else self.win_t), 1e-6)
+        fps = (self.processed - self.win_n) / el
+        self.win_t, self.win_n = now, self.processed
+        return {"fps": round(fps, 2), "target_fps": round(self.target, 2), "gated": self.gated,
+                "active": now < self.active_until, "motion": round(self.gate.level, 4) if self.gate else None}
+
+class CpuBudget:
+    """Measures process CPU time over wall time every `period` seconds and moves `scale` toward
+    budget/usage (damped, clamped to [min_scale, 1]); schedulers multiply their fps by it."""
+    def __init__(self, budget: float = CPU_BUDGET, period: float = 1.0, min_scale: float = 0.05):
+        self.budget = budget
+        self.period = period
+        self.min_scale = min_scale
+        self.scale = 1.0; self.usage = 0.0
+        self.t = time.monotonic(); self.cpu = time.process_time()
+
+    def update(self, now: float) -> float:
+        if now - self.t < self.period: return self.scale
+        cpu = time.process_time()
+        self.usage = (cpu - self.cpu) / (now - self.t)
+        self.t, self.cpu = now, cpu
+        if self.budget > 0:
+            want = self.scale * self.budget / max(self.usage, 1e-3)
+            self.scale = min(1.0, max(self.min_scale, self.scale + 0.5 * (want - self.scale)))
+        return self.scale
+
+    def stats(self) -> dict:
+        return {"cpu_cores": round(self.usage, 3), "budget": self.budget or None, "scale": round(self.scale, 3)}
@@ -0,0 +1,151 @@
+import threading, time
+from collections import deque
+import requests
+from requests.adapters import HTTPAdapter
+from wire import CONTENT_TYPE, REPLAY_HEADER, SENT_AT_HEADER
+
+class Sender(threading.Thread):
+    """Background network stage: the capture loop only calls submit(), which never blocks.
+
+    Frames wait in a bounded queue; when it is full the `policy` decides what gives:
+      drop_oldest - discard the oldest queued frame
+      coalesce    - discard queued frames of the same camera (the new frame supersedes them),
+                    falling back to drop_oldest when there are none
+    Requests go through one keep-alive requests.Session with a small connection pool.
+
+    With a `journal` (journal.py), frames the backend did not take are written to disk instead of
+    dropped, and the sender stops trying (exponential backoff up to `max_backoff`) until a probe gets
+    through. The backlog is replayed as packed batches at up to `replay_fps` frames/s, and only while
+    no live frame is queued, so backfill never delays real-time detections by more than one request.
+    A multi-worker backend that took only part of a batch answers 502 with the rest as a batch body;
+    only that rest is journaled, so the frames it did take are not ingested twice.
+    """
+    def __init__(self, backend: str, api_key: str, max_queue: int = 256, policy: str = "drop_oldest",
+                 batcher=None, pool_size: int = 4, timeout: float = 5.0, journal=None,
+                 replay_fps: float = 500.0, max_backoff: float = 30.0):
+        super().__init__(daemon=True, name="sva-sender")
+        if policy not in ("drop_oldest", "coalesce"): raise ValueError(f"unknown queue policy {policy!r}")
+        self.backend = backend
+        self.max_queue = max_queue
+        self.policy = policy
+        self.batcher = batcher
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter); self.session.mount("https://", adapter)
+        self.session.headers["X-API-Key"] = api_key
+        self.q = deque()
+        self.cv = threading.Condition()
+        self.stopped = False
+        self.sent = 0; self.failed = 0; self.dropped = 0; self.coalesced = 0
+        self.latencies = deque(maxlen=512)
+        self.lag = deque(maxlen=512)  # frame capture -> picked up for sending, seconds
+        self.journal = journal
+        self.replay_fps = replay_fps
+        self.max_backoff = max_backoff
+        self.backoff = 0.0; self.offline_until = 0.0; self.replay_next = 0.0
+        self.unsent = None  # frames the last failed batch post says were not taken (None: all of them)
+
+    def submit(self, payload: dict):
+        with self.cv:
+            if len(self.q) >= self.max_queue:
+                if self.policy == "coalesce":
+                    keep = [p for p in self.q if p["camera_id"] != payload["camera_id"]]
+                    self.coalesced += len(self.q) - len(keep)
+                    self.q = deque(keep)
+                if len(self.q) >= self.max_queue:
+                    self.q.popleft(); self.dropped += 1
+            self.q.append(payload)
+            self.cv.notify()
+
+    def stop(self, flush: bool = True):
+        with self.cv:
+            self.stopped = True; self.cv.notify()
+        self.join(timeout=self.timeout)
+        if flush and self.batcher:
+            body = self.batcher.flush()
+            if body: self._post_batch(body)
+        if self.journal: self.journal.close()
+
+    def _wait(self):
+        wait = self.batcher.max_age if self.batcher else None
+        if self.journal:
+            # wake up to sync the journal and to send the next backfill batch when it is due
+            t = self.journal.fsync_seconds
+            if self.journal.has_backlog(): t = min(t, max(0.01, max(self.replay_next, self.offline_until) - time.monotonic()))
+            wait = t if wait is None else min(wait, t)
+        return wait
+
+    def run(self):
+        while True:
+            wait = self._wait()
+            with self.cv:
+                while not self.q and not self.stopped:
+                    if not self.cv.wait(timeout=wait): break
+                if self.stopped: return
+                payload = self.q.popleft() if self.q else None
+            if payload: self.lag.append(time.time() - payload["ts"])
+            if self.batcher:
+                body = self.batcher.add(payload["camera_id"], payload["ts"], payload["persons"]) if payload else None
+                if body is None and self.batcher.due(): body = self.batcher.flush()
+                if body: self._post_batch(body)
+            elif payload:
+                if not self._post(f"{self.backend}/ingest/detections", json=payload) and self.journal:
+                    self.journal.add(payload["camera_id"], payload["ts"], payload["persons"])
+            if self.journal:
+                now = time.monotonic()
+                self.journal.tick(now)
+                if not self.q and now >= max(self.replay_next, self.offline_until) and self.journal.has_backlog():
+                    self._replay(now)
+
+    def _replay(self, now: float):
+        rec = self.journal.peek()
+        if rec is None: return
+        body, frames = rec
+        ok = self._post(f"{self.backend}/ingest/batch", data=body,
+                        headers={"Content-Type": CONTENT_TYPE, REPLAY_HEADER: "1"})
+        if ok is False and self.unsent is None: return  # still offline; the record stays first in line
+        self.journal.commit(frames)  # taken, or rejected for good (4xx): either way it is done
+        if ok is False: self.journal.add_batch(self.unsent)  # partly taken: only the rest goes back in line
+        self.replay_next = now + frames / self.replay_fps
+
+    def _post_batch(self, body: bytes):
+        ok = self._post(f"{self.backend}/ingest/batch", data=body, headers={"Content-Type": CONTENT_TYPE})
+        if ok is False and self.journal: self.journal.add_batch(self.unsent or body)
+
+    def _post(self, url: str, **kw):
+        """True when the backend took it, False when it may take it later (unreachable, 5xx, 408/429),
+        None when it rejected it for good."""
+        self.unsent = None
+        if self.journal and time.monotonic() < self.offline_until:
+            self.failed += 1; return False
+        t0 = time.perf_counter()
+        try:
+            headers = {**kw.pop("headers", {}), SENT_AT_HEADER: f"{time.time():.6f}"}
+            r = self.session.post(url, timeout=self.timeout, headers=headers, **kw)
+            if 400 <= r.status_code < 500 and r.status_code not in (408, 429):
+                self.failed += 1; print("post rejected:", r.status_code, r.text[:200]); return None
+            if r.status_code >= 500 and r.headers.get("content-type") == CONTENT_TYPE: self.unsent = r.content
+            r.raise_for_status(); self.sent += 1
+            self.backoff = 0.0
+            return True
+        except Exception as e:
+            self.failed += 1
+            if self.journal:
+                self.backoff = min(self.max_backoff, max(1.0, self.backoff * 2))
+                self.offline_until = time.monotonic() + self.backoff
+                print(f"post failed, journaling for {self.backoff:.0f}s:", e)
+            else:
+                print("post failed:", e)
+            return False
+        finally:
+            self.latencies.append(time.perf_counter() - t0)
+
+    def stats(self) -> dict:
+        lat = sorted(self.latencies); lag = sorted(self.lag)
+        pct = lambda v, p: round(v[min(len(v)-1, int(p*len(v)))]*1000, 1) if v else None
+        return {"queue_depth": len(self.q), "sent": self.sent, "failed": self.failed,
+                "dropped": self.dropped, "coalesced": self.coalesced,
+                "send_ms_p50": pct(lat, 0.5), "send_ms_p99": pct(lat, 0.99),
+                "capture_to_send_ms_p50": pct(lag, 0.5), "capture_to_send_ms_p99": pct(lag, 0.99),
+                **({"offline": time.monotonic() < self.offline_until, "journal": self.journal.stats()} if self.journal else {})}
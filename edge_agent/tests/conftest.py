@@ -0,0 +1,4 @@
+import os, sys
+
+# agent modules import each other top-level (`import wire`, `tracker_plugins.x`), as they do when run from edge_agent/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from tracker_plugins import association
+from tracker_plugins.association import associate, associate_iou, grid_pairs, iou_matrix
+from tracker_plugins.centroid import Tracker
+
+def _boxes(xy, w=40, h=80):
+    xy = np.asarray(xy, dtype=np.float64)
+    return np.concatenate([xy, xy + [w, h]], axis=1)
+
+def test_iou_matrix():
+    a = _boxes([[0, 0]], 10, 10)
+    b = _boxes([[0, 0], [5, 0], [20, 20]], 10, 10)
+    assert np.allclose(iou_matrix(a, b), [[1.0, 50 / 150, 0.0]])
+
+def test_optimal_not_greedy():
+    # greedy nearest-first would give track 0 det 0 (dist 1) and leave track 1 gated out
+    tracks = _boxes([[0, 0], [12, 0]])
+    dets = _boxes([[1, 0], [-9, 0]])
+    matches, um_t, um_d = associate(tracks, dets, dist_thresh=12.0)
+    assert sorted(map(tuple, matches)) == [(0, 1), (1, 0)] and not len(um_t) and not len(um_d)
+
+def test_gating_and_empty_inputs():
+    matches, um_t, um_d = associate(_boxes([[0, 0]]), _boxes([[500, 500]]), dist_thresh=80.0)
+    assert not len(matches) and list(um_t) == [0] and list(um_d) == [0]
+    matches, um_t, um_d = associate(np.empty((0, 4)), _boxes([[0, 0], [1, 1]]), 80.0)
+    assert not len(matches) and not len(um_t) and list(um_d) == [0, 1]
+
+def test_iou_matching_requires_overlap():
+    matches, _, um_d = associate_iou(_boxes([[0, 0]]), _boxes([[5, 5], [41, 0]]), min_iou=0.3)
+    assert [tuple(m) for m in matches] == [(0, 0)] and list(um_d) == [1]
+
+def test_grid_pairs_matches_brute_force():
+    rng = np.random.default_rng(1)
+    a, b = rng.uniform(0, 500, (200, 2)), rng.uniform(0, 500, (150, 2))
+    i, j = grid_pairs(a, b, 30.0)
+    d = np.hypot(*(a[:, None, :] - b[None, :, :]).transpose(2, 0, 1))
+    assert set(zip(i.tolist(), j.tolist())) == set(zip(*np.nonzero(d <= 30.0)))
+
+@pytest.mark.parametrize("iou_weight", [0.0, 0.3])
+def test_gated_path_agrees_with_dense(monkeypatch, iou_weight):
+    rng = np.random.default_rng(2)
+    tracks = _boxes(rng.uniform(0, 2000, (300, 2)))
+    dets = tracks + rng.normal(0, 6, tracks.shape)
+    dense = associate(tracks, dets, 80.0, iou_weight)
+    monkeypatch.setattr(association, "DENSE_LIMIT", 0)
+    gated = associate(tracks, dets, 80.0, iou_weight)
+    cost = association.cost_matrix(tracks, dets, 80.0, iou_weight)
+    total = lambda m: cost[m[:, 0], m[:, 1]].sum()
+    assert len(gated[0]) == len(dense[0]) and total(gated[0]) == pytest.approx(total(dense[0]))
+
+def test_centroid_tracker_keeps_ids_and_expires_lost_tracks():
+    t = Tracker(max_lost=1)
+    first = t.update(_boxes([[0, 0], [300, 0]]).tolist())
+    assert [b[4] for b in first] == [1, 2]
+    moved = t.update(_boxes([[305, 2], [4, 1]]).tolist())
+    assert [b[4] for b in moved] == [2, 1]
+    t.update([]); t.update([])  # both tracks lost for longer than max_lost
+    assert [b[4] for b in t.update(_boxes([[4, 1]]).tolist())] == [3]
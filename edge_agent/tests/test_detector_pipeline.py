@@ -0,0 +1,69 @@
+import os, sys
+
+import numpy as np
+import pytest
+
+from agent import to_norm
+from detector_plugins import make_tiny_model, onnx_cpu
+from tracker_plugins import bytetrack, centroid, ocsort_stub
+from wire import encode_batch
+
+# the round trip ends in the backend's decoder and zone rules
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "backend"))
+from services.batch_ingest import decode_batch  # noqa: E402
+from services.zones import CameraRules  # noqa: E402
+
+SIZE = 320
+CELL = SIZE // make_tiny_model.GRID
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+@pytest.fixture(scope="module")
+def detector(tmp_path_factory):
+    path = make_tiny_model.build(str(tmp_path_factory.mktemp("model") / "tiny.onnx"), SIZE)
+    return onnx_cpu.Detector(path, input_size=SIZE, max_batch=4)
+
+def _frame(cells):
+    """Light frame with a black square filling each (col, row) grid cell: the tiny model's 'people'."""
+    f = np.full((SIZE, SIZE, 3), 255, np.uint8)
+    for c, r in cells: f[r * CELL:(r + 1) * CELL, c * CELL:(c + 1) * CELL] = 0
+    return f
+
+def test_tiny_model_detects_dark_cells(detector):
+    out = detector.detect([_frame([(2, 3), (10, 12)]), _frame([])])
+    assert len(out) == 2 and out[1] == []
+    boxes = sorted(out[0])
+    assert len(boxes) == 2
+    assert np.allclose(boxes[0], [2 * CELL, 3 * CELL, 3 * CELL, 4 * CELL, 1.0], atol=1e-3)
+    assert np.allclose(boxes[1], [10 * CELL, 12 * CELL, 11 * CELL, 13 * CELL, 1.0], atol=1e-3)
+
+def test_tiny_model_batches_match_single_frames(detector):
+    frames = [_frame([(k, k)]) for k in range(6)]  # more than max_batch: two session runs
+    batched = detector.detect(frames)
+    assert batched == [detector.detect([f])[0] for f in frames]
+
+@pytest.mark.parametrize("tracker_cls", [centroid.Tracker, bytetrack.Tracker, ocsort_stub.Tracker])
+def test_tracker_output_is_box_plus_id(tracker_cls):
+    out = tracker_cls().update([[10, 10, 50, 90, 0.9], [200, 10, 240, 90, 0.8]])
+    assert len(out) == 2
+    assert all(len(r) == 5 for r in out)
+    assert sorted(r[4] for r in out) == [1, 2]
+
+@pytest.mark.parametrize("tracker_cls", [centroid.Tracker, bytetrack.Tracker])
+def test_detector_tracker_wire_zones_round_trip(detector, tracker_cls):
+    tracker = tracker_cls()
+    frames = []
+    for t in range(5):
+        # three people standing still (a tiny-model box jumps a whole cell when one moves, too far for IoU)
+        dets = detector.detect([_frame([(3, 2), (8, 8), (13, 14)])])[0]
+        assert all(d[4] == pytest.approx(1.0) for d in dets)
+        frames.append(("cam_1", 100.0 + t, to_norm(tracker.update(dets), SIZE, SIZE)))
+    batch = decode_batch(encode_batch(frames))
+    rules = CameraRules([[0, 0], [1, 0], [1, 1], [0, 1]], None)
+    alerts = []
+    for cam, ts, boxes in batch.iter_frames():
+        assert sorted(boxes[:, 4].astype(int).tolist()) == [1, 2, 3]
+        alerts += rules.evaluate(cam, ts, boxes)
+    assert [a["type"] for a in alerts] == ["zone_intrusion"]
+    assert alerts[0]["message"].startswith("3 person(s) entered zone (track ")
@@ -0,0 +1,99 @@
+import numpy as np
+
+from frame_ring import FrameRing, RingCapture
+from multistream import MultiStreamRunner
+
+def _frame(v):
+    return np.full((4, 6, 3), v, np.uint8)
+
+def test_read_latest_skips_stale_frames():
+    ring = FrameRing.create((4, 6, 3), slots=4)
+    try:
+        assert ring.read_latest() is None
+        for v in (1, 2, 3): ring.write(_frame(v))
+        seq, view = ring.read_latest()
+        assert seq == 3 and view[0, 0, 0] == 3
+        assert ring.skipped == 0  # nothing read yet, so nothing counted as skipped
+        assert ring.read_latest() is None
+        ring.write(_frame(4)); ring.write(_frame(5))
+        assert ring.read_latest()[0] == 5 and ring.skipped == 1
+    finally:
+        ring.close()
+
+def test_view_is_overwritten_on_wrap():
+    ring = FrameRing.create((4, 6, 3), slots=2)
+    try:
+        ring.write(_frame(1))
+        seq, view = ring.read_latest()
+        ring.write(_frame(2))
+        assert ring.is_current(seq) and view[0, 0, 0] == 1
+        ring.write(_frame(3))  # back onto seq 1's slot
+        assert not ring.is_current(seq) and view[0, 0, 0] == 3
+    finally:
+        ring.close()
+
+def test_slot_being_written_is_not_handed_out():
+    ring = FrameRing.create((4, 6, 3), slots=2)
+    try:
+        ring.write(_frame(1)); ring.write(_frame(2))
+        ring.next_slot()  # writer has started on seq 3 = seq 1's slot, seq 2 is still readable
+        assert ring.read_latest()[0] == 2
+    finally:
+        ring.close()
+
+class _Capture(RingCapture):
+    """RingCapture fed from the test instead of a capture process."""
+    def __init__(self, camera_id, source, slots=2):
+        self.camera_id = camera_id
+        self.ring = FrameRing.create((4, 6, 3), slots)
+        self.processed = 0; self.overwritten = 0; self.seq = 0
+
+class _WrappingDetector:
+    """Capture outruns detection: the ring wraps onto every frame while it is being detected."""
+    def __init__(self, captures): self.captures = captures
+    def detect(self, frames, camera_ids):
+        for c in self.captures:
+            for v in range(c.ring.slots): c.ring.write(_frame(100 + v))
+        return [[[0, 0, 2, 2, 0.9]] for _ in frames]
+
+class _Detector:
+    def detect(self, frames, camera_ids):
+        return [[[0, 0, 2, 2, 0.9]] for _ in frames]
+
+class _Tracker:
+    def __init__(self): self.updates = 0
+    def update(self, boxes):
+        self.updates += 1
+        return [list(b[:4]) + [1] for b in boxes]
+
+class _Sender:
+    def __init__(self): self.sent = []
+    def submit(self, payload): self.sent.append(payload)
+
+def _runner(detector):
+    sender = _Sender()
+    r = MultiStreamRunner([("cam_1", None)], detector, _Tracker, sender, lambda boxes, w, h: boxes, capture_cls=_Capture)
+    return r, sender
+
+def test_runner_drops_results_of_overwritten_frames():
+    r, sender = _runner(None)
+    r.detector = _WrappingDetector(r.captures)
+    cap = r.captures[0]
+    try:
+        cap.ring.write(_frame(1))
+        assert r.step() == 1
+        assert sender.sent == [] and r.trackers["cam_1"].updates == 0
+        assert cap.overwritten == 1 and r.stats()["streams"]["cam_1"]["overwritten"] == 1
+    finally:
+        cap.ring.close()
+
+def test_runner_uses_results_of_intact_frames():
+    r, sender = _runner(_Detector())
+    cap = r.captures[0]
+    try:
+        cap.ring.write(_frame(1))
+        assert r.step() == 1
+        assert cap.current() and cap.overwritten == 0
+        assert len(sender.sent) == 1 and sender.sent[0]["persons"] == [[0, 0, 2, 2, 1]]
+    finally:
+        cap.ring.close()
@@ -0,0 +1,104 @@
+import time
+
+import numpy as np
+import pytest
+
+from capture import VideoSource
+from multistream import CaptureThread, MultiStreamRunner, parse_streams
+
+class _FakeCapture:
+    """Stands in for cv2.VideoCapture: returns the scripted results of read(), then fails."""
+    opened = []
+
+    def __init__(self, source, script=()):
+        self.script = list(script); self.released = False; self.rewinds = 0
+        _FakeCapture.opened.append(self)
+
+    def isOpened(self): return True
+    def get(self, prop): return 25.0
+    def set(self, prop, value): self.rewinds += 1
+    def release(self): self.released = True
+
+    def read(self, out=None):
+        return self.script.pop(0) if self.script else (False, None)
+
+_FRAME = np.zeros((4, 6, 3), np.uint8)
+
+def _source(url, scripts, **kw):
+    """VideoSource whose n-th (re)open gets scripts[n]; sleeps are recorded instead of taken."""
+    scripts = list(scripts); naps = []
+    _FakeCapture.opened = []
+    src = VideoSource(url, min_backoff=0.5, max_backoff=4.0, sleep=naps.append,
+                      open_fn=lambda s: _FakeCapture(s, scripts.pop(0) if scripts else ()), **kw)
+    return src, naps
+
+def test_dropped_live_source_reconnects_with_capped_backoff():
+    src, naps = _source("rtsp://cam/stream", [[(True, _FRAME)]])
+    assert src.read()[0]
+    for _ in range(6): assert src.read() == (False, None)
+    assert naps == [0.5, 1.0, 2.0, 4.0, 4.0, 4.0] and src.reconnects == 6
+    assert all(c.released for c in _FakeCapture.opened[:-1]) and not any(c.rewinds for c in _FakeCapture.opened)
+
+def test_good_frame_resets_the_backoff():
+    src, naps = _source("rtsp://cam/stream", [[], [], [(True, _FRAME)]])
+    src.read(); src.read()
+    assert src.read()[0] and src.backoff == 0.0
+    src.read()
+    assert naps == [0.5, 1.0, 0.5]
+
+def test_file_rewinds_at_its_end_and_backs_off_if_that_does_not_help():
+    src, naps = _source("/samples/a.mp4", [[(True, _FRAME), (False, None), (True, _FRAME)]])
+    assert src.read()[0] and not src.read()[0] and src.read()[0]
+    assert _FakeCapture.opened[0].rewinds == 1 and naps == []
+    src.read(); src.read()  # end again, and the rewind does not bring frames back
+    assert _FakeCapture.opened[0].rewinds == 2 and naps == [0.5] and src.reconnects == 1
+
+def test_capture_thread_keeps_running_across_a_drop():
+    scripts = [[(True, _FRAME)], [(True, _FRAME), (True, _FRAME)]]
+    make = lambda s: VideoSource(s, min_backoff=0.01, max_backoff=0.01,
+                                 open_fn=lambda u: _FakeCapture(u, scripts.pop(0) if scripts else ()))
+    t = CaptureThread("cam_1", "rtsp://cam/stream", open_source=make)
+    t.start()
+    end = time.monotonic() + 5
+    while t.decoded < 3 and time.monotonic() < end: time.sleep(0.01)
+    t.stopped = True; t.join(timeout=2)
+    assert t.decoded == 3 and not t.is_alive()
+    assert t.take() is _FRAME and t.skipped == 2
+
+def test_parse_streams():
+    assert parse_streams(" cam_1=/a.mp4, cam_2=rtsp://h/s?x=1 ,") == [("cam_1", "/a.mp4"), ("cam_2", "rtsp://h/s?x=1")]
+    with pytest.raises(ValueError):
+        parse_streams("cam_1")
+
+class _Capture:
+    def __init__(self, camera_id, source):
+        self.camera_id = camera_id; self.frame = None
+        self.decoded = self.skipped = self.processed = self.overwritten = 0
+    def take(self):
+        f, self.frame = self.frame, None
+        return f
+    def current(self): return True
+
+class _Detector:
+    def __init__(self): self.calls = []
+    def detect(self, frames, camera_ids):
+        self.calls.append(list(camera_ids))
+        return [[[0, 0, 2, 2, 0.9]] for _ in frames]
+
+class _Tracker:
+    def update(self, boxes): return [list(b[:4]) + [1] for b in boxes]
+
+class _Sender:
+    def __init__(self): self.sent = []
+    def submit(self, payload): self.sent.append(payload)
+
+def test_one_batched_detector_call_per_tick_split_at_max_batch():
+    det, sender = _Detector(), _Sender()
+    r = MultiStreamRunner([(f"cam_{i}", None) for i in range(5)], det, _Tracker, sender,
+                          lambda boxes, w, h: boxes, max_batch=2, capture_cls=_Capture)
+    for c in r.captures[:4]: c.frame = _FRAME
+    assert r.step() == 4
+    assert det.calls == [["cam_0", "cam_1"], ["cam_2", "cam_3"]]
+    assert [p["camera_id"] for p in sender.sent] == ["cam_0", "cam_1", "cam_2", "cam_3"]
+    assert all(p["persons"] == [[0, 0, 2, 2, 1]] for p in sender.sent)
+    assert r.step() == 0 and len(det.calls) == 2  # nothing new: no detector call at all
@@ -0,0 +1,98 @@
+import numpy as np
+
+import scheduler
+from scheduler import CpuBudget, FrameScheduler, MotionGate
+
+def _scene(h=720, w=1280, box=None, seed=0):
+    """Static textured BGR frame; `box` = (x, y) paints a bright 120x120 square there."""
+    f = np.random.default_rng(seed).integers(40, 60, (h, w, 3), dtype=np.uint8)
+    if box: f[box[1]:box[1] + 120, box[0]:box[0] + 120] = 230
+    return f
+
+def test_motion_gate_fires_on_a_moving_object_only():
+    g = MotionGate()
+    bufs = [id(b) for b in (g.mid, g.small, g.diff, *g.grey)]
+    assert g(_scene())  # nothing to compare against yet: treated as motion
+    assert not g(_scene()) and g.level == 0.0
+    assert g(_scene(box=(200, 200))) and g.level > 0.01
+    assert not g(_scene(box=(200, 200)))
+    assert g(_scene(box=(600, 300)))
+    assert [id(b) for b in (g.mid, g.small, g.diff, *g.grey)] == bufs  # diffed in place, frame after frame
+
+def test_motion_gate_ignores_small_changes_and_takes_grey_frames():
+    g = MotionGate(delta=20)
+    base = _scene()
+    g(base)
+    assert not g(np.clip(base.astype(int) + 8, 0, 255).astype(np.uint8))  # exposure drift below delta
+    grey = MotionGate()
+    assert grey(np.zeros((480, 640), np.uint8)) and not grey(np.zeros((480, 640), np.uint8))
+    assert grey(np.full((480, 640), 200, np.uint8))
+
+class _Gate:
+    """Scripted motion gate: returns `motion` for every frame."""
+    def __init__(self): self.motion = False; self.level = 0.0
+    def __call__(self, frame): return self.motion
+
+def _run(s, start, seconds, tick=0.01, scale=1.0):
+    """Offers a frame every `tick` seconds; returns how many were taken."""
+    n = 0
+    for k in range(int(round(seconds / tick))):
+        n += s.offer(None, start + k * tick, scale)
+    return n
+
+def test_scheduler_runs_at_max_fps_without_a_gate():
+    s = FrameScheduler(max_fps=10)
+    assert _run(s, 0.0, 2.0) == 21 and s.gated == 179  # 0, 0.05 (half a tick of slack), 0.15, ..., 1.95
+
+def test_scheduler_drops_to_idle_fps_after_the_hold_and_wakes_on_motion():
+    gate = _Gate(); gate.motion = True
+    s = FrameScheduler(max_fps=10, idle_fps=1, hold=1.0, gate=gate)
+    s.offer(None, 0.0); gate.motion = False
+    assert 9 <= _run(s, 0.01, 0.99) <= 10  # still inside the hold
+    assert _run(s, 1.0, 4.0) == 4 and s.target == 1
+    gate.motion = True
+    assert s.offer(None, 5.05)  # no waiting out the rest of the idle interval
+    assert 10 <= _run(s, 5.06, 1.0) <= 11 and s.target == 10
+
+def test_live_tracks_keep_the_stream_active():
+    gate = _Gate()
+    s = FrameScheduler(max_fps=10, idle_fps=1, hold=0.5, gate=gate)
+    s.offer(None, 0.0); s.observe(1, 0.0)  # no motion, but the tracker has a person
+    for k in range(1, 30):
+        if s.offer(None, k * 0.1): s.observe(1, k * 0.1)
+    assert s.processed == 30 and s.target == 10
+    # no tracks after 2.9 s: idle (1 fps) once the 0.5 s hold is over
+    assert 5 <= _run(s, 3.5, 5.0, tick=0.1) <= 6 and s.target == 1
+
+def test_scale_lowers_the_rate_and_stats_report_the_effective_fps():
+    s = FrameScheduler(max_fps=10)
+    s.stats(0.0)
+    assert _run(s, 0.0, 2.0, scale=0.5) == 11  # the first frame, then one every 0.2 s
+    st = s.stats(2.0)
+    assert st["fps"] == 5.5 and st["target_fps"] == 5.0 and st["gated"] == 189 and st["motion"] is None
+
+def _budget(monkeypatch, budget, cores):
+    """CpuBudget fed a process that burns `cores` CPU seconds per wall second at full rate (and
+    proportionally less as the schedulers slow down by `scale`)."""
+    clock = {"cpu": 0.0, "t": 0.0}
+    monkeypatch.setattr(scheduler.time, "process_time", lambda: clock["cpu"])
+    b = CpuBudget(budget=budget, period=1.0)
+    b.t = 0.0
+    def tick(now):
+        clock["cpu"] += (now - clock["t"]) * cores * b.scale; clock["t"] = now
+        return b.update(now)
+    return b, tick
+
+def test_cpu_budget_scales_down_over_budget_and_recovers(monkeypatch):
+    b, tick = _budget(monkeypatch, budget=1.0, cores=2.0)
+    assert tick(0.5) == 1.0  # period not over yet: nothing measured
+    scales = [tick(float(t)) for t in range(1, 6)]
+    assert scales == sorted(scales, reverse=True) and scales[0] == 0.75 and abs(scales[-1] - 0.5) < 0.05
+    assert abs(b.stats()["cpu_cores"] - 1.0) < 0.1
+
+def test_cpu_budget_stays_within_bounds(monkeypatch):
+    b, tick = _budget(monkeypatch, budget=0.01, cores=4.0)
+    for t in range(1, 30): tick(float(t))
+    assert b.scale == b.min_scale
+    free, tick = _budget(monkeypatch, budget=0.0, cores=8.0)
+    assert tick(1.0) == 1.0 and free.stats()["budget"] is None
@@ -0,0 +1,146 @@
+import time
+
+import pytest
+
+from journal import Journal
+from sender import Sender
+from wire import CONTENT_TYPE, HEADER, encode_batch
+
+class _Response:
+    def __init__(self, status_code, content=b"", content_type="application/json"):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode("latin-1")
+        self.headers = {"content-type": content_type}
+
+    def raise_for_status(self):
+        if self.status_code >= 400: raise RuntimeError(f"HTTP {self.status_code}")
+
+class _Session:
+    """Stands in for requests.Session: answers each post with the next scripted response (an exception
+    in the script is raised, like an unreachable backend)."""
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.posted = []
+
+    def post(self, url, timeout=None, headers=None, data=None, json=None):
+        self.posted.append((url, headers, data if json is None else json))
+        r = self.responses.pop(0) if self.responses else _Response(200)
+        if isinstance(r, Exception): raise r
+        return r
+
+def _frames(*cams):
+    return [(c, 100.0 + i, [[0.1, 0.1, 0.2, 0.2, 1]]) for i, c in enumerate(cams)]
+
+def _payload(cam, ts):
+    return {"camera_id": cam, "ts": ts, "persons": []}
+
+def _sender(tmp_path, *responses):
+    s = Sender("http://backend", "k", journal=Journal(str(tmp_path / "journal"), fsync_seconds=0))
+    s.session = _Session(*responses)
+    return s
+
+def test_drop_oldest_keeps_the_newest_frames():
+    s = Sender("http://backend", "k", max_queue=2)
+    for i in range(4): s.submit(_payload("cam_1", i))
+    assert [p["ts"] for p in s.q] == [2, 3] and s.stats()["dropped"] == 2
+
+def test_coalesce_drops_queued_frames_of_the_same_camera_first():
+    s = Sender("http://backend", "k", max_queue=3, policy="coalesce")
+    for cam, ts in (("cam_1", 1), ("cam_2", 2), ("cam_1", 3), ("cam_1", 4)):
+        s.submit(_payload(cam, ts))
+    assert [(p["camera_id"], p["ts"]) for p in s.q] == [("cam_2", 2), ("cam_1", 4)]
+    assert s.coalesced == 2 and s.dropped == 0
+    s.submit(_payload("cam_3", 5)); s.submit(_payload("cam_4", 6))  # nothing to coalesce: oldest goes
+    assert [p["ts"] for p in s.q] == [4, 5, 6] and s.dropped == 1
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        Sender("http://backend", "k", policy="block")
+
+def test_sender_thread_posts_in_order_and_stops():
+    s = Sender("http://backend", "k")
+    s.session = _Session()
+    s.start()
+    for i in range(3): s.submit(_payload("cam_1", time.time()))
+    end = time.monotonic() + 5
+    while s.sent < 3 and time.monotonic() < end: time.sleep(0.01)
+    s.stop()
+    assert not s.is_alive() and s.sent == 3
+    assert [u for u, _, _ in s.session.posted] == ["http://backend/ingest/detections"] * 3
+    assert all("X-SVA-Sent-At" in h for _, h, _ in s.session.posted)
+
+def test_rejected_posts_are_not_retried(tmp_path):
+    s = _sender(tmp_path, _Response(422, b"bad"))
+    assert s._post("http://backend/ingest/detections", json=_payload("cam_1", 1.0)) is None
+    assert s.failed == 1 and s.journal.peek() is None
+
+def test_partly_taken_batch_journals_only_the_rest(tmp_path):
+    rest = encode_batch(_frames("cam_2"))
+    s = _sender(tmp_path, _Response(502, rest, CONTENT_TYPE))
+    s._post_batch(encode_batch(_frames("cam_1", "cam_2", "cam_3")))
+    body, frames = s.journal.peek()
+    assert body == rest and frames == 1
+
+def test_plain_502_journals_the_whole_batch(tmp_path):
+    body = encode_batch(_frames("cam_1", "cam_2"))
+    s = _sender(tmp_path, _Response(502, b"Bad Gateway", "text/plain"))
+    s._post_batch(body)
+    assert s.journal.peek() == (body, 2)
+
+def test_partly_taken_replay_requeues_only_the_rest(tmp_path):
+    rest = encode_batch(_frames("cam_2"))
+    s = _sender(tmp_path, _Response(502, rest, CONTENT_TYPE), _Response(200))
+    s.journal.add_batch(encode_batch(_frames("cam_1", "cam_2"))); s.journal.sync()
+    s._replay(0.0)
+    assert s.journal.peek() == (rest, 1)
+    s.offline_until = 0.0  # skip the backoff the 502 started
+    s._replay(0.0)
+    assert s.journal.peek() is None
+    assert [HEADER.unpack_from(d, 0)[4] for _, _, d in s.session.posted] == [2, 1]
+
+def test_offline_frames_are_journaled_and_the_backend_left_alone(tmp_path):
+    s = _sender(tmp_path, ConnectionError("unreachable"))
+    assert s._post("http://backend/ingest/detections", json=_payload("cam_1", 1.0)) is False
+    assert s.backoff == 1.0 and s.offline_until > time.monotonic()
+    # while offline nothing goes on the wire: the next posts fail at once
+    assert s._post("http://backend/ingest/detections", json=_payload("cam_1", 2.0)) is False
+    s._post_batch(encode_batch(_frames("cam_1", "cam_2")))
+    assert len(s.session.posted) == 1 and s.failed == 3 and s.journal.peek()[1] == 2
+
+def test_backoff_doubles_up_to_max_backoff(tmp_path):
+    s = _sender(tmp_path, *[ConnectionError("unreachable")] * 4)
+    s.max_backoff = 4.0
+    backoffs = []
+    for _ in range(4):
+        s.offline_until = 0.0; s._post("http://backend/ingest/detections", json=_payload("cam_1", 1.0))
+        backoffs.append(s.backoff)
+    assert backoffs == [1.0, 2.0, 4.0, 4.0]
+    s.offline_until = 0.0
+    assert s._post("http://backend/ingest/detections", json=_payload("cam_1", 1.0)) and s.backoff == 0.0
+
+def test_replay_is_paced_and_marked_as_backfill(tmp_path):
+    s = _sender(tmp_path)
+    s.replay_fps = 10.0
+    for k in range(2): s.journal.add_batch(encode_batch(_frames(*["cam_1"] * 5))); s.journal.sync()
+    s._replay(50.0)
+    url, headers, _ = s.session.posted[0]
+    assert url == "http://backend/ingest/batch" and headers["X-SVA-Replay"] == "1"
+    assert s.replay_next == 50.5 and s.journal.stats()["replayed"] == 5
+
+def test_still_offline_replay_keeps_the_record_first_in_line(tmp_path):
+    body = encode_batch(_frames("cam_1"))
+    s = _sender(tmp_path, ConnectionError("unreachable"))
+    s.journal.add_batch(body); s.journal.sync()
+    s._replay(0.0)
+    assert s.journal.peek() == (body, 1) and s.journal.stats()["replayed"] == 0
+
+def test_live_frames_go_out_before_the_backlog(tmp_path):
+    s = _sender(tmp_path)
+    s.journal.add_batch(encode_batch(_frames("cam_1", "cam_1"))); s.journal.sync()
+    for i in range(3): s.submit(_payload("cam_1", time.time()))
+    s.start()
+    end = time.monotonic() + 5
+    while s.journal.has_backlog() and time.monotonic() < end: time.sleep(0.01)
+    s.stop()
+    assert [u.rsplit("/", 1)[1] for u, _, _ in s.session.posted] == ["detections"] * 3 + ["batch"]
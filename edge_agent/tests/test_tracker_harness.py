@@ -0,0 +1,38 @@
+import numpy as np
+
+from tracker_plugins import bytetrack
+from tracker_plugins.synthetic import evaluate, trajectories
+
+def test_trajectories_are_deterministic_and_in_frame():
+    a = list(trajectories(20, 30, w=640, h=480, seed=3))
+    b = list(trajectories(20, 30, w=640, h=480, seed=3))
+    assert len(a) == 30
+    for (ids, gt, dets), (_, gt2, dets2) in zip(a, b):
+        assert np.array_equal(gt, gt2) and dets == dets2
+        assert len(ids) == 20 and gt.shape == (20, 4)
+        assert (gt[:, :2] >= 0).all() and (gt[:, 2] <= 640).all() and (gt[:, 3] <= 480).all()
+        assert all(len(d) == 5 and d[4] in (0.3, 0.9) for d in dets)
+
+def test_miss_rate_drops_detections():
+    n = sum(len(d) for _, _, d in trajectories(100, 20, miss=0.5, seed=1))
+    assert 700 < n < 1300
+
+def test_evaluate_bytetrack():
+    r = evaluate(bytetrack.Tracker(), n=20, frames=100)
+    assert r["objects"] == 20 and r["frames"] == 100
+    assert r["coverage"] > 0.9
+    assert r["id_switches"] <= 5
+
+class _Renumbering:
+    """Gives every box a new id each frame: every re-observation is a switch."""
+    def __init__(self): self.n = 0
+    def update(self, boxes):
+        out = []
+        for b in boxes:
+            self.n += 1; out.append(list(b[:4]) + [self.n])
+        return out
+
+def test_evaluate_counts_switches():
+    r = evaluate(_Renumbering(), n=5, frames=10, miss=0.0)
+    assert r["coverage"] == 1.0
+    assert r["id_switches"] == 5 * 9
@@ -0,0 +1,18 @@
+import time
+
+from wire import HEADER, FrameBatcher
+
+def _n_frames(body):
+    return HEADER.unpack_from(body, 0)[4]
+
+def test_batcher_flushes_at_max_frames():
+    b = FrameBatcher(max_frames=3, max_age=60)
+    assert b.add("cam_1", 1.0, []) is None and b.add("cam_2", 1.0, [[0, 0, 1, 1, 1]]) is None
+    body = b.add("cam_1", 2.0, [])
+    assert body is not None and _n_frames(body) == 3 and b.flush() is None
+
+def test_batcher_flushes_by_age():
+    b = FrameBatcher(max_frames=100, max_age=0.2)
+    assert b.add("cam_1", 1.0, []) is None and not b.due()
+    time.sleep(0.25)
+    assert b.due() and _n_frames(b.flush()) == 1 and not b.due()
@@ -0,0 +1,119 @@
+# ByteTrack-style tracker (Zhang et al., 2022) with all Kalman state held in contiguous arrays.
+# Input boxes are [x1,y1,x2,y2] or [x1,y1,x2,y2,score] in pixels; output is [x1,y1,x2,y2,track_id]
+# for every track confirmed by a detection this frame (box = filtered state).
+import numpy as np
+from tracker_plugins.association import associate_iou
+
+# state: [cx, cy, a, h, vcx, vcy, va, vh]  (a = w/h), constant-velocity model
+_F = np.eye(8); _F[:4, 4:] = np.eye(4)
+_STD_POS = 1.0 / 20
+_STD_VEL = 1.0 / 160
+
+def _to_xyah(b: np.ndarray) -> np.ndarray:
+    w = b[:, 2] - b[:, 0]; h = np.maximum(b[:, 3] - b[:, 1], 1e-6)
+    return np.stack([b[:, 0] + w / 2, b[:, 1] + h / 2, w / h, h], axis=1)
+
+def _to_xyxy(x: np.ndarray) -> np.ndarray:
+    w = x[:, 2] * x[:, 3]
+    return np.stack([x[:, 0] - w / 2, x[:, 1] - x[:, 3] / 2, x[:, 0] + w / 2, x[:, 1] + x[:, 3] / 2], axis=1)
+
+def _noise(h: np.ndarray, pos: float, aspect: float, vel: bool) -> np.ndarray:
+    """Per-track diagonal noise scaled by box height, shape (n, 4 or 8)."""
+    hp = pos * h
+    std = [hp, hp, np.full_like(h, aspect), hp]
+    if vel:
+        hv = _STD_VEL * h
+        std += [hv, hv, np.full_like(h, 1e-5), hv]
+    return np.stack(std, axis=1) ** 2
+
+class Tracker:
+    def __init__(self, high_thresh=0.5, low_thresh=0.1, new_track_thresh=0.6,
+                 match_iou=0.2, low_match_iou=0.5, track_buffer=30):
+        self.high_thresh = high_thresh
+        self.low_thresh = low_thresh
+        self.new_track_thresh = new_track_thresh
+        self.match_iou = match_iou
+        self.low_match_iou = low_match_iou
+        self.track_buffer = track_buffer
+        self.next_id = 1
+        self.ids = np.empty(0, dtype=np.int64)
+        self.mean = np.empty((0, 8))
+        self.cov = np.empty((0, 8, 8))
+        self.lost = np.empty(0, dtype=np.int64)   # frames since last matched detection
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _predict(self):
+        if not len(self.ids): return
+        self.mean[:, 7] *= (self.lost == 0)  # lost tracks stop growing/shrinking
+        q = _noise(self.mean[:, 3], _STD_POS, 1e-2, vel=True)
+        self.mean = self.mean @ _F.T
+        self.cov = _F @ self.cov @ _F.T
+        self.cov[:, np.arange(8), np.arange(8)] += q
+
+    def _update(self, idx: np.ndarray, z: np.ndarray):
+        if not len(idx): return
+        m, P = self.mean[idx], self.cov[idx]
+        S = P[:, :4, :4].copy()
+        S[:, np.arange(4), np.arange(4)] += _noise(m[:, 3], _STD_POS, 1e-1, vel=False)
+        PHt = P[:, :, :4]                                        # P @ H.T
+        K = np.linalg.solve(S, PHt.transpose(0, 2, 1)).transpose(0, 2, 1)
+        self.mean[idx] = m + (K @ (z - m[:, :4])[:, :, None])[:, :, 0]
+        self.cov[idx] = P - K @ S @ K.transpose(0, 2, 1)
+
+    def _spawn(self, z: np.ndarray):
+        n = len(z)
+        if not n: return
+        mean = np.zeros((n, 8)); mean[:, :4] = z
+        h = z[:, 3]
+        std = np.stack([2*_STD_POS*h, 2*_STD_POS*h, np.full(n, 1e-2), 2*_STD_POS*h,
+                        10*_STD_VEL*h, 10*_STD_VEL*h, np.full(n, 1e-5), 10*_STD_VEL*h], axis=1)
+        cov = np.zeros((n, 8, 8)); cov[:, np.arange(8), np.arange(8)] = std ** 2
+        new_ids = np.arange(self.next_id, self.next_id + n); self.next_id += n
+        self.ids = np.concatenate([self.ids, new_ids])
+        self.mean = np.concatenate([self.mean, mean])
+        self.cov = np.concatenate([self.cov, cov])
+        self.lost = np.concatenate([self.lost, np.zeros(n, dtype=np.int64)])
+
+    def predict(self):
+        """Advance the motion model one frame without detections (frames where the detector is skipped)."""
+        self._predict()
+        return self._active()
+
+    def _active(self):
+        active = self.lost == 0
+        return [b.tolist() + [int(t)] for b, t in zip(_to_xyxy(self.mean[active]), self.ids[active])]
+
+    def _prune(self):
+        keep = self.lost <= self.track_buffer
+        if keep.all(): return
+        self.ids, self.mean, self.cov, self.lost = self.ids[keep], self.mean[keep], self.cov[keep], self.lost[keep]
+
+    def update(self, boxes):
+        dets = np.asarray(boxes, dtype=np.float64).reshape(len(boxes), -1) if len(boxes) else np.empty((0, 5))
+        scores = dets[:, 4] if dets.shape[1] > 4 else np.ones(len(dets))
+        dets = dets[:, :4]
+        high = np.flatnonzero(scores >= self.high_thresh)
+        low = np.flatnonzero((scores >= self.low_thresh) & (scores < self.high_thresh))
+
+        self._predict()
+        pred = _to_xyxy(self.mean)
+        # stage 1: every track (tracked + recently lost) vs high-confidence detections
+        m1, um_t, um_high = associate_iou(pred, dets[high], self.match_iou)
+        # stage 2: still-unmatched tracked tracks vs low-confidence detections (occluded people)
+        tracked = um_t[self.lost[um_t] == 0]
+        m2, _, _ = associate_iou(pred[tracked], dets[low], self.low_match_iou)
+
+        t_idx = np.concatenate([m1[:, 0], tracked[m2[:, 0]]])
+        d_idx = np.concatenate([high[m1[:, 1]], low[m2[:, 1]]])
+        self._update(t_idx, _to_xyah(dets[d_idx]))
+        matched = np.zeros(len(self.ids), bool); matched[t_idx] = True
+        self.lost[matched] = 0
+        self.lost[~matched] += 1
+
+        fresh = high[um_high]
+        fresh = fresh[scores[fresh] >= self.new_track_thresh]
+        self._spawn(_to_xyah(dets[fresh]))
+        self._prune()
+        return self._active()
@@ -5,4 +5,4 @@ class Tracker:
         pass
     def update(self, boxes):
         # passthrough with fake IDs
-        return [b+[i+1] for i,b in enumerate(boxes)]
+        return [list(b[:4])+[i+1] for i,b in enumerate(boxes)]
@@ -0,0 +1,56 @@
+# Synthetic-trajectory harness for tracker plugins: ID switches, coverage and throughput.
+#   python -m tracker_plugins.synthetic [plugin ...]     (default: centroid bytetrack)
+import sys, time
+import numpy as np
+from tracker_plugins.association import associate_iou
+
+def trajectories(n: int, frames: int, w: int = 1920, h: int = 1080, miss: float = 0.05,
+                 low_conf: float = 0.1, noise: float = 2.0, seed: int = 0):
+    """Yield (gt_ids, gt_boxes, detections) per frame for n people walking and bouncing off the borders.
+    Detections drop out with probability `miss` and come back with a low score with probability `low_conf`."""
+    rng = np.random.default_rng(seed)
+    size = rng.uniform(0.7, 1.3, (n, 1)) * np.array([40.0, 80.0])
+    pos = rng.uniform(0, 1, (n, 2)) * (np.array([w, h]) - size)
+    vel = rng.normal(0, 3, (n, 2))
+    ids = np.arange(n)
+    for _ in range(frames):
+        pos += vel
+        for k, lim in ((0, w), (1, h)):
+            out = (pos[:, k] < 0) | (pos[:, k] + size[:, k] > lim)
+            vel[out, k] *= -1
+            pos[:, k] = np.clip(pos[:, k], 0, lim - size[:, k])
+        gt = np.concatenate([pos, pos + size], axis=1)
+        seen = rng.random(n) >= miss
+        det = gt[seen] + rng.normal(0, noise, (seen.sum(), 4))
+        score = np.where(rng.random(seen.sum()) < low_conf, 0.3, 0.9)
+        yield ids, gt, np.concatenate([det, score[:, None]], axis=1).tolist()
+
+def evaluate(tracker, n: int = 50, frames: int = 300, **kw) -> dict:
+    last = {}
+    switches = covered = total = 0
+    elapsed = 0.0
+    for gt_ids, gt, dets in trajectories(n, frames, **kw):
+        t0 = time.perf_counter()
+        out = tracker.update(dets)
+        elapsed += time.perf_counter() - t0
+        total += len(gt_ids)
+        if not out: continue
+        out = np.asarray(out, dtype=np.float64)
+        m, _, _ = associate_iou(gt, out[:, :4], 0.3)
+        covered += len(m)
+        for g, o in zip(gt_ids[m[:, 0]], out[m[:, 1], 4].astype(int)):
+            if g in last and last[g] != o: switches += 1
+            last[g] = o
+    return {"objects": n, "frames": frames, "id_switches": switches, "coverage": round(covered / max(total, 1), 4),
+            "fps": round(frames / elapsed, 1), "ms_per_frame": round(elapsed / frames * 1000, 3)}
+
+def main(plugins):
+    for name in plugins:
+        mod = __import__(f"tracker_plugins.{name}", fromlist=["Tracker"])
+        for n in (10, 100, 1000):
+            # constant crowd density (~100 people per 1080p frame) so per-frame cost can be compared
+            scale = max(1.0, (n / 100) ** 0.5)
+            print(name, evaluate(mod.Tracker(), n=n, frames=200, w=int(1920 * scale), h=int(1080 * scale)))
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ["centroid", "bytetrack"])
@@ -0,0 +1,58 @@
+import struct, time
+import numpy as np
+
+# Compact batch payload for POST /ingest/batch (mirrors backend/services/batch_ingest.py).
+#   header : magic "SVB1" | version u8 | width u8 | n_cams u16 | n_frames u32   (little-endian)
+#   cams   : n_cams x (len u8 + utf-8 camera_id)
+#   frames : n_frames x (cam u16, n u16, ts f64)
+#   boxes  : sum(n) x width float32, row-major [x1,y1,x2,y2,id,...]
+MAGIC = b"SVB1"
+VERSION = 1
+HEADER = struct.Struct("<4sBBHI")
+FRAME_DTYPE = np.dtype([("cam", "<u2"), ("n", "<u2"), ("ts", "<f8")])
+CONTENT_TYPE = "application/x-sva-batch"
+REPLAY_HEADER = "X-SVA-Replay"  # set on batches replayed from the offline journal (journal.py)
+SENT_AT_HEADER = "X-SVA-Sent-At"  # wall clock when the request left; frame ts is the capture time
+
+def encode_batch(frames, width: int = 5) -> bytes:
+    """frames: iterable of (camera_id, ts, persons) with persons a list of [x1,y1,x2,y2,(id)] rows."""
+    cams = {}
+    table = np.zeros(len(frames), dtype=FRAME_DTYPE)
+    rows = []
+    for i, (cam_id, ts, persons) in enumerate(frames):
+        table[i] = (cams.setdefault(cam_id, len(cams)), len(persons), ts)
+        rows.extend(persons)
+    boxes = np.full((len(rows), width), -1.0, dtype=np.float32)
+    for i, r in enumerate(rows):
+        boxes[i, :len(r)] = r[:width]
+    out = [HEADER.pack(MAGIC, VERSION, width, len(cams), len(table))]
+    for cam_id in cams:
+        b = cam_id.encode("utf-8")
+        out.append(struct.pack("<B", len(b)) + b)
+    out.append(table.tobytes()); out.append(boxes.tobytes())
+    return b"".join(out)
+
+class FrameBatcher:
+    """Buffers per-frame detections and hands back an encoded batch once
+    `max_frames` frames are buffered or the oldest one is `max_age` seconds old."""
+    def __init__(self, max_frames: int = 50, max_age: float = 1.0, width: int = 5):
+        self.max_frames = max_frames
+        self.max_age = max_age
+        self.width = width
+        self.frames = []
+        self.first_ts = None
+
+    def add(self, camera_id: str, ts: float, persons):
+        if not self.frames: self.first_ts = time.monotonic()
+        self.frames.append((camera_id, ts, persons))
+        return self.flush() if self.due() else None
+
+    def due(self) -> bool:
+        if not self.frames: return False
+        return len(self.frames) >= self.max_frames or time.monotonic() - self.first_ts >= self.max_age
+
+    def flush(self):
+        if not self.frames: return None
+        body = encode_batch(self.frames, self.width)
+        self.frames = []; self.first_ts = None
+        return body